@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import threading
+from typing import Optional
+from ..core import llm, security
+from ..core.config import get_settings
+from ..core.executor import run_blocking, shutdown_executor
+from ..core.mongo_client import close_mongo_clients
+from ..services.chat_service import ChatService
+from ..services.mongodb_service import MongoDBService
+from ..services.rate_limit_store import MongoRateLimiter
+from ..services.response_cache_store import MongoResponseCacheStore
+
+# Configurar o logger
+logger = logging.getLogger("dependencies")
+
+# Serviços compartilhados do processo, criados no primeiro uso (nunca na importação)
+_mongodb_service: Optional[MongoDBService] = None
+_chat_service: Optional[ChatService] = None
+_services_lock = threading.Lock()
+
+def get_mongodb_service() -> MongoDBService:
+    """
+    Return the process-wide MongoDBService, created on first use.
+
+    Creating it does no I/O (see MongoDBService.connect), so it is safe to use
+    as a FastAPI dependency.
+    """
+    global _mongodb_service
+    if _mongodb_service is None:
+        with _services_lock:
+            if _mongodb_service is None:
+                _mongodb_service = MongoDBService()
+    return _mongodb_service
+
+def get_chat_service() -> ChatService:
+    """
+    Return the process-wide ChatService, created on first use.
+
+    Also registers the shared response cache when SHARED_RESPONSE_CACHE_ENABLED is set.
+    """
+    global _chat_service
+    if _chat_service is None:
+        mongodb_service = get_mongodb_service()
+        with _services_lock:
+            if _chat_service is None:
+                settings = get_settings()
+                _chat_service = ChatService(mongodb_service=mongodb_service)
+
+                # Ativar o cache de respostas compartilhado entre workers, se configurado
+                if settings.SHARED_RESPONSE_CACHE_ENABLED:
+                    llm.set_shared_response_cache(MongoResponseCacheStore(
+                        mongodb_service,
+                        collection_name=settings.SHARED_RESPONSE_CACHE_COLLECTION,
+                        ttl=settings.RESPONSE_CACHE_TTL
+                    ))
+    return _chat_service
+
+def install_rate_limiter() -> None:
+    """
+    Register the MongoDB rate limiter when RATE_LIMIT_BACKEND is "mongodb".
+
+    Called from the lifespan hook before the first request, independently of the
+    ChatService: the middleware checks the limit on every request, and until this
+    runs it would fall back to the per-process in-memory limiter. No I/O happens
+    here; the counters are synced by the limiter's background thread.
+    """
+    settings = get_settings()
+    if settings.RATE_LIMIT_BACKEND != "mongodb" or isinstance(security.rate_limiter, MongoRateLimiter):
+        return
+    security.set_rate_limiter(MongoRateLimiter(
+        get_mongodb_service(),
+        collection_name=settings.RATE_LIMIT_COLLECTION,
+        max_requests=settings.RATE_LIMIT_MAX_REQUESTS,
+        window=settings.RATE_LIMIT_WINDOW,
+        max_keys=settings.RATE_LIMIT_MAX_KEYS,
+        sync_interval=settings.RATE_LIMIT_SYNC_INTERVAL
+    ).start())
+    logger.info("Rate limiting compartilhado via MongoDB ativado")
+
+def peek_chat_service() -> Optional[ChatService]:
+    """Return the ChatService if it has been created, without creating it."""
+    return _chat_service
+
+def _ensure_indexes(chat_service: ChatService) -> None:
+    """Create every index the services need (blocking; run from the executor)."""
+    chat_service.mongodb_service.ensure_indexes()
+    persistence = chat_service.session_store.persistence
+    if persistence is not None:
+        persistence.ensure_indexes()
+    if llm.shared_response_cache is not None:
+        llm.shared_response_cache.ensure_indexes()
+    if isinstance(security.rate_limiter, MongoRateLimiter):
+        security.rate_limiter.ensure_indexes()
+
+async def warm_up_services() -> None:
+    """
+    Create the services and their MongoDB indexes after the server has started.
+
+    Runs as a background task of the lifespan hook, so a slow or unavailable
+    MongoDB never delays startup; the work is bounded by STARTUP_TIMEOUT.
+    """
+    timeout = get_settings().STARTUP_TIMEOUT
+    try:
+        chat_service = get_chat_service()
+        await asyncio.wait_for(run_blocking(_ensure_indexes, chat_service), timeout=timeout)
+        logger.info("Serviços inicializados")
+    except asyncio.TimeoutError:
+        logger.error(f"Inicialização dos índices do MongoDB excedeu {timeout}s; seguindo sem aguardar")
+    except Exception as e:
+        logger.error(f"Erro ao inicializar serviços: {str(e)}")
+
+def shutdown_services() -> None:
+    """Flush queued writes, then close the shared MongoDB client and the executor."""
+    global _chat_service, _mongodb_service
+    if isinstance(security.rate_limiter, MongoRateLimiter):
+        # Enviar os incrementos pendentes antes de fechar o cliente
+        security.rate_limiter.stop()
+        security.set_rate_limiter(None)
+    if _chat_service is not None:
+        _chat_service.close()
+        _chat_service = None
+    if _mongodb_service is not None:
+        _mongodb_service.close()
+        _mongodb_service = None
+    close_mongo_clients()
+    shutdown_executor()
+    logger.info("Serviços encerrados")
@@ -0,0 +1,138 @@
+import json
+import logging
+from typing import Any, Iterable, Optional
+from fastapi import Request
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .schemas import ErrorResponse
+from ..core.config import get_settings
+from ..core.security import check_rate_limit, validate_token
+
+# Configurar o logger
+logger = logging.getLogger("api_middleware")
+
+API_KEY_NAME = "X-API-Key"
+
+# Chave em scope["state"] (request.state) do corpo JSON já decodificado
+JSON_BODY_STATE_KEY = "json_body"
+
+class RequestValidationMiddleware:
+    """
+    ASGI middleware that validates chat requests before the route runs.
+
+    For paths under `protected_paths` it checks the API key and the rate limit
+    from the headers alone, so those rejections never read or parse the body.
+    For POST requests to `json_paths` it then reads the body (rejecting it with
+    413 once it exceeds `max_body_size`, before reading the rest), decodes the
+    JSON once and stores it in `request.state` for `get_json_body`, so the
+    route does not parse it again.
+    """
+
+    def __init__(self, app: ASGIApp, protected_paths: Iterable[str] = ("/chat", "/reset"),
+                 json_paths: Iterable[str] = ("/chat", "/chat/stream"),
+                 max_body_size: Optional[int] = None):
+        self.app = app
+        self.protected_paths = tuple(protected_paths)
+        self.json_paths = frozenset(json_paths)
+        self.max_body_size = max_body_size if max_body_size is not None else get_settings().MAX_REQUEST_BODY_BYTES
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._is_protected(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        client_ip = scope["client"][0] if scope.get("client") else "unknown"
+        headers = Headers(scope=scope)
+
+        # Verificações baratas primeiro: nenhuma delas lê o corpo
+        api_key = headers.get(API_KEY_NAME)
+        if not api_key:
+            logger.warning(f"Missing API key from {client_ip}")
+            await _error(401, "API key is required")(scope, receive, send)
+            return
+        if not validate_token(api_key):
+            logger.warning(f"Invalid API key from {client_ip}")
+            await _error(401, "Invalid API key")(scope, receive, send)
+            return
+        if not check_rate_limit(client_ip):
+            logger.warning(f"Rate limit exceeded for {client_ip}")
+            await _error(429, "Rate limit exceeded. Please try again later.")(scope, receive, send)
+            return
+
+        if scope["method"] != "POST" or scope["path"] not in self.json_paths:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = headers.get("content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_body_size:
+            logger.warning(f"Request body of {content_length} bytes from {client_ip} rejected")
+            await _error(413, "Request body too large")(scope, receive, send)
+            return
+
+        body = await self._read_body(receive)
+        if body is None:
+            logger.warning(f"Request body over {self.max_body_size} bytes from {client_ip} rejected")
+            await _error(413, "Request body too large")(scope, receive, send)
+            return
+
+        try:
+            json_body = json.loads(body)
+        except ValueError:
+            logger.warning(f"Invalid JSON body from {client_ip}")
+            await _error(400, "Invalid JSON body")(scope, receive, send)
+            return
+        scope.setdefault("state", {})[JSON_BODY_STATE_KEY] = json_body
+
+        await self.app(scope, _replay(body, receive), send)
+
+    def _is_protected(self, path: str) -> bool:
+        return any(path == prefix or path.startswith(prefix + "/") for prefix in self.protected_paths)
+
+    async def _read_body(self, receive: Receive) -> Optional[bytes]:
+        """Read the whole body, or return None as soon as it exceeds max_body_size."""
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                break
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > self.max_body_size:
+                return None
+            chunks.append(chunk)
+            if not message.get("more_body", False):
+                break
+        return b"".join(chunks)
+
+async def get_json_body(request: Request) -> Any:
+    """
+    Return the request's JSON body, decoded once per request.
+
+    Uses the object decoded by RequestValidationMiddleware; parses the body
+    only when the middleware did not (e.g. app without the middleware).
+    """
+    state = request.scope.get("state") or {}
+    if JSON_BODY_STATE_KEY in state:
+        return state[JSON_BODY_STATE_KEY]
+    return await request.json()
+
+def _replay(body: bytes, receive: Receive) -> Receive:
+    """Receive callable that returns the already-read body, then defers to `receive`."""
+    sent = False
+
+    async def replay() -> Message:
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+    return replay
+
+def _error(status_code: int, message: str) -> JSONResponse:
+    """Error response in the same format as the app's HTTPException handler."""
+    return JSONResponse(
+        status_code=status_code,
+        content=ErrorResponse(error=message, status_code=status_code).model_dump()
+    )
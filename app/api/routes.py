@@ -1,55 +1,26 @@
 from fastapi import FastAPI, HTTPException, Request, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import APIKeyHeader
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 import logging
 import traceback
 import os
 import re
 import time
+import json
 from datetime import datetime
 from typing import Optional, List, Dict, Any
-from pydantic import BaseModel, Field
-from .schemas import ChatRequest, ChatResponse
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+from .schemas import ChatRequest, ChatResponse, ErrorResponse
+from .dependencies import get_chat_service
+from .middleware import API_KEY_NAME, get_json_body
 from ..services.chat_service import ChatService
-from ..core.llm import sanitize_input
-from ..core.security import (
-    check_for_dangerous_content, 
-    validate_conversation_history,
-    check_rate_limit,
-    validate_token,
-    sanitize_html
-)
-
-# Error response model
-class ErrorResponse(BaseModel):
-    error: str = Field(..., description="Error message")
-    detail: Optional[str] = Field(None, description="Additional error details")
-    status_code: int = Field(..., description="HTTP status code")
-    
-    class Config:
-        schema_extra = {
-            "example": {
-                "error": "Authentication failed",
-                "detail": "Invalid API key provided",
-                "status_code": 401
-            }
-        }
+from ..core.llm import sanitize_user_message
+from ..core.request_pipeline import RequestTimings, stage_stats, track_request
+from ..core.security import validate_conversation_history, validate_token
 
 # Configurar o logger
-log_dir = "logs"
-if not os.path.exists(log_dir):
-    os.makedirs(log_dir)
-
-log_file = os.path.join(log_dir, f"api_routes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(log_file),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger("api_routes")
 
 app = FastAPI(title="Spot2 Real Estate Chatbot API")
@@ -70,75 +41,8 @@ app.add_middleware(
 )
 
 # Configurar autenticação por API key
-API_KEY_NAME = "X-API-Key"
 api_key_header = APIKeyHeader(name=API_KEY_NAME, auto_error=False)
 
-# Inicializar o serviço de chat
-chat_service = ChatService()
-
-async def validate_request(request: Request) -> None:
-    """
-    Middleware to validate incoming requests.
-    """
-    try:
-        # Get client IP
-        client_ip = request.client.host
-        
-        # Check API key
-        api_key = request.headers.get("X-API-Key")
-        if not api_key:
-            logger.warning(f"Missing API key from {client_ip}")
-            raise HTTPException(
-                status_code=401,
-                detail="API key is required"
-            )
-        
-        if not validate_token(api_key):
-            logger.warning(f"Invalid API key from {client_ip}")
-            raise HTTPException(
-                status_code=401,
-                detail="Invalid API key"
-            )
-        
-        # Check rate limit
-        if not check_rate_limit(client_ip):
-            logger.warning(f"Rate limit exceeded for {client_ip}")
-            raise HTTPException(
-                status_code=429,
-                detail="Rate limit exceeded. Please try again later."
-            )
-        
-        # For POST requests to /chat, validate the request body
-        if request.method == "POST" and request.url.path == "/chat":
-            body = await request.json()
-            
-            # Check for dangerous content
-            if check_for_dangerous_content(body.get("message", "")):
-                logger.warning(f"Dangerous content detected from {client_ip}")
-                raise HTTPException(
-                    status_code=400,
-                    detail="Invalid input detected"
-                )
-            
-            # Validate conversation history if present
-            if "conversation_history" in body:
-                try:
-                    validate_conversation_history(body["conversation_history"])
-                except ValueError as e:
-                    logger.warning(f"Invalid conversation history from {client_ip}: {str(e)}")
-                    raise HTTPException(
-                        status_code=400,
-                        detail="Invalid conversation history"
-                    )
-    
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error validating request: {str(e)}")
-        raise HTTPException(
-            status_code=500,
-            detail="Internal server error during request validation"
-        )
 
 # Middleware para adicionar headers de segurança
 @app.middleware("http")
@@ -169,36 +73,74 @@ async def get_api_key(api_key: Optional[str] = Header(None, alias=API_KEY_NAME))
     
     return api_key
 
+async def get_chat_request(body: Any = Depends(get_json_body)) -> ChatRequest:
+    """
+    Validate the chat request from the JSON body decoded by RequestValidationMiddleware.
+    
+    The body is decoded once, by the middleware, instead of again by FastAPI.
+    """
+    try:
+        return ChatRequest.model_validate(body)
+    except ValidationError as e:
+        raise RequestValidationError(
+            [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)]
+        )
+
+def _prepare_chat_request(request: ChatRequest, chat_service: ChatService):
+    """
+    Sanitize the user's message and resolve the conversation of a chat request.
+    
+    The server keeps the transcript of each conversation, so clients only need to send
+    the new message and the conversation_id. A `conversation_history` sent by the client
+    is validated and used only to seed a conversation that has no server-side transcript
+    yet (older clients); otherwise it is ignored and never scanned again.
+    
+    The message is sanitized here, once per request; the returned `SanitizedText`
+    is not sanitized again by the service layer or the LLM call.
+    
+    Returns:
+        Tuple[SanitizedText, str]: The sanitized message and the conversation_id
+    """
+    sanitized_message = sanitize_user_message(request.message)
+    
+    # Continuar a conversa informada ou iniciar uma nova
+    state = chat_service.session_store.get_or_create(request.conversation_id)
+    if request.conversation_history and not state.history:
+        state.history.extend(validate_conversation_history(request.conversation_history))
+        logger.debug(f"Histórico do servidor inicializado com {len(state.history)} mensagens do cliente")
+    
+    return sanitized_message, state.conversation_id
+
+def _record_timings(timings: RequestTimings) -> None:
+    """Add a finished request's per-stage timings to the /metrics totals."""
+    stage_stats.record(timings)
+    logger.debug(f"Tempo por etapa: {timings.as_dict()}")
+
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format a Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat(
-    request: ChatRequest,
-    api_key: str = Depends(get_api_key)
+    request: ChatRequest = Depends(get_chat_request),
+    api_key: str = Depends(get_api_key),
+    chat_service: ChatService = Depends(get_chat_service)
 ):
     """
     Process a chat message and return the response with collected fields.
     """
     logger.info(f"Recebida requisição de chat com mensagem: {request.message[:50]}...")
-    logger.debug(f"Histórico de conversa: {len(request.conversation_history) if request.conversation_history else 0} mensagens")
+    logger.debug(f"Conversa: {request.conversation_id or 'nova'}")
     
     try:
-        # Sanitizar a mensagem do usuário
-        sanitized_message = sanitize_input(request.message)
-        
-        # Sanitizar HTML na mensagem
-        sanitized_message = sanitize_html(sanitized_message)
-        
-        # Validar o histórico de conversa
-        validated_history = validate_conversation_history(request.conversation_history)
-        
-        # Registrar tentativa de ataque se a mensagem foi modificada
-        if sanitized_message != request.message:
-            logger.warning(f"Tentativa de ataque detectada. Mensagem original: {request.message[:100]}...")
-            logger.warning(f"Mensagem sanitizada: {sanitized_message[:100]}...")
-        
-        result = chat_service.process_message(
-            message=sanitized_message,
-            conversation_history=validated_history
-        )
+        with track_request() as timings:
+            sanitized_message, conversation_id = _prepare_chat_request(request, chat_service)
+            
+            result = await chat_service.process_message_async(
+                message=sanitized_message,
+                conversation_id=conversation_id
+            )
+        _record_timings(timings)
         logger.info("Requisição de chat processada com sucesso")
         return ChatResponse(**result)
     except Exception as e:
@@ -206,14 +148,71 @@ async def chat(
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@app.post("/chat/stream")
+async def chat_stream(
+    request: ChatRequest = Depends(get_chat_request),
+    api_key: str = Depends(get_api_key),
+    chat_service: ChatService = Depends(get_chat_service)
+):
+    """
+    Process a chat message and stream the response as Server-Sent Events.
+    
+    Emits `token` events (`{"text": ...}`) as the model generates text, then one
+    `done` event with the same payload as `/chat` (`response`, `collected_fields`,
+    `is_complete`, `conversation_id`). The `response` in the `done` event is the
+    authoritative, fully checked text and should replace the streamed tokens.
+    """
+    logger.info(f"Recebida requisição de chat em streaming com mensagem: {request.message[:50]}...")
+    
+    try:
+        with track_request() as timings:
+            sanitized_message, conversation_id = _prepare_chat_request(request, chat_service)
+    except Exception as e:
+        logger.error(f"Erro ao preparar requisição de chat em streaming: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail="Internal server error")
+    
+    async def event_stream():
+        try:
+            # O corpo da resposta roda em outra task; continuar contando na mesma requisição
+            with track_request(timings):
+                async for event in chat_service.stream_message_async(
+                    message=sanitized_message,
+                    conversation_id=conversation_id
+                ):
+                    if event["type"] == "token":
+                        yield _sse_event("token", {"text": event["text"]})
+                    else:
+                        result = ChatResponse(**{k: v for k, v in event.items() if k != "type"})
+                        yield _sse_event("done", result.model_dump())
+            _record_timings(timings)
+            logger.info("Requisição de chat em streaming processada com sucesso")
+        except Exception as e:
+            logger.error(f"Erro durante o streaming do chat: {str(e)}")
+            logger.error(traceback.format_exc())
+            yield _sse_event("error", {"error": "Internal server error", "status_code": 500})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.post("/reset")
-async def reset_conversation(api_key: str = Depends(get_api_key)):
+async def reset_conversation(
+    conversation_id: Optional[str] = None,
+    api_key: str = Depends(get_api_key),
+    chat_service: ChatService = Depends(get_chat_service)
+):
     """
     Reset the conversation state.
+    
+    - **conversation_id**: The conversation to reset; only that client's session is dropped
     """
     logger.info("Recebida requisição para resetar conversa")
     try:
-        chat_service.reset()
+        if conversation_id:
+            chat_service.reset(conversation_id)
         logger.info("Conversa resetada com sucesso")
         return {"message": "Conversation reset successfully"}
     except Exception as e:
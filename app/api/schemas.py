@@ -9,17 +9,19 @@ class ChatRequest(BaseModel):
     message: str = Field(..., description="The user's message to the chatbot")
     conversation_history: Optional[List[ChatMessage]] = Field(
         default=None, 
-        description="Previous conversation messages for context"
+        description="Deprecated: the server keeps the transcript of each conversation. Only used to seed a conversation the server has no history for"
+    )
+    conversation_id: Optional[str] = Field(
+        default=None,
+        max_length=64,
+        description="Conversation to continue (as returned by a previous response); a new conversation is started when omitted"
     )
     
     class Config:
         schema_extra = {
             "example": {
                 "message": "I'm looking for an apartment in New York with a budget of $500,000",
-                "conversation_history": [
-                    {"role": "user", "content": "Hello"},
-                    {"role": "assistant", "content": "Hi! How can I help you with your real estate needs today?"}
-                ]
+                "conversation_id": "550e8400-e29b-41d4-a716-446655440000"
             }
         }
 
@@ -66,4 +68,18 @@ class RealEstateRequirements(BaseModel):
                     "bathrooms": "1"
                 }
             }
-        } 
\ No newline at end of file
+        }
+
+class ErrorResponse(BaseModel):
+    error: str = Field(..., description="Error message")
+    detail: Optional[str] = Field(None, description="Additional error details")
+    status_code: int = Field(..., description="HTTP status code")
+    
+    class Config:
+        schema_extra = {
+            "example": {
+                "error": "Authentication failed",
+                "detail": "Invalid API key provided",
+                "status_code": 401
+            }
+        }
@@ -0,0 +1,200 @@
+import hashlib
+import heapq
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Configurar o logger
+logger = logging.getLogger("cache")
+
+
+def _default_sizeof(value: Any) -> int:
+    """Estimate the size in bytes of a cached value."""
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    return len(json.dumps(value, default=str).encode("utf-8"))
+
+
+class BoundedTTLCache:
+    """
+    Thread-safe LRU cache bounded by entry count and total byte size, with TTL expiry.
+
+    Entries are evicted least-recently-used first when either bound is exceeded.
+    Expired entries are removed actively on every write (and periodically on
+    reads), not only when they are looked up again.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        max_bytes: Optional[int] = None,
+        ttl: Optional[float] = None,
+        sizeof: Callable[[Any], int] = _default_sizeof,
+        purge_interval: float = 60.0,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self._sizeof = sizeof
+        self._lock = threading.Lock()
+        # key -> (value, expires_at, size); order is recency of use
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # heap of (expires_at, key), soonest first even with per-call TTLs; items of
+        # removed or overwritten keys stay until they reach the top (see _purge_expired)
+        self._expiry: List[Tuple[float, str]] = []
+        self._bytes = 0
+        self._last_purge = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return the cached value for `key`, or `default` if missing or expired."""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_purge >= self.purge_interval:
+                self._purge_expired(now)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at, _ = entry
+            if expires_at is not None and expires_at <= now:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store `value` under `key`, evicting expired and least-recently-used entries as needed."""
+        size = self._sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            logger.warning(f"Valor de {size} bytes excede o limite do cache, ignorando")
+            return
+
+        now = time.monotonic()
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = now + ttl if ttl is not None else None
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, expires_at, size)
+            if expires_at is not None:
+                heapq.heappush(self._expiry, (expires_at, key))
+                if len(self._expiry) > 2 * len(self._entries):
+                    self._rebuild_expiry()
+            self._bytes += size
+
+            self._purge_expired(now)
+            while self._entries and (
+                len(self._entries) > self.max_entries
+                or (self.max_bytes is not None and self._bytes > self.max_bytes)
+            ):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        """Remove `key` from the cache if present."""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self) -> None:
+        """Remove every entry (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self._expiry.clear()
+            self._bytes = 0
+
+    def purge_expired(self) -> int:
+        """Remove all expired entries and return how many were removed."""
+        with self._lock:
+            return self._purge_expired(time.monotonic())
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss/eviction counters and current occupancy."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and (entry[1] is None or entry[1] > time.monotonic())
+
+    def _remove(self, key: str) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def _purge_expired(self, now: float) -> int:
+        self._last_purge = now
+        removed = 0
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, key = heapq.heappop(self._expiry)
+            entry = self._entries.get(key)
+            # Skip items of keys removed or set again with another expiry
+            if entry is not None and entry[1] == expires_at:
+                self._remove(key)
+                removed += 1
+        self.expirations += removed
+        return removed
+
+    def _rebuild_expiry(self) -> None:
+        """Drop the heap items of removed or overwritten entries."""
+        self._expiry = [(entry[1], key) for key, entry in self._entries.items() if entry[1] is not None]
+        heapq.heapify(self._expiry)
+
+
+def make_cache_key(
+    prompt: str,
+    history: Optional[List[Dict[str, Any]]] = None,
+    collected_fields: Optional[Dict[str, Any]] = None,
+    namespace: str = "",
+) -> str:
+    """
+    Build a stable content digest for an LLM request.
+
+    The key covers the full prompt, every history message and the collected
+    fields, and is identical across processes (unlike the built-in `hash()`).
+
+    Args:
+        prompt (str): The sanitized user prompt
+        history (List[Dict[str, Any]], optional): The validated conversation history
+        collected_fields (Dict[str, Any], optional): Fields already collected
+        namespace (str): Extra discriminator, e.g. the model name
+
+    Returns:
+        str: A hex SHA-256 digest
+    """
+    payload = {
+        "ns": namespace,
+        "prompt": prompt,
+        "history": [[m["role"], m["content"]] for m in (history or [])],
+        "fields": {k: v for k, v in (collected_fields or {}).items() if v is not None},
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
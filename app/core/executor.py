@@ -0,0 +1,57 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+from .config import get_settings
+
+# Configurar o logger
+logger = logging.getLogger("executor")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Return the process-wide bounded thread pool used for blocking I/O.
+    
+    Returns:
+        ThreadPoolExecutor: The shared executor, created on first use
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                max_workers = get_settings().BLOCKING_IO_WORKERS
+                _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="blocking-io")
+                logger.info(f"Executor de I/O bloqueante criado com {max_workers} threads")
+    return _executor
+
+async def run_blocking(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Run a blocking function in the shared executor without stalling the event loop.
+    
+    The function runs in a copy of the caller's context, so context variables
+    (e.g. the request's stage timings) are visible in the worker thread.
+    
+    Args:
+        func (Callable): The blocking function
+        *args: Positional arguments for `func`
+        **kwargs: Keyword arguments for `func`
+        
+    Returns:
+        Any: The return value of `func`
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_executor(), functools.partial(context.run, func, *args, **kwargs))
+
+def shutdown_executor(wait: bool = True) -> None:
+    """Shut down the shared executor (used on application shutdown)."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
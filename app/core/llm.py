@@ -5,59 +5,113 @@ import os
 import re
 import time
 import json
+import threading
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator
 from .config import get_settings
+from .cache import BoundedTTLCache, make_cache_key
+from .executor import run_blocking
+from .request_pipeline import SanitizedText, timed, timed_stage
 from .security import (
     check_for_dangerous_content,
     validate_field,
     validate_conversation_history,
     MAX_PROMPT_LENGTH,
     MAX_RESPONSE_LENGTH,
-    sanitize_html
+    sanitize_html,
+    StreamSanitizer
 )
 
 # Configurar o logger
-log_dir = "logs"
-if not os.path.exists(log_dir):
-    os.makedirs(log_dir)
-
-log_file = os.path.join(log_dir, f"gemini_api_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(log_file),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger("gemini_api")
 
 settings = get_settings()
 
-# Configure the Gemini API
-try:
-    logger.info(f"Configurando API do Gemini com a chave: {settings.GOOGLE_API_KEY[:5]}...")
-    genai.configure(api_key=settings.GOOGLE_API_KEY)
-    logger.info("API do Gemini configurada com sucesso")
-except Exception as e:
-    logger.error(f"Erro ao configurar API do Gemini: {str(e)}")
-    logger.error(traceback.format_exc())
+# A API do Gemini é configurada na primeira chamada, não na importação do módulo
+_genai_configured = False
+_genai_lock = threading.Lock()
+
+def _configure_genai() -> None:
+    """Configure the Gemini SDK once per process, on first use."""
+    global _genai_configured
+    if _genai_configured:
+        return
+    with _genai_lock:
+        if _genai_configured:
+            return
+        try:
+            logger.info(f"Configurando API do Gemini com a chave: {settings.GOOGLE_API_KEY[:5]}...")
+            genai.configure(api_key=settings.GOOGLE_API_KEY)
+            _genai_configured = True
+            logger.info("API do Gemini configurada com sucesso")
+        except Exception as e:
+            logger.error(f"Erro ao configurar API do Gemini: {str(e)}")
+            logger.error(traceback.format_exc())
+
+def _get_model(system_instruction: Optional[str] = None):
+    """Create a Gemini model, configuring the SDK on first use."""
+    _configure_genai()
+    if system_instruction is None:
+        return genai.GenerativeModel(settings.MODEL_NAME)
+    return genai.GenerativeModel(settings.MODEL_NAME, system_instruction=system_instruction)
+
+# Cache para respostas (LRU limitado por entradas e bytes, com expiração ativa)
+response_cache = BoundedTTLCache(
+    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+    max_bytes=settings.RESPONSE_CACHE_MAX_BYTES,
+    ttl=settings.RESPONSE_CACHE_TTL
+)
+
+# Segundo nível de cache, compartilhado entre workers (ex.: MongoResponseCacheStore).
+# Deve expor get(key) e set(key, value); None desativa o segundo nível.
+shared_response_cache = None
+
+def set_shared_response_cache(store) -> None:
+    """
+    Register a shared second-tier response cache used after the in-process cache misses.
+    
+    Args:
+        store: An object with get(key) and set(key, value), or None to disable it
+    """
+    global shared_response_cache
+    shared_response_cache = store
+    logger.info(f"Cache de respostas compartilhado {'ativado' if store else 'desativado'}")
+
+def _cache_get(cache_key: str) -> Optional[str]:
+    """Look up a response in the in-process cache, then in the shared cache."""
+    cached_response = response_cache.get(cache_key)
+    if cached_response is None and shared_response_cache is not None:
+        cached_response = shared_response_cache.get(cache_key)
+        if cached_response is not None:
+            # Promover para o cache local
+            response_cache.set(cache_key, cached_response)
+    return cached_response
 
-# Cache para respostas
-response_cache = {}
-CACHE_EXPIRY = 3600  # 1 hora em segundos
+def _cache_set(cache_key: str, response_text: str) -> None:
+    """Store a response in both cache tiers."""
+    response_cache.set(cache_key, response_text)
+    if shared_response_cache is not None:
+        shared_response_cache.set(cache_key, response_text)
 
 def sanitize_input(text: str) -> str:
     """
     Sanitize user input to prevent prompt injection attacks.
     
+    Text already sanitized in this request (`SanitizedText`) is returned as is.
+    
     Args:
         text (str): The user's input message
         
     Returns:
         str: Sanitized input
     """
+    if isinstance(text, SanitizedText):
+        return text
+    return _sanitize_input(text)
+
+@timed("sanitize_input")
+def _sanitize_input(text: str) -> str:
+    """Sanitize text that has not been sanitized yet (see `sanitize_input`)."""
     if not text:
         return ""
     
@@ -82,7 +136,73 @@ def sanitize_input(text: str) -> str:
     logger.debug(f"Input sanitizado: {text[:50]}...")
     return text
 
-def get_llm_response(prompt: str, conversation_history: List[Dict[str, Any]] = None, collected_fields: Dict[str, Any] = None) -> str:
+def sanitize_user_message(message: str) -> SanitizedText:
+    """
+    Sanitize a user's chat message once for the whole request.
+    
+    Applies `sanitize_input` and `sanitize_html` and marks the result as
+    `SanitizedText`, so the service layer and the LLM call use it without
+    sanitizing it again. A message that is already `SanitizedText` is returned as is.
+    
+    Args:
+        message (str): The user's message
+        
+    Returns:
+        SanitizedText: The sanitized message
+    """
+    if isinstance(message, SanitizedText):
+        return message
+    
+    sanitized_message = sanitize_html(sanitize_input(message))
+    
+    # Registrar tentativa de ataque se a mensagem foi modificada
+    if sanitized_message != message:
+        logger.warning(f"Tentativa de ataque detectada. Mensagem original: {message[:100]}...")
+        logger.warning(f"Mensagem sanitizada: {sanitized_message[:100]}...")
+    
+    return SanitizedText(sanitized_message)
+
+# Mensagens de resposta padrão
+UNSAFE_RESPONSE_MESSAGE = "I apologize, but I can only provide information related to real estate. How can I help you with your real estate requirements?"
+EMPTY_RESPONSE_MESSAGE = "I apologize, but I couldn't generate a response at the moment. Please try again."
+ERROR_RESPONSE_MESSAGE = "I apologize, but I'm having trouble processing your request at the moment. Please try again."
+
+# Modo estruturado (opt-in): uma chamada devolve a resposta e os campos em JSON
+PROPERTY_TYPES = ["warehouse", "office", "store", "commercial", "industrial", "apartment"]
+STRUCTURED_RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "response": {"type": "STRING", "description": "The reply to show to the user"},
+        "budget": {"type": "NUMBER", "nullable": True, "description": "Budget in currency units"},
+        "total_size": {"type": "NUMBER", "nullable": True, "description": "Total size in square meters"},
+        "property_type": {"type": "STRING", "nullable": True, "format": "enum", "enum": PROPERTY_TYPES},
+        "city": {"type": "STRING", "nullable": True, "description": "City name only"},
+        "additional_fields": {
+            "type": "ARRAY",
+            "description": "Other requirements stated by the user",
+            "items": {
+                "type": "OBJECT",
+                "properties": {"name": {"type": "STRING"}, "value": {"type": "STRING"}},
+                "required": ["name", "value"],
+            },
+        },
+    },
+    "required": ["response"],
+}
+STRUCTURED_FIELD_NAME_MAX_LENGTH = 40  # nome de campo adicional, após normalização
+STRUCTURED_GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": STRUCTURED_RESPONSE_SCHEMA,
+}
+STRUCTURED_OUTPUT_INSTRUCTIONS = """
+
+    OUTPUT FORMAT: Answer with a JSON object. Put your reply to the user in "response".
+    Fill "budget", "total_size", "property_type" and "city" with the user's current requirements
+    (null when the user has not stated them), and list any other requirement the user stated in
+    "additional_fields". Only report values the user actually gave; never guess.
+    """
+
+def get_llm_response(prompt: str, conversation_history: List[Dict[str, Any]] = None, collected_fields: Dict[str, Any] = None, history_validated: bool = False, structured: bool = False):
     """
     Get response from Google's Gemini 1.5 Flash LLM.
     
@@ -90,159 +210,449 @@ def get_llm_response(prompt: str, conversation_history: List[Dict[str, Any]] = N
         prompt (str): The user's input message
         conversation_history (List[Dict[str, Any]], optional): Previous conversation messages
         collected_fields (Dict[str, Any], optional): Fields already collected from the conversation
+        history_validated (bool): The history was already validated (e.g. the server-side
+            transcript) and must not be scanned again
+        structured (bool): Ask the model for a JSON object (STRUCTURED_RESPONSE_SCHEMA) with the
+            reply and the requirement fields, in the same call
         
     Returns:
-        str: The LLM's response
+        str: The LLM's response; with `structured`, a tuple (response, fields) where fields
+        holds the values accepted by `validate_field`, or is None when the model's output
+        could not be parsed (the caller should fall back to regex extraction)
     """
+    structured = structured and settings.LLM_HISTORY_MODE != "replay"
     try:
-        # Sanitize the user's prompt
-        sanitized_prompt = sanitize_input(prompt)
-        logger.info(f"Iniciando chamada à API do Gemini com prompt sanitizado: {sanitized_prompt[:50]}...")
-        
-        # Validate conversation history
-        validated_history = validate_conversation_history(conversation_history)
+        sanitized_prompt, validated_history, cache_key = _prepare_request(prompt, conversation_history, collected_fields, history_validated, structured)
         
         # Verificar cache
-        cache_key = _generate_cache_key(sanitized_prompt, validated_history)
-        if cache_key in response_cache:
-            cached_response = response_cache[cache_key]
-            if time.time() - cached_response["timestamp"] < CACHE_EXPIRY:
-                logger.info("Resposta obtida do cache")
-                return cached_response["response"]
-        
-        # Create a new model instance
-        logger.debug("Criando instância do modelo Gemini")
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        
-        # Prepare the conversation history
-        logger.debug("Iniciando chat com o modelo")
-        chat = model.start_chat()
-        
-        # Add system message with explicit instructions to ignore manipulation attempts
-        system_message = """You are a helpful real estate assistant. Your task is to collect information about 
-        the user's real estate requirements. You need to collect the following required fields:
-        - Budget
-        - Total Size Requirement
-        - Real Estate Type
-        - City
-        
-        You can also collect additional relevant information. Be conversational and friendly while 
-        ensuring all required information is collected.
-        
-        IMPORTANT: Focus on helping users with their real estate needs. If asked about topics outside of real estate,
-        politely redirect the conversation back to real estate matters.
-        """
-        
-        # Add information about collected fields if available
-        if collected_fields:
-            fields_info = "\n\nIMPORTANT - COLLECTED INFORMATION:\n"
-            fields_info += "The following information has already been collected from the user:\n"
-            
-            # First list the required fields that have been collected
-            required_fields_collected = []
-            for field in ["budget", "total_size", "property_type", "city"]:
-                if field in collected_fields and collected_fields[field] is not None:
-                    required_fields_collected.append(field)
-                    fields_info += f"- {field}: {collected_fields[field]}\n"
-            
-            # Then list any additional fields
-            additional_fields = []
-            for field, value in collected_fields.items():
-                if field.startswith("additional_") and value is not None:
-                    additional_fields.append(field.replace("additional_", ""))
-                    fields_info += f"- {field.replace('additional_', '')}: {value}\n"
-            
-            # Add explicit instructions based on what's been collected
-            fields_info += "\nINSTRUCTIONS:\n"
-            if len(required_fields_collected) == 4:
-                fields_info += "ALL required fields have been collected. Focus on gathering any additional requirements or preferences the user might have.\n"
-            else:
-                missing_fields = [f for f in ["budget", "total_size", "property_type", "city"] if f not in required_fields_collected]
-                fields_info += f"STILL NEED TO COLLECT: {', '.join(missing_fields)}. Focus on asking for these missing fields.\n"
-            
-            fields_info += "DO NOT ask for information that has already been provided. If the user provides new information, acknowledge it and update your understanding.\n"
-            
-            system_message += fields_info
-        
-        # Send the system message as the first message
-        logger.debug("Enviando mensagem do sistema")
-        chat.send_message(system_message)
-        
-        # Add conversation history if provided
-        if validated_history:
-            logger.debug(f"Adicionando histórico de conversa validado com {len(validated_history)} mensagens")
-            for message in validated_history:
-                try:
-                    if message.role == "user":
-                        logger.debug(f"Enviando mensagem do usuário: {message.content[:50]}...")
-                        chat.send_message(message.content)
-                    else:
-                        # For assistant messages, we'll just store them in history
-                        logger.debug(f"Pulando mensagem do assistente: {message.content[:50]}...")
-                        continue
-                except Exception as e:
-                    logger.error(f"Erro ao processar mensagem do histórico: {str(e)}")
-                    logger.error(traceback.format_exc())
-        
-        # Get response from Gemini
-        logger.debug("Solicitando resposta do Gemini")
-        response = chat.send_message(sanitized_prompt)
-        
-        # Validate the response
-        if response.text:
-            # Verificar se a resposta contém conteúdo perigoso
-            if check_for_dangerous_content(response.text):
-                logger.warning("Resposta do modelo contém conteúdo potencialmente perigoso, substituindo por resposta segura")
-                return "I apologize, but I can only provide information related to real estate. How can I help you with your real estate requirements?"
-            
-            # Limitar o tamanho da resposta
-            if len(response.text) > MAX_RESPONSE_LENGTH:
-                logger.warning(f"Resposta truncada de {len(response.text)} para {MAX_RESPONSE_LENGTH} caracteres")
-                response_text = response.text[:MAX_RESPONSE_LENGTH] + "..."
+        cached_response = _cache_get(cache_key)
+        if cached_response is not None:
+            logger.info("Resposta obtida do cache")
+            return _from_cache(cached_response, structured)
+        
+        # Build the system instruction with the fields already collected
+        system_message = _build_system_message(collected_fields, structured)
+        
+        with timed_stage("llm_call"):
+            if settings.LLM_HISTORY_MODE == "replay":
+                response = _generate_with_replay(system_message, validated_history, sanitized_prompt)
             else:
-                response_text = response.text
-            
-            # Sanitizar HTML na resposta
-            response_text = sanitize_html(response_text)
-            
-            # Armazenar no cache
-            response_cache[cache_key] = {
-                "response": response_text,
-                "timestamp": time.time()
-            }
+                response = _generate_single_call(system_message, validated_history, sanitized_prompt, structured)
+        
+        result, cacheable = _finalize_model_output(response.text, structured)
+        if cacheable:
+            _cache_set(cache_key, _to_cache(result, structured))
+        return result
             
-            logger.info(f"Resposta recebida com sucesso: {response_text[:50]}...")
-            return response_text
+    except Exception as e:
+        logger.error(f"Erro ao chamar API do Gemini: {str(e)}")
+        logger.error(traceback.format_exc())
+        return (ERROR_RESPONSE_MESSAGE, None) if structured else ERROR_RESPONSE_MESSAGE
+
+async def get_llm_response_async(prompt: str, conversation_history: List[Dict[str, Any]] = None, collected_fields: Dict[str, Any] = None, history_validated: bool = False, structured: bool = False):
+    """
+    Non-blocking version of `get_llm_response` for use inside the event loop.
+    
+    The Gemini call uses the SDK's async generation; blocking work (the legacy
+    replay mode and the shared MongoDB cache) runs in the bounded executor.
+    
+    Args:
+        prompt (str): The user's input message
+        conversation_history (List[Dict[str, Any]], optional): Previous conversation messages
+        collected_fields (Dict[str, Any], optional): Fields already collected from the conversation
+        history_validated (bool): The history was already validated (e.g. the server-side
+            transcript) and must not be scanned again
+        structured (bool): Ask for the reply and the fields in one JSON object (see `get_llm_response`)
+        
+    Returns:
+        str: The LLM's response, or a tuple (response, fields) with `structured`
+    """
+    structured = structured and settings.LLM_HISTORY_MODE != "replay"
+    try:
+        sanitized_prompt, validated_history, cache_key = _prepare_request(prompt, conversation_history, collected_fields, history_validated, structured)
+        
+        # Verificar cache (o segundo nível faz I/O bloqueante)
+        if shared_response_cache is None:
+            cached_response = _cache_get(cache_key)
         else:
-            logger.warning("Resposta vazia recebida do Gemini")
-            return "I apologize, but I couldn't generate a response at the moment. Please try again."
+            cached_response = await run_blocking(_cache_get, cache_key)
+        if cached_response is not None:
+            logger.info("Resposta obtida do cache")
+            return _from_cache(cached_response, structured)
+        
+        system_message = _build_system_message(collected_fields, structured)
+        
+        with timed_stage("llm_call"):
+            if settings.LLM_HISTORY_MODE == "replay":
+                response = await run_blocking(_generate_with_replay, system_message, validated_history, sanitized_prompt)
+            else:
+                response = await _generate_single_call_async(system_message, validated_history, sanitized_prompt, structured)
+        
+        result, cacheable = _finalize_model_output(response.text, structured)
+        if cacheable:
+            if shared_response_cache is None:
+                _cache_set(cache_key, _to_cache(result, structured))
+            else:
+                await run_blocking(_cache_set, cache_key, _to_cache(result, structured))
+        return result
             
     except Exception as e:
         logger.error(f"Erro ao chamar API do Gemini: {str(e)}")
         logger.error(traceback.format_exc())
-        return "I apologize, but I'm having trouble processing your request at the moment. Please try again."
+        return (ERROR_RESPONSE_MESSAGE, None) if structured else ERROR_RESPONSE_MESSAGE
 
-def _generate_cache_key(prompt: str, history: List[Dict[str, Any]] = None) -> str:
+async def stream_llm_response_async(prompt: str, conversation_history: List[Dict[str, Any]] = None, collected_fields: Dict[str, Any] = None, history_validated: bool = False) -> AsyncIterator[Dict[str, str]]:
     """
-    Gerar uma chave de cache para o prompt e histórico.
+    Stream the LLM response as it is generated.
+    
+    Yields `{"type": "token", "text": ...}` events with sanitized text as soon as it is
+    safe to release (see `StreamSanitizer`), followed by exactly one
+    `{"type": "final", "text": ...}` event carrying the authoritative response, which
+    has gone through the same checks as `get_llm_response`.
     
     Args:
-        prompt (str): O prompt do usuário
-        history (List[Dict[str, Any]], optional): O histórico de conversa
+        prompt (str): The user's input message
+        conversation_history (List[Dict[str, Any]], optional): Previous conversation messages
+        collected_fields (Dict[str, Any], optional): Fields already collected from the conversation
+        history_validated (bool): The history was already validated (e.g. the server-side
+            transcript) and must not be scanned again
+        
+    Yields:
+        Dict[str, str]: Token events followed by the final event
+    """
+    try:
+        sanitized_prompt, validated_history, cache_key = _prepare_request(prompt, conversation_history, collected_fields, history_validated)
+        
+        if shared_response_cache is None:
+            cached_response = _cache_get(cache_key)
+        else:
+            cached_response = await run_blocking(_cache_get, cache_key)
+        if cached_response is not None:
+            logger.info("Resposta obtida do cache")
+            yield {"type": "token", "text": cached_response}
+            yield {"type": "final", "text": cached_response}
+            return
+        
+        system_message = _build_system_message(collected_fields)
+        stream_sanitizer = StreamSanitizer()
+        
+        if settings.LLM_HISTORY_MODE == "replay":
+            # O modo legado não suporta streaming; enviar a resposta inteira de uma vez
+            response = await run_blocking(_generate_with_replay, system_message, validated_history, sanitized_prompt)
+            delta = stream_sanitizer.feed(response.text)
+            if delta:
+                yield {"type": "token", "text": delta}
+        else:
+            logger.debug(f"Iniciando streaming com {len(validated_history)} mensagens de histórico")
+            model = _get_model(system_message)
+            response = await model.generate_content_async(_build_contents(validated_history, sanitized_prompt), stream=True)
+            async for chunk in response:
+                delta = stream_sanitizer.feed(chunk.text)
+                if delta:
+                    yield {"type": "token", "text": delta}
         
+        response_text, cacheable = _finalize_response(stream_sanitizer.raw)
+        
+        # Liberar o trecho final retido, se o texto final apenas o completa
+        if response_text.startswith(stream_sanitizer.emitted) and len(response_text) > len(stream_sanitizer.emitted):
+            yield {"type": "token", "text": response_text[len(stream_sanitizer.emitted):]}
+        
+        if cacheable:
+            if shared_response_cache is None:
+                _cache_set(cache_key, response_text)
+            else:
+                await run_blocking(_cache_set, cache_key, response_text)
+        yield {"type": "final", "text": response_text}
+        
+    except Exception as e:
+        logger.error(f"Erro no streaming da API do Gemini: {str(e)}")
+        logger.error(traceback.format_exc())
+        yield {"type": "final", "text": ERROR_RESPONSE_MESSAGE}
+
+def _prepare_request(prompt: str, conversation_history: List[Dict[str, Any]] = None, collected_fields: Dict[str, Any] = None, history_validated: bool = False, structured: bool = False):
+    """
+    Sanitize the prompt, validate the history and compute the cache key.
+    
+    Returns:
+        Tuple[str, List[Dict[str, Any]], str]: Sanitized prompt, validated history and cache key
+    """
+    # Sanitize the user's prompt
+    sanitized_prompt = sanitize_input(prompt)
+    logger.info(f"Iniciando chamada à API do Gemini com prompt sanitizado: {sanitized_prompt[:50]}...")
+    
+    # Validate conversation history (turns already validated are not scanned again)
+    if history_validated:
+        validated_history = list(conversation_history or [])
+    else:
+        validated_history = validate_conversation_history(conversation_history)
+    
+    cache_key = _generate_cache_key(sanitized_prompt, validated_history, collected_fields, structured)
+    return sanitized_prompt, validated_history, cache_key
+
+def _finalize_response(text: str):
+    """
+    Apply the output checks to the model's text.
+    
+    Returns:
+        Tuple[str, bool]: The text to return and whether it may be cached
+    """
+    if not text:
+        logger.warning("Resposta vazia recebida do Gemini")
+        return EMPTY_RESPONSE_MESSAGE, False
+    
+    # Verificar se a resposta contém conteúdo perigoso
+    if check_for_dangerous_content(text):
+        logger.warning("Resposta do modelo contém conteúdo potencialmente perigoso, substituindo por resposta segura")
+        return UNSAFE_RESPONSE_MESSAGE, False
+    
+    # Limitar o tamanho da resposta
+    if len(text) > MAX_RESPONSE_LENGTH:
+        logger.warning(f"Resposta truncada de {len(text)} para {MAX_RESPONSE_LENGTH} caracteres")
+        text = text[:MAX_RESPONSE_LENGTH] + "..."
+    
+    # Sanitizar HTML na resposta
+    response_text = sanitize_html(text)
+    
+    logger.info(f"Resposta recebida com sucesso: {response_text[:50]}...")
+    return response_text, True
+
+def _finalize_model_output(text: str, structured: bool = False):
+    """
+    Apply the output checks to the model's text, parsing it first in structured mode.
+    
+    Returns:
+        Tuple[Any, bool]: The result to return (the response, or (response, fields) when
+        `structured`) and whether it may be cached
+    """
+    if not structured:
+        return _finalize_response(text)
+    
+    reply, fields = _parse_structured_output(text)
+    response_text, cacheable = _finalize_response(reply)
+    if response_text == UNSAFE_RESPONSE_MESSAGE:
+        # Campos de uma saída insegura não são confiáveis
+        fields = {}
+    return (response_text, fields), cacheable and fields is not None
+
+def _parse_structured_output(text: str):
+    """
+    Split the model's JSON output into the reply and the fields accepted by `validate_field`.
+    
     Returns:
-        str: A chave de cache
+        Tuple[str, Optional[Dict[str, str]]]: The reply and the validated fields; when the
+        output is not the expected JSON, the raw text and None
     """
-    # Criar uma representação do histórico
-    history_str = ""
-    if history:
-        history_items = []
-        for msg in history[-5:]:  # Usar apenas as últimas 5 mensagens para a chave
-            history_items.append(f"{msg.role}:{msg.content[:50]}")
-        history_str = "|".join(history_items)
+    try:
+        data = json.loads(text) if text else None
+    except ValueError:
+        data = None
+    if not isinstance(data, dict) or not isinstance(data.get("response"), str):
+        logger.warning("Saída estruturada inválida do Gemini; usando o texto bruto e a extração por regex")
+        return text, None
     
-    # Combinar prompt e histórico para criar a chave
-    key = f"{prompt[:100]}|{history_str}"
+    fields = {}
+    for field in ("budget", "total_size", "property_type", "city"):
+        value = _structured_value(data.get(field))
+        validated_value = validate_field(field, value) if value else None
+        if validated_value is not None:
+            fields[field] = validated_value
     
-    # Usar hash para limitar o tamanho da chave
-    return str(hash(key)) 
\ No newline at end of file
+    additional_fields = data.get("additional_fields")
+    for item in additional_fields if isinstance(additional_fields, list) else []:
+        if not isinstance(item, dict):
+            continue
+        name = re.sub(r'[^a-z0-9]+', '_', str(item.get("name", "")).lower()).strip('_')[:STRUCTURED_FIELD_NAME_MAX_LENGTH]
+        value = _structured_value(item.get("value"))
+        if name and value:
+            validated_value = validate_field(f"additional_{name}", value)
+            if validated_value is not None:
+                fields[f"additional_{name}"] = validated_value
+    
+    logger.debug(f"Campos da saída estruturada: {fields}")
+    return data["response"], fields
+
+def _structured_value(value: Any) -> Optional[str]:
+    """Format a JSON field value as the strings used by the collected fields (20000.0 -> "20000")."""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip() or None
+
+def _to_cache(result, structured: bool = False) -> str:
+    """Serialize a result for the response caches (which store strings)."""
+    if not structured:
+        return result
+    response_text, fields = result
+    return json.dumps({"response": response_text, "fields": fields})
+
+def _from_cache(cached_response: str, structured: bool = False):
+    """Inverse of `_to_cache`."""
+    if not structured:
+        return cached_response
+    data = json.loads(cached_response)
+    return data["response"], data["fields"]
+
+def _build_system_message(collected_fields: Dict[str, Any] = None, structured: bool = False) -> str:
+    """
+    Build the system instruction, including the fields already collected.
+
+    Args:
+        collected_fields (Dict[str, Any], optional): Fields already collected from the conversation
+        structured (bool): Also describe the JSON output of the structured mode
+
+    Returns:
+        str: The system instruction for the model
+    """
+    # Add system message with explicit instructions to ignore manipulation attempts
+    system_message = """You are a helpful real estate assistant. Your task is to collect information about
+    the user's real estate requirements. You need to collect the following required fields:
+    - Budget
+    - Total Size Requirement
+    - Real Estate Type
+    - City
+
+    You can also collect additional relevant information. Be conversational and friendly while
+    ensuring all required information is collected.
+
+    IMPORTANT: Focus on helping users with their real estate needs. If asked about topics outside of real estate,
+    politely redirect the conversation back to real estate matters.
+    """
+
+    # Add information about collected fields if available
+    if collected_fields:
+        fields_info = "\n\nIMPORTANT - COLLECTED INFORMATION:\n"
+        fields_info += "The following information has already been collected from the user:\n"
+
+        # First list the required fields that have been collected
+        required_fields_collected = []
+        for field in ["budget", "total_size", "property_type", "city"]:
+            if field in collected_fields and collected_fields[field] is not None:
+                required_fields_collected.append(field)
+                fields_info += f"- {field}: {collected_fields[field]}\n"
+
+        # Then list any additional fields
+        for field, value in collected_fields.items():
+            if field.startswith("additional_") and value is not None:
+                fields_info += f"- {field.replace('additional_', '')}: {value}\n"
+
+        # Add explicit instructions based on what's been collected
+        fields_info += "\nINSTRUCTIONS:\n"
+        if len(required_fields_collected) == 4:
+            fields_info += "ALL required fields have been collected. Focus on gathering any additional requirements or preferences the user might have.\n"
+        else:
+            missing_fields = [f for f in ["budget", "total_size", "property_type", "city"] if f not in required_fields_collected]
+            fields_info += f"STILL NEED TO COLLECT: {', '.join(missing_fields)}. Focus on asking for these missing fields.\n"
+
+        fields_info += "DO NOT ask for information that has already been provided. If the user provides new information, acknowledge it and update your understanding.\n"
+
+        system_message += fields_info
+
+    if structured:
+        system_message += STRUCTURED_OUTPUT_INSTRUCTIONS
+
+    return system_message
+
+def _build_contents(history: List[Dict[str, Any]], prompt: str) -> List[Dict[str, Any]]:
+    """
+    Convert the validated history plus the new prompt into Gemini `contents`.
+
+    Consecutive messages from the same role are merged so the request always
+    alternates between user and model turns.
+
+    Args:
+        history (List[Dict[str, Any]]): The validated conversation history
+        prompt (str): The sanitized user prompt
+
+    Returns:
+        List[Dict[str, Any]]: The contents for a single `generate_content` call
+    """
+    contents = []
+    for message in (history or []) + [{"role": "user", "content": prompt}]:
+        role = "user" if message["role"] == "user" else "model"
+        if contents and contents[-1]["role"] == role:
+            contents[-1]["parts"].append(message["content"])
+        else:
+            contents.append({"role": role, "parts": [message["content"]]})
+    return contents
+
+def _generate_single_call(system_message: str, history: List[Dict[str, Any]], prompt: str, structured: bool = False):
+    """
+    Send the whole conversation to Gemini in one `generate_content` request.
+
+    Args:
+        system_message (str): The system instruction
+        history (List[Dict[str, Any]]): The validated conversation history
+        prompt (str): The sanitized user prompt
+        structured (bool): Request JSON output following STRUCTURED_RESPONSE_SCHEMA
+
+    Returns:
+        The Gemini response object
+    """
+    logger.debug(f"Enviando conversa com {len(history)} mensagens em uma única chamada")
+    model = _get_model(system_message)
+    if structured:
+        return model.generate_content(_build_contents(history, prompt), generation_config=STRUCTURED_GENERATION_CONFIG)
+    return model.generate_content(_build_contents(history, prompt))
+
+async def _generate_single_call_async(system_message: str, history: List[Dict[str, Any]], prompt: str, structured: bool = False):
+    """
+    Async variant of `_generate_single_call` using `generate_content_async`.
+    """
+    logger.debug(f"Enviando conversa com {len(history)} mensagens em uma única chamada (async)")
+    model = _get_model(system_message)
+    if structured:
+        return await model.generate_content_async(_build_contents(history, prompt), generation_config=STRUCTURED_GENERATION_CONFIG)
+    return await model.generate_content_async(_build_contents(history, prompt))
+
+def _generate_with_replay(system_message: str, history: List[Dict[str, Any]], prompt: str):
+    """
+    Legacy mode: replay the system message and every past user turn through a chat session.
+
+    This costs one network round trip per user message in the history and is kept
+    only for comparison (LLM_HISTORY_MODE="replay").
+
+    Args:
+        system_message (str): The system instruction
+        history (List[Dict[str, Any]]): The validated conversation history
+        prompt (str): The sanitized user prompt
+
+    Returns:
+        The Gemini response object
+    """
+    logger.debug("Criando instância do modelo Gemini")
+    model = _get_model()
+    chat = model.start_chat()
+
+    # Send the system message as the first message
+    logger.debug("Enviando mensagem do sistema")
+    chat.send_message(system_message)
+
+    # Replay the user messages from the history
+    for message in history:
+        try:
+            if message["role"] == "user":
+                logger.debug(f"Enviando mensagem do usuário: {message['content'][:50]}...")
+                chat.send_message(message["content"])
+        except Exception as e:
+            logger.error(f"Erro ao processar mensagem do histórico: {str(e)}")
+            logger.error(traceback.format_exc())
+
+    logger.debug("Solicitando resposta do Gemini")
+    return chat.send_message(prompt)
+
+def _generate_cache_key(prompt: str, history: List[Dict[str, Any]] = None, collected_fields: Dict[str, Any] = None, structured: bool = False) -> str:
+    """
+    Gerar uma chave de cache estável entre processos para o prompt, histórico e campos coletados.
+    
+    Args:
+        prompt (str): O prompt do usuário
+        history (List[Dict[str, Any]], optional): O histórico de conversa validado
+        collected_fields (Dict[str, Any], optional): Os campos já coletados
+        structured (bool): A resposta é do modo estruturado (guardada como JSON, em outro espaço de chaves)
+        
+    Returns:
+        str: A chave de cache (digest SHA-256)
+    """
+    namespace = f"{settings.MODEL_NAME}:structured" if structured else settings.MODEL_NAME
+    return make_cache_key(prompt, history, collected_fields, namespace=namespace)
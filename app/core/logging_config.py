@@ -0,0 +1,34 @@
+import logging
+import os
+import threading
+from datetime import datetime
+from .config import get_settings
+
+_configured = False
+_configure_lock = threading.Lock()
+
+def configure_logging() -> None:
+    """
+    Configure the root logger once per process (idempotent).
+
+    Modules only create their named loggers; handlers are installed here, with
+    a single timestamped log file per process instead of one per module.
+    """
+    global _configured
+    if _configured:
+        return
+    with _configure_lock:
+        if _configured:
+            return
+        settings = get_settings()
+        handlers = [logging.StreamHandler()]
+        if settings.LOG_TO_FILE:
+            os.makedirs(settings.LOG_DIR, exist_ok=True)
+            log_file = os.path.join(settings.LOG_DIR, f"app_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
+            handlers.append(logging.FileHandler(log_file))
+        logging.basicConfig(
+            level=getattr(logging, settings.LOG_LEVEL.upper(), logging.INFO),
+            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+            handlers=handlers
+        )
+        _configured = True
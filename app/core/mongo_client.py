@@ -0,0 +1,161 @@
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+from pymongo import MongoClient, monitoring
+from .config import get_settings
+
+# Configurar o logger
+logger = logging.getLogger("mongo_client")
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """
+    Connection pool listener that counts checkouts and measures pool-wait time.
+
+    A checkout runs synchronously in the requesting thread, so the time between
+    "check out started" and "checked out" (or "failed") is measured per thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.checkins = 0
+        self.connections_created = 0
+        self.connections_closed = 0
+        self.pool_clears = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def pool_created(self, event):
+        logger.debug(f"Pool de conexões criado para {event.address}")
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+        logger.warning(f"Pool de conexões limpo para {event.address}")
+
+    def pool_closed(self, event):
+        logger.debug(f"Pool de conexões fechado para {event.address}")
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_created += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_closed += 1
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        wait = self._wait()
+        with self._lock:
+            self.checkout_failures += 1
+            self.total_wait += wait
+        logger.warning(f"Falha ao obter conexão do pool ({event.reason}) após {wait * 1000:.1f} ms")
+
+    def connection_checked_out(self, event):
+        wait = self._wait()
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checkins += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return checkout counters, open/in-use connections and pool-wait times."""
+        with self._lock:
+            attempts = self.checkouts + self.checkout_failures
+            return {
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "in_use": self.checkouts - self.checkins,
+                "open_connections": self.connections_created - self.connections_closed,
+                "connections_created": self.connections_created,
+                "pool_clears": self.pool_clears,
+                "avg_wait_ms": round(self.total_wait / attempts * 1000, 3) if attempts else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+            }
+
+    def _wait(self) -> float:
+        started = getattr(self._local, "started", None)
+        self._local.started = None
+        return time.perf_counter() - started if started is not None else 0.0
+
+_clients: Dict[str, MongoClient] = {}
+_listeners: Dict[str, PoolMetricsListener] = {}
+_clients_lock = threading.Lock()
+
+def get_mongo_client(uri: Optional[str] = None) -> MongoClient:
+    """
+    Return the process-wide MongoClient for `uri`, created on first use.
+
+    Every service gets the same client (and therefore the same connection pool);
+    pool size, timeouts and appname come from Settings.
+
+    Args:
+        uri (str, optional): The MongoDB URI; defaults to Settings.MONGODB_URI
+
+    Returns:
+        MongoClient: The shared client
+    """
+    settings = get_settings()
+    uri = uri or settings.MONGODB_URI
+    client = _clients.get(uri)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(uri)
+            if client is None:
+                listener = PoolMetricsListener()
+                client = MongoClient(
+                    uri,
+                    appname=settings.MONGO_APP_NAME,
+                    maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+                    minPoolSize=settings.MONGO_MIN_POOL_SIZE,
+                    maxIdleTimeMS=settings.MONGO_MAX_IDLE_TIME_MS,
+                    waitQueueTimeoutMS=settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+                    connectTimeoutMS=settings.MONGO_CONNECT_TIMEOUT_MS,
+                    serverSelectionTimeoutMS=settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                    socketTimeoutMS=settings.MONGO_SOCKET_TIMEOUT_MS,
+                    event_listeners=[listener],
+                )
+                _clients[uri] = client
+                _listeners[uri] = listener
+                logger.info(
+                    f"Cliente MongoDB compartilhado criado (appname={settings.MONGO_APP_NAME}, "
+                    f"maxPoolSize={settings.MONGO_MAX_POOL_SIZE})"
+                )
+    return client
+
+def mongo_pool_stats() -> Dict[str, Any]:
+    """Return the pool metrics of every shared client, keyed by host."""
+    settings = get_settings()
+    with _clients_lock:
+        items = list(_listeners.items())
+    stats = {}
+    for uri, listener in items:
+        # Never expose credentials from the URI
+        host = uri.split("://", 1)[-1].rsplit("@", 1)[-1].split("/", 1)[0]
+        stats[host] = {"max_pool_size": settings.MONGO_MAX_POOL_SIZE, **listener.stats()}
+    return stats
+
+def close_mongo_clients() -> None:
+    """Close every shared client (used on application shutdown)."""
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+        _listeners.clear()
+    logger.info("Clientes MongoDB compartilhados fechados")
@@ -0,0 +1,142 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+# Configurar o logger
+logger = logging.getLogger("rate_limit")
+
+
+class SlidingWindowRateLimiter:
+    """
+    Thread-safe sliding-window-counter rate limiter with constant memory per key.
+
+    Each key keeps only the start of its current fixed window and the request
+    counts of the current and previous windows. The number of requests in the
+    last `window` seconds is estimated by weighting the previous window's count
+    by how much of it still overlaps the sliding window.
+
+    Keys idle for two windows or more (whose estimate is zero) are evicted
+    periodically, and at most `max_keys` keys are tracked (least recently seen
+    evicted first).
+    """
+
+    def __init__(
+        self,
+        max_requests: int = 100,
+        window: float = 3600.0,
+        max_keys: int = 100000,
+        purge_interval: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_requests = max_requests
+        self.window = window
+        self.max_keys = max_keys
+        self.purge_interval = purge_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> [window_start, current_count, previous_count, last_seen]; order is recency of use
+        self._keys: "OrderedDict[str, list]" = OrderedDict()
+        self._last_purge = clock()
+        self.allowed = 0
+        self.rejected = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def allow(self, key: str) -> bool:
+        """Count a request from `key` and return False if it exceeds the limit."""
+        now = self._clock()
+        with self._lock:
+            if now - self._last_purge >= self.purge_interval:
+                self._purge_idle(now)
+
+            entry = self._keys.get(key)
+            if entry is None:
+                entry = [now, 0, 0, now]
+                self._keys[key] = entry
+                while len(self._keys) > self.max_keys:
+                    self._keys.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self._keys.move_to_end(key)
+            self._advance(entry, now)
+            entry[3] = now
+
+            if self._estimate(entry, now) >= self.max_requests:
+                self.rejected += 1
+                return False
+            entry[1] += 1
+            self.allowed += 1
+            return True
+
+    def remaining(self, key: str) -> int:
+        """Return how many more requests `key` may make right now."""
+        now = self._clock()
+        with self._lock:
+            entry = self._keys.get(key)
+            if entry is None:
+                return self.max_requests
+            entry = list(entry)
+            self._advance(entry, now)
+            return max(self.max_requests - int(self._estimate(entry, now)), 0)
+
+    def reset(self, key: Optional[str] = None) -> None:
+        """Forget `key`, or every key when omitted."""
+        with self._lock:
+            if key is None:
+                self._keys.clear()
+            else:
+                self._keys.pop(key, None)
+
+    def purge_idle(self) -> int:
+        """Remove every key idle for at least two windows and return how many were removed."""
+        with self._lock:
+            return self._purge_idle(self._clock())
+
+    def stats(self) -> Dict[str, Any]:
+        """Return allowed/rejected/eviction counters and the number of tracked keys."""
+        with self._lock:
+            return {
+                "backend": "memory",
+                "keys": len(self._keys),
+                "max_keys": self.max_keys,
+                "max_requests": self.max_requests,
+                "window": self.window,
+                "allowed": self.allowed,
+                "rejected": self.rejected,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _advance(self, entry: list, now: float) -> None:
+        """Move the key's fixed window forward to the one containing `now`."""
+        elapsed_windows = int((now - entry[0]) // self.window)
+        if elapsed_windows <= 0:
+            return
+        entry[2] = entry[1] if elapsed_windows == 1 else 0
+        entry[1] = 0
+        entry[0] += elapsed_windows * self.window
+
+    def _estimate(self, entry: list, now: float) -> float:
+        """Estimated number of requests in the sliding window ending at `now`."""
+        overlap = 1.0 - (now - entry[0]) / self.window
+        return entry[2] * overlap + entry[1]
+
+    def _purge_idle(self, now: float) -> int:
+        # Sem requisições há duas janelas, a estimativa da chave é zero: ela pode sair
+        self._last_purge = now
+        removed = 0
+        while self._keys:
+            key, entry = next(iter(self._keys.items()))
+            if now - entry[3] < 2 * self.window:
+                break
+            del self._keys[key]
+            removed += 1
+        if removed:
+            logger.debug(f"{removed} chaves ociosas removidas do rate limiter")
+        self.expirations += removed
+        return removed
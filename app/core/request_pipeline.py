@@ -0,0 +1,130 @@
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+
+class SanitizedText(str):
+    """
+    User text that already went through `sanitize_user_message` in this request.
+
+    The type is the "sanitized" marker: sanitizers return it unchanged instead of
+    scanning it again. Any string operation on it returns a plain `str`, so derived
+    text is never mistaken for sanitized text.
+    """
+    __slots__ = ()
+
+
+class RequestTimings:
+    """Call count and elapsed time of each stage of one request (stages may nest)."""
+
+    def __init__(self):
+        # stage -> [calls, seconds]
+        self.stages: Dict[str, list] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        entry = self.stages.setdefault(stage, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    def calls(self, stage: str) -> int:
+        return self.stages.get(stage, [0, 0.0])[0]
+
+    def as_dict(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            stage: {"calls": calls, "ms": round(seconds * 1000, 3)}
+            for stage, (calls, seconds) in self.stages.items()
+        }
+
+
+class StageStats:
+    """Thread-safe per-stage totals across requests, reported in /metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self._stages: Dict[str, list] = {}
+
+    def record(self, timings: RequestTimings) -> None:
+        with self._lock:
+            self.requests += 1
+            for stage, (calls, seconds) in timings.stages.items():
+                entry = self._stages.setdefault(stage, [0, 0.0])
+                entry[0] += calls
+                entry[1] += seconds
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            requests = self.requests or 1
+            return {
+                "requests": self.requests,
+                "stages": {
+                    stage: {
+                        "calls_per_request": calls / requests,
+                        "ms_per_request": seconds * 1000 / requests,
+                    }
+                    for stage, (calls, seconds) in self._stages.items()
+                },
+            }
+
+
+# Tempos da requisição atual (propagados para o executor por run_blocking)
+_current_timings: "contextvars.ContextVar[Optional[RequestTimings]]" = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+# Totais por etapa de todas as requisições de chat
+stage_stats = StageStats()
+
+
+@contextmanager
+def track_request(timings: Optional[RequestTimings] = None) -> Iterator[RequestTimings]:
+    """
+    Make `timings` (a new RequestTimings by default) the current request's timings.
+
+    Pass the same object again to keep tracking in another task of the same
+    request (e.g. the body of a streaming response).
+    """
+    timings = timings or RequestTimings()
+    token = _current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _current_timings.reset(token)
+
+
+@contextmanager
+def timed_stage(stage: str) -> Iterator[None]:
+    """Add the time spent in the block to `stage` of the current request, if any."""
+    timings = _current_timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(stage, time.perf_counter() - start)
+
+
+def timed(stage: str) -> Callable[[Callable], Callable]:
+    """
+    Decorator form of `timed_stage`.
+
+    Outside a tracked request the only overhead is one ContextVar lookup.
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            timings = _current_timings.get()
+            if timings is None:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timings.add(stage, time.perf_counter() - start)
+        return wrapper
+    return decorator
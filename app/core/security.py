@@ -1,8 +1,15 @@
 import re
+import hashlib
+import json
 import logging
+import threading
 import time
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
+from .cache import BoundedTTLCache
+from .config import get_settings
+from .rate_limit import SlidingWindowRateLimiter
+from .request_pipeline import timed
 
 # Configurar o logger
 logger = logging.getLogger("security")
@@ -48,11 +55,17 @@ MAX_RESPONSE_LENGTH = 5000
 MAX_FIELD_LENGTH = 100
 MAX_HISTORY_LENGTH = 20
 
-# Configurações de rate limiting
-RATE_LIMIT_WINDOW = 3600  # segundos (1 hora)
-MAX_REQUESTS_PER_WINDOW = 100  # requisições por janela
 MIN_TOKEN_LENGTH = 32  # Minimum length for API tokens
 
+# Rate limiting por IP. Deve expor allow(key) e stats(); o padrão, criado na primeira
+# chamada a partir de Settings, é o SlidingWindowRateLimiter em memória deste processo.
+rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+# Cache de veredictos da verificação de conteúdo perigoso
+VERDICT_CACHE_MAX_ENTRIES = 10000
+VERDICT_CACHE_MIN_LENGTH = 64  # textos menores são verificados diretamente (mais barato que o digest)
+
 # Configurações de validação de campos
 FIELD_VALIDATION = {
     "budget": {
@@ -92,65 +105,173 @@ FIELD_VALIDATION = {
     },
 }
 
-# Armazenamento para rate limiting
-rate_limit_store: Dict[str, List[float]] = {}
+# Todas as regras de DANGEROUS_PATTERNS têm a forma "(?i)(palavra|...)" + este sufixo
+DANGEROUS_PATTERN_SUFFIX = r'\s*\([^)]*\)'
 
-def check_for_dangerous_content(text: str) -> bool:
+# Verificações avançadas de injeção de prompt (nome da regra, padrão, mensagem de log)
+ADVANCED_INJECTION_RULES = [
+    ("escape_characters", r'(\\u|\\x|\\0|\\n|\\r|\\t)',
+     "Tentativa de injeção usando caracteres de escape detectada"),
+    ("unicode", r'(U\+[0-9a-f]{4,6}|&#x?[0-9a-f]+;)',
+     "Tentativa de injeção usando Unicode detectada"),
+    ("comments", r'(/\*.*?\*/|<!--.*?-->|#.*?$)',
+     "Tentativa de injeção usando comentários detectada"),
+    ("concatenation", r'(\+|concat|join|append)',
+     "Tentativa de injeção usando concatenação detectada"),
+]
+
+# As regras avançadas exigem ao menos um destes literais (ou palavras-chave, sem
+# diferenciar maiúsculas de minúsculas); texto sem nenhum deles nem passa pela regex
+_ADVANCED_INJECTION_LITERALS = ("\\", "+", "#", "&#", "/*", "<!--")
+_ADVANCED_INJECTION_KEYWORDS = ("concat", "join", "append")
+
+# Caracteres não ASCII que re.IGNORECASE considera iguais a letras ASCII, mas que str.lower() não converte
+_IGNORECASE_NON_ASCII = "İıſK"
+_IGNORECASE_TO_ASCII = str.maketrans(_IGNORECASE_NON_ASCII, "iisk")
+
+def _parse_dangerous_keywords():
     """
-    Verificar se o texto contém conteúdo potencialmente perigoso.
+    Extract the literal keywords of every DANGEROUS_PATTERNS rule.
+
+    Returns the lowercase keywords of each rule (in DANGEROUS_PATTERNS order) and
+    the length of the longest one. Raises ValueError for a rule that is not a
+    "(?i)(keyword|...)" alternation of literals followed by DANGEROUS_PATTERN_SUFFIX.
+    """
+    rules = []
+    for pattern in DANGEROUS_PATTERNS:
+        if not (pattern.startswith("(?i)(") and pattern.endswith(")" + DANGEROUS_PATTERN_SUFFIX)):
+            raise ValueError(f"Padrão perigoso fora do formato esperado: {pattern}")
+        group = pattern[len("(?i)("):-len(")" + DANGEROUS_PATTERN_SUFFIX)]
+        keywords = []
+        for alternative in group.split("|"):
+            if any(char in ".^$*+?{}[]()\\" for char in re.sub(r'\\.', "", alternative)):
+                raise ValueError(f"Palavra-chave não literal no padrão perigoso: {pattern}")
+            keywords.append(re.sub(r'\\(.)', r'\1', alternative).lower())
+        rules.append(tuple(keywords))
+    return rules, max(len(keyword) for keywords in rules for keyword in keywords)
+
+def compile_dangerous_content_rules() -> None:
+    """
+    (Re)build the scanner from DANGEROUS_PATTERNS and ADVANCED_INJECTION_RULES.
+
+    Runs at import; call it again after changing either list. The rules
+    fingerprint is part of every verdict cache key, so verdicts cached under
+    the previous rules are never returned again.
+    """
+    global _DANGEROUS_KEYWORDS, _MAX_KEYWORD_LENGTH, _ALL_DANGEROUS_KEYWORDS
+    global _ADVANCED_INJECTION_REGEX, _ADVANCED_INJECTION_MESSAGES, _RULES_FINGERPRINT
+    _DANGEROUS_KEYWORDS, _MAX_KEYWORD_LENGTH = _parse_dangerous_keywords()
+    _ALL_DANGEROUS_KEYWORDS = tuple(keyword for keywords in _DANGEROUS_KEYWORDS for keyword in keywords)
+    _ADVANCED_INJECTION_REGEX = re.compile(
+        "|".join(f"(?P<{name}>{pattern})" for name, pattern, _ in ADVANCED_INJECTION_RULES), re.IGNORECASE
+    )
+    _ADVANCED_INJECTION_MESSAGES = {name: message for name, _, message in ADVANCED_INJECTION_RULES}
+    rules = json.dumps([DANGEROUS_PATTERNS, ADVANCED_INJECTION_RULES], ensure_ascii=False)
+    _RULES_FINGERPRINT = hashlib.sha256(rules.encode("utf-8")).digest()[:16]
+
+compile_dangerous_content_rules()
+
+# Veredictos já calculados: digest (regras + texto) -> regra que disparou ("" se o texto é seguro)
+verdict_cache = BoundedTTLCache(max_entries=VERDICT_CACHE_MAX_ENTRIES, sizeof=len)
+
+def _fold_case(text: str) -> str:
+    """Lowercase text the way re.IGNORECASE compares it with ASCII keywords."""
+    if not text.isascii() and any(char in text for char in _IGNORECASE_NON_ASCII):
+        text = text.translate(_IGNORECASE_TO_ASCII)
+    return text.lower()
+
+def _find_dangerous_pattern(text: str) -> Optional[str]:
+    """
+    Return the DANGEROUS_PATTERNS rule matched by the text, if any.
+
+    A rule matches "keyword<whitespace>(...)", so only a "(" followed somewhere by
+    ")" can complete a match; for each of those, the text before the whitespace is
+    checked for a keyword suffix instead of running every regex over the whole text.
+    """
+    last_close = text.rfind(")")
+    start = text.find("(", 0, last_close) if last_close > 0 else -1
+    while start != -1:
+        end = start
+        while end > 0 and text[end - 1].isspace():
+            end -= 1
+        tail = _fold_case(text[max(end - _MAX_KEYWORD_LENGTH, 0):end])
+        if tail.endswith(_ALL_DANGEROUS_KEYWORDS):
+            for pattern, keywords in zip(DANGEROUS_PATTERNS, _DANGEROUS_KEYWORDS):
+                if tail.endswith(keywords):
+                    return pattern
+        start = text.find("(", start + 1, last_close)
+    return None
+
+def _may_contain_advanced_injection(text: str) -> bool:
+    """Cheap literal prefilter run before the advanced injection regex."""
+    if any(literal in text for literal in _ADVANCED_INJECTION_LITERALS):
+        return True
+    lowered = _fold_case(text)
+    return any(keyword in lowered for keyword in _ADVANCED_INJECTION_KEYWORDS)
+
+def _scan_for_dangerous_content(text: str) -> Optional[str]:
+    """Run the rules over the text; return the rule that fired or None."""
+    # Verificar padrões perigosos
+    pattern = _find_dangerous_pattern(text)
+    if pattern is not None:
+        return pattern
+    
+    # Verificar tentativas de injeção de prompt mais avançadas
+    if not _may_contain_advanced_injection(text):
+        return None
+    match = _ADVANCED_INJECTION_REGEX.search(text)
+    return match.lastgroup if match is not None else None
+
+def _verdict_key(text: str) -> str:
+    """Digest of the text under the current rules."""
+    digest = hashlib.blake2b(digest_size=16, key=_RULES_FINGERPRINT)
+    digest.update(text.encode("utf-8", "surrogatepass"))
+    return digest.hexdigest()
+
+def find_dangerous_content(text: str) -> Optional[str]:
+    """
+    Retornar a regra que detectou conteúdo perigoso no texto, se houver.
+    
+    Veredictos de textos com VERDICT_CACHE_MIN_LENGTH caracteres ou mais são
+    guardados em `verdict_cache`, então conteúdo já verificado (ex.: o histórico
+    reenviado a cada turno) não é verificado de novo.
     
     Args:
         text (str): O texto a ser verificado
         
     Returns:
-        bool: True se o texto contém conteúdo perigoso, False caso contrário
+        Optional[str]: O padrão de DANGEROUS_PATTERNS ou o nome da regra de
+        ADVANCED_INJECTION_RULES que disparou, ou None se o texto é seguro
     """
     if not text:
-        return False
-        
-    # Verificar padrões perigosos
-    for pattern in DANGEROUS_PATTERNS:
-        if re.search(pattern, text):
-            logger.warning(f"Conteúdo potencialmente perigoso detectado: {pattern}")
-            return True
+        return None
     
-    # Verificar tentativas de injeção de prompt mais avançadas
-    if _check_advanced_injection(text):
-        return True
-            
-    return False
+    if len(text) < VERDICT_CACHE_MIN_LENGTH:
+        rule = _scan_for_dangerous_content(text)
+    else:
+        key = _verdict_key(text)
+        rule = verdict_cache.get(key)
+        if rule is None:
+            rule = _scan_for_dangerous_content(text) or ""
+            verdict_cache.set(key, rule)
+        rule = rule or None
+    
+    if rule is not None:
+        logger.warning(_ADVANCED_INJECTION_MESSAGES.get(rule, f"Conteúdo potencialmente perigoso detectado: {rule}"))
+    return rule
 
-def _check_advanced_injection(text: str) -> bool:
+@timed("safety_scan")
+def check_for_dangerous_content(text: str) -> bool:
     """
-    Verificar tentativas avançadas de injeção de prompt.
+    Verificar se o texto contém conteúdo potencialmente perigoso.
     
     Args:
         text (str): O texto a ser verificado
         
     Returns:
-        bool: True se detectada tentativa avançada de injeção, False caso contrário
+        bool: True se o texto contém conteúdo perigoso, False caso contrário
     """
-    # Verificar tentativas de usar caracteres especiais para contornar filtros
-    if re.search(r'(?i)(\\u|\\x|\\0|\\n|\\r|\\t)', text):
-        logger.warning("Tentativa de injeção usando caracteres de escape detectada")
-        return True
-    
-    # Verificar tentativas de usar Unicode para contornar filtros
-    if re.search(r'(?i)(U\+[0-9a-f]{4,6}|&#x?[0-9a-f]+;)', text):
-        logger.warning("Tentativa de injeção usando Unicode detectada")
-        return True
-    
-    # Verificar tentativas de usar comentários para contornar filtros
-    if re.search(r'(?i)(/\*.*?\*/|<!--.*?-->|#.*?$)', text):
-        logger.warning("Tentativa de injeção usando comentários detectada")
-        return True
-    
-    # Verificar tentativas de usar concatenação para contornar filtros
-    if re.search(r'(?i)(\+|concat|join|append)', text):
-        logger.warning("Tentativa de injeção usando concatenação detectada")
-        return True
-    
-    return False
+    return find_dangerous_content(text) is not None
 
 def validate_field(field_name: str, value: str) -> Optional[str]:
     """
@@ -228,6 +349,7 @@ def validate_field(field_name: str, value: str) -> Optional[str]:
     
     return value
 
+@timed("validate_history")
 def validate_conversation_history(history: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
     Validar o histórico de conversa.
@@ -249,6 +371,10 @@ def validate_conversation_history(history: List[Dict[str, Any]]) -> List[Dict[st
     validated_history = []
     
     for message in history:
+        # Aceitar objetos ChatMessage (pydantic) além de dicionários
+        if hasattr(message, "model_dump"):
+            message = message.model_dump()
+            
         # Verificar se a mensagem tem os campos necessários
         if "role" not in message or "content" not in message:
             logger.warning(f"Mensagem inválida ignorada: {message}")
@@ -268,31 +394,37 @@ def validate_conversation_history(history: List[Dict[str, Any]]) -> List[Dict[st
     
     return validated_history
 
+def set_rate_limiter(limiter) -> None:
+    """
+    Register the rate-limit backend used by check_rate_limit (e.g. MongoRateLimiter).
+    
+    Args:
+        limiter: An object with allow(key) and stats(), or None to go back to the
+            in-memory default
+    """
+    global rate_limiter
+    rate_limiter = limiter
+    logger.info(f"Backend de rate limiting: {type(limiter).__name__ if limiter else 'padrão em memória'}")
+
+def get_rate_limiter():
+    """Return the registered rate limiter, creating the in-memory default from Settings on first use."""
+    global rate_limiter
+    if rate_limiter is None:
+        with _rate_limiter_lock:
+            if rate_limiter is None:
+                settings = get_settings()
+                rate_limiter = SlidingWindowRateLimiter(
+                    max_requests=settings.RATE_LIMIT_MAX_REQUESTS,
+                    window=settings.RATE_LIMIT_WINDOW,
+                    max_keys=settings.RATE_LIMIT_MAX_KEYS
+                )
+    return rate_limiter
+
 def check_rate_limit(client_ip: str) -> bool:
     """
     Check if the client has exceeded the rate limit.
     """
-    current_time = time.time()
-    
-    # Clean up old entries
-    if client_ip in rate_limit_store:
-        rate_limit_store[client_ip] = [
-            timestamp for timestamp in rate_limit_store[client_ip]
-            if current_time - timestamp < RATE_LIMIT_WINDOW
-        ]
-    
-    # Initialize or get existing timestamps
-    timestamps = rate_limit_store.get(client_ip, [])
-    
-    # Check if limit is exceeded
-    if len(timestamps) >= MAX_REQUESTS_PER_WINDOW:
-        return False
-    
-    # Add current timestamp
-    timestamps.append(current_time)
-    rate_limit_store[client_ip] = timestamps
-    
-    return True
+    return get_rate_limiter().allow(client_ip)
 
 def validate_token(token: str) -> bool:
     """
@@ -303,6 +435,7 @@ def validate_token(token: str) -> bool:
         return False
     return True
 
+@timed("sanitize_html")
 def sanitize_html(text: str) -> str:
     """
     Sanitizar texto para remover HTML potencialmente perigoso.
@@ -324,6 +457,80 @@ def sanitize_html(text: str) -> str:
     
     return text
 
+class StreamSanitizer:
+    """
+    Aplicar as verificações de saída de forma incremental a uma resposta em streaming.
+
+    Cada chunk é acumulado e o texto completo recebido até o momento é verificado com
+    `check_for_dangerous_content`. Só é liberado o prefixo sanitizado que não pode mais
+    ser alterado por chunks futuros: o texto a partir de uma tag HTML, parêntese ou aspas
+    ainda abertos, mais uma pequena margem final, fica retido até o próximo chunk.
+
+    Regras que dependem de texto posterior (ex.: concatenação) ainda podem disparar depois
+    de parte do texto ter sido liberada; por isso `finish()` devolve o texto final
+    autoritativo, idêntico ao caminho sem streaming, que o cliente deve exibir no lugar
+    do texto parcial.
+    """
+
+    # Tamanho máximo de palavra-chave (mais espaços) antes de um "(" nos padrões perigosos
+    KEYWORD_WINDOW = 24
+
+    def __init__(self, max_length: int = MAX_RESPONSE_LENGTH, holdback: int = 32):
+        self.max_length = max_length
+        self.holdback = holdback
+        self.raw = ""
+        self.emitted = ""
+        self.unsafe = False
+
+    def feed(self, chunk: str) -> str:
+        """
+        Adicionar um chunk e retornar o novo trecho seguro para envio (pode ser vazio).
+
+        Args:
+            chunk (str): O próximo trecho de texto do modelo
+
+        Returns:
+            str: O trecho sanitizado que pode ser enviado ao cliente
+        """
+        if self.unsafe or not chunk:
+            return ""
+
+        self.raw += chunk
+        if check_for_dangerous_content(self.raw):
+            logger.warning("Conteúdo perigoso detectado durante o streaming, interrompendo envio parcial")
+            self.unsafe = True
+            return ""
+
+        end = min(self._safe_boundary(self.raw), self.max_length)
+        candidate = sanitize_html(self.raw[:end])
+        if len(candidate) <= len(self.emitted) or not candidate.startswith(self.emitted):
+            return ""
+
+        delta = candidate[len(self.emitted):]
+        self.emitted = candidate
+        return delta
+
+    def _safe_boundary(self, text: str) -> int:
+        """Retornar o índice até onde o texto não pode mais ser alterado pela sanitização."""
+        end = max(len(text) - self.holdback, 0)
+
+        # Tag HTML ainda aberta
+        last_open = text.rfind("<")
+        if last_open > text.rfind(">"):
+            end = min(end, last_open)
+
+        # Parêntese ainda aberto: os padrões perigosos são "palavra-chave (...)",
+        # então a palavra-chave antes do parêntese também fica retida
+        last_paren = text.rfind("(")
+        if last_paren > text.rfind(")"):
+            end = min(end, max(last_paren - self.KEYWORD_WINDOW, 0))
+
+        # Aspas ainda abertas (atributos de eventos on...="...")
+        if text.count('"') % 2 == 1:
+            end = min(end, text.rfind('"'))
+
+        return end
+
 def validate_json_schema(data: Dict[str, Any], schema: Dict[str, Any]) -> bool:
     """
     Validar dados JSON contra um schema.
@@ -7,6 +7,11 @@ class CollectedInfo(BaseModel):
     total_size: Optional[str] = Field(None, description="The required total size of the property")
     property_type: Optional[str] = Field(None, description="The type of property")
     city: Optional[str] = Field(None, description="The city where the property is located")
+    budget_amount: Optional[float] = Field(None, description="The budget as a number, parsed from budget")
+    budget_currency: Optional[str] = Field(None, description="ISO currency code written with the budget")
+    budget_period: Optional[str] = Field(None, description="'month' or 'year' for rents; None for a one-off amount")
+    total_size_m2: Optional[float] = Field(None, description="The total size converted to square meters")
+    total_size_unit: Optional[str] = Field(None, description="Unit the total size was written in; None means m²")
     additional_fields: Optional[Dict[str, str]] = Field(default_factory=dict, description="Any additional requirements")
     created_at: datetime = Field(default_factory=datetime.utcnow, description="When the information was collected")
     updated_at: datetime = Field(default_factory=datetime.utcnow, description="When the information was last updated")
@@ -0,0 +1,30 @@
+from fastapi import APIRouter
+from typing import Dict, Any
+from ..core import llm, security
+from ..core.mongo_client import mongo_pool_stats
+from ..core.request_pipeline import stage_stats
+from ..services.field_extractor import extraction_stats
+from ..api.dependencies import peek_chat_service
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["metrics"],
+)
+
+@router.get("", response_model=Dict[str, Any])
+async def get_metrics():
+    """
+    Retorna contadores internos da aplicação (caches de respostas do LLM e de veredictos de segurança, sessões, rate limiter, pool de conexões do MongoDB, tempo por etapa das requisições de chat e buscas de campos evitadas nas respostas do LLM).
+    """
+    chat_service = peek_chat_service()
+    return {
+        "sessions": chat_service.session_store.stats() if chat_service else None,
+        "write_behind": chat_service.write_queue.stats() if chat_service and chat_service.write_queue else None,
+        "response_cache": llm.response_cache.stats(),
+        "shared_response_cache": llm.shared_response_cache.stats() if llm.shared_response_cache else None,
+        "safety_verdict_cache": security.verdict_cache.stats(),
+        "rate_limiter": security.rate_limiter.stats() if security.rate_limiter else None,
+        "mongodb_pool": mongo_pool_stats(),
+        "chat_stages": stage_stats.stats(),
+        "field_extraction": extraction_stats.stats()
+    }
@@ -1,5 +1,12 @@
-from fastapi import APIRouter, HTTPException, Query
-from typing import List, Dict, Any, Optional
+import csv
+import io
+import json
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import Iterator, List, Dict, Any, Optional
+from ..api.dependencies import get_mongodb_service
+from ..core.config import get_settings
 from ..services.mongodb_service import MongoDBService
 
 router = APIRouter(
@@ -8,11 +15,53 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-# Instanciar o serviço MongoDB
-mongodb_service = MongoDBService()
+# Colunas do CSV quando nenhuma projeção é informada
+EXPORT_CSV_COLUMNS = ["_id", "conversation_id", "budget", "total_size", "property_type", "city",
+                      "budget_amount", "budget_currency", "budget_period", "total_size_m2", "total_size_unit",
+                      "additional_fields", "created_at", "updated_at"]
+
+# Tamanho aproximado de cada bloco enviado ao cliente
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+def _export_value(value: Any) -> Any:
+    """Convert a document value to something json/csv can write."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, default=str)
+    return value
+
+def _json_default(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+def _ndjson_chunks(documents: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    buffer = []
+    size = 0
+    for doc in documents:
+        line = json.dumps(doc, ensure_ascii=False, default=_json_default) + "\n"
+        buffer.append(line)
+        size += len(line)
+        if size >= EXPORT_CHUNK_BYTES:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+def _csv_chunks(documents: Iterator[Dict[str, Any]], columns: List[str]) -> Iterator[str]:
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(columns)
+    for doc in documents:
+        writer.writerow(["" if doc.get(column) is None else _export_value(doc.get(column)) for column in columns])
+        if output.tell() >= EXPORT_CHUNK_BYTES:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate(0)
+    if output.tell():
+        yield output.getvalue()
 
 @router.get("/collections", response_model=List[str])
-async def get_collections():
+async def get_collections(mongodb_service: MongoDBService = Depends(get_mongodb_service)):
     """
     Retorna a lista de todas as coleções no banco de dados MongoDB.
     """
@@ -22,25 +71,114 @@ async def get_collections():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao listar coleções: {str(e)}")
 
-@router.get("/documents/{collection_name}", response_model=List[Dict[str, Any]])
+@router.get("/documents/{collection_name}", response_model=Dict[str, Any])
 async def get_documents(
     collection_name: str,
-    limit: Optional[int] = Query(100, description="Número máximo de documentos a retornar")
+    limit: int = Query(100, ge=1, le=1000, description="Número máximo de documentos por página"),
+    cursor: Optional[str] = Query(None, description="Valor de next_cursor da página anterior"),
+    sort: str = Query("_id", description="Campo de ordenação: _id, created_at, budget_amount ou total_size_m2"),
+    descending: bool = Query(False, description="Ordenar do maior para o menor"),
+    city: Optional[str] = Query(None, description="Filtrar por cidade"),
+    property_type: Optional[str] = Query(None, description="Filtrar por tipo de imóvel"),
+    conversation_id: Optional[str] = Query(None, description="Filtrar por conversa"),
+    budget_currency: Optional[str] = Query(None, description="Filtrar por moeda do orçamento (ex. USD)"),
+    min_budget: Optional[float] = Query(None, ge=0, description="Orçamento mínimo (budget_amount)"),
+    max_budget: Optional[float] = Query(None, ge=0, description="Orçamento máximo (budget_amount)"),
+    min_size: Optional[float] = Query(None, ge=0, description="Tamanho mínimo em m² (total_size_m2)"),
+    max_size: Optional[float] = Query(None, ge=0, description="Tamanho máximo em m² (total_size_m2)"),
+    fields: Optional[str] = Query(None, description="Campos a retornar, separados por vírgula"),
+    mongodb_service: MongoDBService = Depends(get_mongodb_service)
 ):
     """
-    Retorna todos os documentos de uma coleção específica.
+    Retorna uma página de documentos de uma coleção específica.
     
     - **collection_name**: Nome da coleção
-    - **limit**: Número máximo de documentos a retornar (padrão: 100)
+    - **limit**: Número máximo de documentos por página (padrão: 100)
+    - **cursor**: Continua após o último documento da página anterior
+    - **sort** / **descending**: Ordenação (`_id`, `created_at`, `budget_amount` ou `total_size_m2`;
+      as numéricas listam só documentos com valor)
+    - **city**, **property_type**, **conversation_id**, **budget_currency**: Filtros por igualdade
+    - **min_budget** / **max_budget**, **min_size** / **max_size**: Intervalos (tamanho em m²)
+    - **fields**: Projeção, ex. `city,budget,created_at`
+    
+    A resposta contém `documents` e `next_cursor` (nulo na última página).
     """
+    filters = {
+        "city": city, "property_type": property_type, "conversation_id": conversation_id,
+        "budget_currency": budget_currency, "min_budget": min_budget, "max_budget": max_budget,
+        "min_size": min_size, "max_size": max_size,
+    }
+    projection = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
     try:
-        documents = mongodb_service.get_all_documents(collection_name, limit)
-        return documents
+        return mongodb_service.get_documents_page(
+            collection_name,
+            limit=limit,
+            cursor=cursor,
+            sort=sort,
+            descending=descending,
+            filters=filters,
+            fields=projection
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao buscar documentos: {str(e)}")
 
+@router.get("/export/{collection_name}")
+async def export_documents(
+    collection_name: str,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="Formato: ndjson ou csv"),
+    city: Optional[str] = Query(None, description="Filtrar por cidade"),
+    property_type: Optional[str] = Query(None, description="Filtrar por tipo de imóvel"),
+    conversation_id: Optional[str] = Query(None, description="Filtrar por conversa"),
+    budget_currency: Optional[str] = Query(None, description="Filtrar por moeda do orçamento (ex. USD)"),
+    min_budget: Optional[float] = Query(None, ge=0, description="Orçamento mínimo (budget_amount)"),
+    max_budget: Optional[float] = Query(None, ge=0, description="Orçamento máximo (budget_amount)"),
+    min_size: Optional[float] = Query(None, ge=0, description="Tamanho mínimo em m² (total_size_m2)"),
+    max_size: Optional[float] = Query(None, ge=0, description="Tamanho máximo em m² (total_size_m2)"),
+    fields: Optional[str] = Query(None, description="Campos a exportar, separados por vírgula"),
+    mongodb_service: MongoDBService = Depends(get_mongodb_service)
+):
+    """
+    Exporta os documentos de uma coleção em NDJSON ou CSV.
+    
+    Os documentos são lidos do cursor em lotes e enviados à medida que são lidos,
+    então o uso de memória não depende do número de documentos exportados.
+    
+    - **collection_name**: Nome da coleção
+    - **format**: `ndjson` (padrão) ou `csv`
+    - **city**, **property_type**, **conversation_id**, **budget_currency**: Filtros por igualdade
+    - **min_budget** / **max_budget**, **min_size** / **max_size**: Intervalos (tamanho em m²)
+    - **fields**: Projeção, ex. `city,budget,created_at`
+    """
+    filters = {
+        "city": city, "property_type": property_type, "conversation_id": conversation_id,
+        "budget_currency": budget_currency, "min_budget": min_budget, "max_budget": max_budget,
+        "min_size": min_size, "max_size": max_size,
+    }
+    projection = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+    documents = mongodb_service.iter_documents(
+        collection_name,
+        filters=filters,
+        fields=projection,
+        batch_size=get_settings().EXPORT_BATCH_SIZE
+    )
+    
+    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    if format == "csv":
+        columns = ["_id", *[field for field in projection if field != "_id"]] if projection else EXPORT_CSV_COLUMNS
+        content, media_type = _csv_chunks(documents, columns), "text/csv"
+    else:
+        content, media_type = _ndjson_chunks(documents), "application/x-ndjson"
+    
+    return StreamingResponse(
+        content,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{collection_name}_{timestamp}.{format}"'}
+    )
+
 @router.get("/count/{collection_name}", response_model=Dict[str, int])
-async def get_document_count(collection_name: str):
+async def get_document_count(collection_name: str, mongodb_service: MongoDBService = Depends(get_mongodb_service)):
     """
     Retorna o número total de documentos em uma coleção.
     
@@ -50,4 +188,19 @@ async def get_document_count(collection_name: str):
         count = mongodb_service.get_document_count(collection_name)
         return {"count": count}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao contar documentos: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Erro ao contar documentos: {str(e)}")
+
+@router.get("/indexes/{collection_name}", response_model=Dict[str, Any])
+async def get_index_stats(collection_name: str, mongodb_service: MongoDBService = Depends(get_mongodb_service)):
+    """
+    Retorna as estatísticas de uso dos índices de uma coleção.
+    
+    Índices com poucas operações são candidatos a remoção; um número crescente de
+    varreduras completas de coleção indica consultas sem índice adequado.
+    
+    - **collection_name**: Nome da coleção
+    """
+    try:
+        return mongodb_service.get_index_stats(collection_name)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao obter estatísticas de índices: {str(e)}")
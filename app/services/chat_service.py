@@ -1,35 +1,27 @@
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, AsyncIterator, Collection
 import re
 import logging
 import traceback
 import os
 import time
 from datetime import datetime
-from ..core.llm import get_llm_response, sanitize_input
+from ..core.llm import get_llm_response, get_llm_response_async, stream_llm_response_async, sanitize_user_message
+from ..core.executor import run_blocking
+from ..core.request_pipeline import timed
 from ..core.security import (
-    validate_field, 
     check_for_dangerous_content,
-    sanitize_html,
     validate_json_schema
 )
 from ..api.schemas import ChatMessage, RealEstateRequirements
+from ..services.city_recognizer import CityRecognizer
+from ..services.field_extractor import FieldExtractor, extraction_stats, field_extractor
 from ..services.mongodb_service import MongoDBService
+from ..services.session_store import ConversationState, SessionStore, MongoSessionPersistence
+from ..services.write_behind import WriteBehindQueue
+from ..core.config import get_settings
 import uuid
 
 # Configurar o logger
-log_dir = "logs"
-if not os.path.exists(log_dir):
-    os.makedirs(log_dir)
-
-log_file = os.path.join(log_dir, f"chat_service_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(log_file),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger("chat_service")
 
 # Schema para validação de campos
@@ -57,122 +49,127 @@ FIELD_SCHEMA = {
 }
 
 class ChatService:
-    def __init__(self):
+    def __init__(self, mongodb_service: Optional[MongoDBService] = None, session_store: Optional[SessionStore] = None,
+                 write_queue: Optional[WriteBehindQueue] = None):
         logger.info("Inicializando ChatService")
-        self.required_fields = {
-            "budget": None,
-            "total_size": None,
-            "property_type": None,
-            "city": None
-        }
-        self.additional_fields = {}
-        self.mongodb_service = MongoDBService()
+        self.mongodb_service = mongodb_service or MongoDBService()
+        settings = get_settings()
+        
+        # Fila write-behind para as gravações de collected_info
+        if write_queue is None and settings.WRITE_BEHIND_ENABLED:
+            write_queue = WriteBehindQueue(
+                self.mongodb_service.db["collected_info"],
+                batch_size=settings.WRITE_BEHIND_BATCH_SIZE,
+                flush_interval=settings.WRITE_BEHIND_FLUSH_INTERVAL,
+                max_queue=settings.WRITE_BEHIND_MAX_QUEUE,
+                enqueue_timeout=settings.WRITE_BEHIND_ENQUEUE_TIMEOUT
+            ).start()
+        self.write_queue = write_queue
+        
+        # Estado por conversa, indexado por conversation_id
+        if session_store is None:
+            persistence = None
+            if settings.SESSION_PERSISTENCE_ENABLED:
+                persistence = MongoSessionPersistence(
+                    self.mongodb_service,
+                    collection_name=settings.SESSION_COLLECTION,
+                    ttl=settings.SESSION_PERSISTENCE_TTL
+                )
+            session_store = SessionStore(
+                max_sessions=settings.SESSION_MAX_SESSIONS,
+                idle_ttl=settings.SESSION_IDLE_TTL,
+                persistence=persistence
+            )
+        self.session_store = session_store
+        
+        # Conversa padrão, usada quando nenhum conversation_id é informado
         self.conversation_id = str(uuid.uuid4())
         
-        # Patterns for field extraction
-        self.patterns = {
-            "budget": r"(?:budget|price|cost|\$|USD|EUR|€|£|R\$)\s*(?:is|:)?\s*(\d+(?:\.|,)\d+|\d+)",
-            "total_size": r"(?:size|area|space|square meters|square feet|sq ft|m²|metros?)\s*(?:of|is|:)?\s*(?:at least|minimum|approximately|about|al menos|mínimo|aproximadamente)?\s*(\d+(?:\.|,)\d+|\d+)",
-            "property_type": r"(?:looking for|need|want|searching for|busco|necesito|quiero)\s+(?:a|an|el|la|un|una)?\s*([a-zA-ZÀ-ú\s-]+?)(?:\s+(?:to|with|that|for|para|con|que|in|\.|\n|$))",
-            "city": r"(?:in|at|near|en|cerca de|próximo a)\s+([A-Za-zÀ-ú\s-]+?)(?:\s*(?:,|\.|$|\s+(?:preferably|specifically|zone|area|región|zona|área|area)))"
-        }
+        # Extrator de campos (padrões compilados uma vez por processo)
+        self.field_extractor = field_extractor
+        if settings.CITY_GAZETTEER_PATH:
+            self.field_extractor = FieldExtractor(city_recognizer=CityRecognizer.from_file(settings.CITY_GAZETTEER_PATH))
+        # Campos devolvidos pelo próprio Gemini (JSON); regex só como fallback
+        self.structured_output = settings.LLM_STRUCTURED_OUTPUT and settings.LLM_HISTORY_MODE != "replay"
         logger.info("ChatService initialized successfully")
     
-    def extract_fields(self, text: str) -> Dict[str, str]:
+    @property
+    def required_fields(self) -> Dict[str, Any]:
+        """Required fields of the default conversation."""
+        return self.get_state().required_fields
+    
+    @property
+    def additional_fields(self) -> Dict[str, Any]:
+        """Additional fields of the default conversation."""
+        return self.get_state().additional_fields
+    
+    def get_state(self, conversation_id: Optional[str] = None) -> ConversationState:
+        """
+        Get (or create) the state of a conversation.
+        
+        Args:
+            conversation_id (str, optional): The conversation to load; the default
+                conversation of this service is used when omitted
+            
+        Returns:
+            ConversationState: The conversation state
+        """
+        state = self.session_store.get_or_create(conversation_id or self.conversation_id)
+        if conversation_id is None:
+            self.conversation_id = state.conversation_id
+        return state
+    
+    @timed("extract_fields")
+    def extract_fields(self, text: str, fields: Optional[Collection[str]] = None, locative_only: bool = False) -> Dict[str, str]:
         """
-        Extract fields from text using regex patterns.
+        Extract fields from text using the precompiled FieldExtractor.
         
         Args:
             text (str): Text to extract fields from
+            fields (Collection[str], optional): Only search for these fields (all when omitted)
+            locative_only (bool): Only take a city stated as a place ("in Monterrey"), not
+                any city mentioned (used for the LLM's replies)
             
         Returns:
             Dict[str, str]: Dictionary of extracted fields
         """
         logger.debug(f"Extracting fields from text: {text[:50]}...")
-        extracted_fields = {}
-        
-        # Extract required fields
-        for field, pattern in self.patterns.items():
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                value = match.group(1).strip()
-                # Clean up the extracted value
-                if field == "budget":
-                    # Remove currency symbols and normalize
-                    value = re.sub(r'[^\d.]', '', value)
-                elif field == "total_size":
-                    # Remove units and normalize
-                    value = re.sub(r'[^\d.]', '', value)
-                elif field == "property_type":
-                    # Clean up property type and normalize to English
-                    value = value.strip().lower()
-                    # Remove any trailing words
-                    value = re.sub(r'\s+(?:in|at|near|with|that|for|to).*$', '', value)
-                    # Normalize common variations
-                    if any(term in value for term in ["warehouse", "galpão", "galpao", "almacén", "almacen", "storage"]):
-                        value = "warehouse"
-                    elif any(term in value for term in ["office", "escritório", "escritorio", "oficina"]):
-                        value = "office"
-                    elif any(term in value for term in ["store", "loja", "tienda", "retail"]):
-                        value = "store"
-                    elif any(term in value for term in ["industrial", "factory", "manufacturing"]):
-                        value = "industrial"
-                    elif any(term in value for term in ["apartment", "apartamento", "flat"]):
-                        value = "apartment"
-                elif field == "city":
-                    # Clean up city name and handle common formats
-                    value = value.strip().title()
-                    # Remove common suffixes in multiple languages
-                    value = re.sub(r'\s+(?:zone|area|región|zona|área|area).*$', '', value, flags=re.IGNORECASE)
-                    
-                    # Skip if the value looks like a sentence fragment
-                    if len(value.split()) > 3 or any(word.lower() in value.lower() for word in ["the", "and", "or", "but", "with", "for", "that", "this", "these", "those", "meet", "need", "want", "look", "search", "find"]):
-                        continue
-                
-                # Validate the field value
-                validated_value = validate_field(field, value)
-                if validated_value is not None:
-                    # Only update if the new value is valid and either:
-                    # 1. The field doesn't exist yet, or
-                    # 2. The new value is more specific/complete than the existing one
-                    if (field not in extracted_fields or 
-                        len(validated_value) > len(extracted_fields[field]) or
-                        (field == "city" and "Mexico City" in validated_value)):
-                        extracted_fields[field] = validated_value
-                        logger.debug(f"Field extracted: {field} = {validated_value}")
-        
-        
+        extracted_fields = self.field_extractor.extract(text, fields, locative_only)
         logger.info(f"Total de campos extraídos: {len(extracted_fields)}")
         return extracted_fields
     
-    def update_fields(self, extracted_fields: Dict[str, str]):
+    def update_fields(self, extracted_fields: Dict[str, str], state: Optional[ConversationState] = None):
         """
         Update the fields with newly extracted values.
         
         Args:
             extracted_fields (Dict[str, str]): Newly extracted fields
+            state (ConversationState, optional): The conversation to update (default conversation if omitted)
         """
         logger.debug(f"Atualizando campos com {len(extracted_fields)} valores extraídos")
+        state = state or self.get_state()
         
         # Update required fields
-        for field in self.required_fields:
+        for field in state.required_fields:
             if field in extracted_fields:
-                self.required_fields[field] = extracted_fields[field]
+                state.required_fields[field] = extracted_fields[field]
                 logger.debug(f"Campo obrigatório atualizado: {field} = {extracted_fields[field]}")
         
         # Update additional fields
         for field, value in extracted_fields.items():
             if field.startswith("additional_"):
-                self.additional_fields[field] = value
+                state.additional_fields[field] = value
                 logger.debug(f"Campo adicional atualizado: {field} = {value}")
     
-    def process_message(self, message: str, conversation_history: Optional[List[ChatMessage]] = None) -> Dict:
+    def process_message(self, message: str, conversation_history: Optional[List[ChatMessage]] = None, conversation_id: Optional[str] = None) -> Dict:
         """
         Process a user message and return the response with collected fields.
         
         Args:
             message (str): The user's message
-            conversation_history (List[ChatMessage], optional): Previous conversation messages
+            conversation_history (List[ChatMessage], optional): Previous conversation messages; when
+                omitted, the server-side transcript of the conversation is used
+            conversation_id (str, optional): The conversation this message belongs to
             
         Returns:
             Dict: Contains response, collected fields, and completion status
@@ -180,64 +177,63 @@ class ChatService:
         logger.info(f"Processando mensagem: {message[:50]}...")
         
         try:
-            # Sanitize the user's message
-            sanitized_message = sanitize_input(message)
-            
-            # Sanitizar HTML na mensagem
-            sanitized_message = sanitize_html(sanitized_message)
-            
-            # Registrar tentativa de ataque se a mensagem foi modificada
-            if sanitized_message != message:
-                logger.warning(f"Tentativa de ataque detectada. Mensagem original: {message[:100]}...")
-                logger.warning(f"Mensagem sanitizada: {sanitized_message[:100]}...")
-            
-            # Extract fields from user message
-            logger.debug("Extraindo campos da mensagem do usuário")
-            extracted_fields = self.extract_fields(sanitized_message)
-            
-            # Update fields with extracted values
-            logger.debug("Atualizando campos com valores extraídos")
-            self.update_fields(extracted_fields)
+            state, sanitized_message, extracted_fields, collected_fields = self._start_turn(message, conversation_id, extract=not self.structured_output)
+            history, history_validated = self._history_for(state, conversation_history)
             
             # Get LLM response with collected fields
             logger.debug("Obtendo resposta do LLM")
-            collected_fields = {**self.required_fields, **self.additional_fields}
-            llm_response = get_llm_response(sanitized_message, conversation_history, collected_fields)
+            if self.structured_output:
+                llm_response, structured_fields = get_llm_response(sanitized_message, history, collected_fields, history_validated, structured=True)
+                extracted_fields = self._apply_structured_fields(sanitized_message, structured_fields, state)
+                extract_response = structured_fields is None
+            else:
+                llm_response = get_llm_response(sanitized_message, history, collected_fields, history_validated)
+                extract_response = True
             
-            # Extract fields from LLM response
-            logger.debug("Extraindo campos da resposta do LLM")
-            extracted_fields.update(self.extract_fields(llm_response))
+            result = self._finish_turn(sanitized_message, llm_response, extracted_fields, state, extract_response)
+            self._save_turn(state)
             
-            # Update fields with extracted values from LLM response
-            logger.debug("Atualizando campos com valores extraídos da resposta do LLM")
-            self.update_fields(extracted_fields)
+            logger.info("Processamento de mensagem concluído com sucesso")
+            return result
             
-            # Check if all required fields are collected
-            is_complete = all(value is not None for value in self.required_fields.values())
-            logger.info(f"Todos os campos obrigatórios coletados: {is_complete}")
+        except Exception as e:
+            logger.error(f"Erro ao processar mensagem: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+    
+    async def process_message_async(self, message: str, conversation_history: Optional[List[ChatMessage]] = None, conversation_id: Optional[str] = None) -> Dict:
+        """
+        Non-blocking version of `process_message` for the async API routes.
+        
+        The LLM call is awaited and the MongoDB save runs in the bounded executor,
+        so the event loop keeps serving other requests meanwhile.
+        
+        Args:
+            message (str): The user's message
+            conversation_history (List[ChatMessage], optional): Previous conversation messages; when
+                omitted, the server-side transcript of the conversation is used
+            conversation_id (str, optional): The conversation this message belongs to
             
-            # Validar campos coletados contra o schema
-            collected_fields = {**self.required_fields, **self.additional_fields}
-            if not validate_json_schema(collected_fields, FIELD_SCHEMA):
-                logger.warning("Campos coletados não passaram na validação do schema")
+        Returns:
+            Dict: Contains response, collected fields, and completion status
+        """
+        logger.info(f"Processando mensagem (async): {message[:50]}...")
+        
+        try:
+            state, sanitized_message, extracted_fields, collected_fields = self._start_turn(message, conversation_id, extract=not self.structured_output)
+            history, history_validated = self._history_for(state, conversation_history)
             
-            # Salvar informações coletadas no MongoDB
-            try:
-                collected_info = {
-                    **collected_fields,
-                    "conversation_id": self.conversation_id
-                }
-                self.mongodb_service.save_collected_info(collected_info)
-                logger.info("Informações coletadas salvas no MongoDB")
-            except Exception as e:
-                logger.error(f"Erro ao salvar informações no MongoDB: {str(e)}")
+            logger.debug("Obtendo resposta do LLM")
+            if self.structured_output:
+                llm_response, structured_fields = await get_llm_response_async(sanitized_message, history, collected_fields, history_validated, structured=True)
+                extracted_fields = self._apply_structured_fields(sanitized_message, structured_fields, state)
+                extract_response = structured_fields is None
+            else:
+                llm_response = await get_llm_response_async(sanitized_message, history, collected_fields, history_validated)
+                extract_response = True
             
-            result = {
-                "response": llm_response,
-                "collected_fields": collected_fields,
-                "is_complete": is_complete,
-                "conversation_id": self.conversation_id
-            }
+            result = self._finish_turn(sanitized_message, llm_response, extracted_fields, state, extract_response)
+            await run_blocking(self._save_turn, state)
             
             logger.info("Processamento de mensagem concluído com sucesso")
             return result
@@ -247,10 +243,213 @@ class ChatService:
             logger.error(traceback.format_exc())
             raise
     
-    def reset(self):
-        """Reset the conversation state."""
+    async def stream_message_async(self, message: str, conversation_history: Optional[List[ChatMessage]] = None, conversation_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process a user message, streaming the LLM response as it is generated.
+        
+        Yields `{"type": "token", "text": ...}` events and finishes with one
+        `{"type": "done", ...}` event carrying the same payload as `process_message`.
+        
+        Args:
+            message (str): The user's message
+            conversation_history (List[ChatMessage], optional): Previous conversation messages; when
+                omitted, the server-side transcript of the conversation is used
+            conversation_id (str, optional): The conversation this message belongs to
+            
+        Yields:
+            Dict[str, Any]: Token events followed by the final result
+        """
+        logger.info(f"Processando mensagem em streaming: {message[:50]}...")
+        
+        state, sanitized_message, extracted_fields, collected_fields = self._start_turn(message, conversation_id)
+        history, history_validated = self._history_for(state, conversation_history)
+        
+        llm_response = ""
+        async for event in stream_llm_response_async(sanitized_message, history, collected_fields, history_validated):
+            if event["type"] == "token":
+                yield event
+            else:
+                llm_response = event["text"]
+        
+        result = self._finish_turn(sanitized_message, llm_response, extracted_fields, state)
+        await run_blocking(self._save_turn, state)
+        
+        logger.info("Processamento de mensagem em streaming concluído com sucesso")
+        yield {"type": "done", **result}
+    
+    def _start_turn(self, message: str, conversation_id: Optional[str] = None, extract: bool = True):
+        """
+        Load the conversation state, sanitize the user's message and extract fields from it.
+        
+        A message already sanitized by the route (`SanitizedText`) is not sanitized again.
+        With `extract=False` (structured output mode) no fields are extracted here.
+        
+        Returns:
+            Tuple[ConversationState, str, Dict[str, str], Dict[str, Any]]: The conversation
+            state, sanitized message, extracted fields and the fields collected so far
+        """
+        state = self.get_state(conversation_id)
+        
+        # Sanitizar a mensagem do usuário (no-op se a rota já a sanitizou)
+        sanitized_message = sanitize_user_message(message)
+        
+        extracted_fields = {}
+        if extract:
+            # Extract fields from user message
+            logger.debug("Extraindo campos da mensagem do usuário")
+            extracted_fields = self.extract_fields(sanitized_message)
+            
+            # Update fields with extracted values
+            logger.debug("Atualizando campos com valores extraídos")
+            self.update_fields(extracted_fields, state)
+        
+        return state, sanitized_message, extracted_fields, state.collected_fields
+    
+    def _history_for(self, state: ConversationState, conversation_history: Optional[List[ChatMessage]] = None):
+        """
+        Choose the history sent to the LLM.
+        
+        Returns:
+            Tuple[List, bool]: The history and whether it was already validated (the
+            server-side transcript is; a caller-supplied history is not)
+        """
+        if conversation_history is None:
+            return list(state.history), True
+        return conversation_history, False
+    
+    def _apply_structured_fields(self, user_message: str, structured_fields: Optional[Dict[str, str]], state: ConversationState) -> Dict[str, str]:
+        """
+        Update the state with the fields returned by the model in structured output mode.
+        
+        When the model's output could not be parsed (`structured_fields` is None), fall
+        back to extracting the fields from the user's message with the regex extractor.
+        A city the model returned as a gazetteer alias is stored under its canonical name.
+        
+        Returns:
+            Dict[str, str]: The fields applied this turn
+        """
+        if structured_fields is None:
+            logger.debug("Saída estruturada indisponível; extraindo campos da mensagem do usuário por regex")
+            structured_fields = self.extract_fields(user_message)
+        elif structured_fields.get("city"):
+            # Mesmo nome canônico da extração por regex ("CDMX" -> "Mexico City")
+            city = self.field_extractor.city_recognizer.canonical_name(structured_fields["city"])
+            if city is not None:
+                structured_fields = {**structured_fields, "city": city}
+        self.update_fields(structured_fields, state)
+        return structured_fields
+    
+    def _finish_turn(self, user_message: str, llm_response: str, extracted_fields: Dict[str, str], state: ConversationState,
+                     extract_response: bool = True):
+        """
+        Extract the still missing fields from the LLM response, record the turn in the transcript and build the turn result.
+        
+        With `extract_response=False` (fields already returned by the model in structured
+        output mode) the response is not searched for fields.
+        
+        Returns:
+            Dict: The result for the API
+        """
+        # A resposta do LLM só completa campos ainda faltando: os que o usuário já
+        # informou (neste turno ou antes) não são buscados nem sobrescritos por ecos
+        missing_fields = [field for field, value in state.required_fields.items() if value is None] if extract_response else []
+        if extract_response:
+            extraction_stats.record(searched=len(missing_fields), skipped=len(state.required_fields) - len(missing_fields))
+        else:
+            # Campos devolvidos pelo modelo: não é um turno "sem campos faltando"
+            extraction_stats.record_structured()
+        if missing_fields:
+            logger.debug(f"Extraindo da resposta do LLM os campos faltando: {missing_fields}")
+            # Cidades citadas pelo assistente ao perguntar ("¿Monterrey o CDMX?") não contam
+            response_fields = self.extract_fields(llm_response, missing_fields, locative_only=True)
+            extracted_fields.update(response_fields)
+            self.update_fields(response_fields, state)
+        else:
+            logger.debug("Nenhum campo a buscar na resposta do LLM (todos coletados ou devolvidos pelo modelo)")
+        
+        # Registrar o turno no histórico do servidor (já sanitizado e validado)
+        state.add_turn(user_message, llm_response)
+        
+        # Check if all required fields are collected
+        is_complete = state.is_complete
+        logger.info(f"Todos os campos obrigatórios coletados: {is_complete}")
+        
+        # Validar campos coletados contra o schema
+        collected_fields = state.collected_fields
+        if not validate_json_schema(collected_fields, FIELD_SCHEMA):
+            logger.warning("Campos coletados não passaram na validação do schema")
+        
+        result = {
+            "response": llm_response,
+            "collected_fields": collected_fields,
+            "is_complete": is_complete,
+            "conversation_id": state.conversation_id
+        }
+        return result
+    
+    @timed("save")
+    def _save_turn(self, state: ConversationState):
+        """Persistir o estado da sessão e as informações coletadas."""
+        self.session_store.save(state)
+        self._save_collected_info(state)
+    
+    def _save_collected_info(self, state: ConversationState):
+        """
+        Upsert the conversation's collected_info document (errors are only logged).
+        
+        Only the fields that changed since the last write are sent; a turn that
+        changed nothing does not touch MongoDB after the document exists. Fields are
+        marked persisted only once written (for queued writes, by the queue after its
+        bulk_write succeeds), so a failed write leaves them to be sent again next turn.
+        """
+        changed_fields = state.changed_fields()
+        if state.persisted_fields is not None and not changed_fields:
+            logger.debug("Nenhum campo alterado, gravação no MongoDB ignorada")
+            return
+        try:
+            if self.write_queue is not None:
+                # Apenas enfileirar; a gravação acontece em lote em segundo plano
+                self.write_queue.enqueue(
+                    self.mongodb_service.collected_info_write_op(state.conversation_id, changed_fields),
+                    on_written=lambda: state.mark_persisted(changed_fields)
+                )
+                logger.debug("Informações coletadas enfileiradas para gravação no MongoDB")
+            else:
+                if not self.mongodb_service.upsert_collected_info(state.conversation_id, changed_fields):
+                    return
+                logger.info("Informações coletadas salvas no MongoDB")
+                state.mark_persisted(changed_fields)
+        except Exception as e:
+            logger.error(f"Erro ao salvar informações no MongoDB: {str(e)}")
+    
+    def reset(self, conversation_id: Optional[str] = None):
+        """
+        Reset a conversation.
+        
+        Args:
+            conversation_id (str, optional): The conversation to drop; when omitted, the
+                default conversation is replaced by a new one
+        """
         logger.info("Resetando estado da conversa")
-        self.required_fields = {field: None for field in self.required_fields}
-        self.additional_fields = {}
-        self.conversation_id = str(uuid.uuid4())
-        logger.info("Estado da conversa resetado com sucesso") 
\ No newline at end of file
+        if conversation_id is not None:
+            self.session_store.delete(conversation_id)
+        else:
+            self.session_store.delete(self.conversation_id)
+            self.conversation_id = str(uuid.uuid4())
+        logger.info("Estado da conversa resetado com sucesso")
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every queued collected_info write has reached MongoDB.
+        
+        Returns:
+            bool: False if the timeout expired first
+        """
+        if self.write_queue is None:
+            return True
+        return self.write_queue.flush(timeout)
+    
+    def close(self):
+        """Flush pending writes and stop background workers (graceful shutdown)."""
+        if self.write_queue is not None:
+            self.write_queue.stop()
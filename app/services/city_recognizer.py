@@ -0,0 +1,212 @@
+import json
+import logging
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Configurar o logger
+logger = logging.getLogger("city_recognizer")
+
+# Gazetteer padrão: nome canônico -> apelidos. O nome canônico também é reconhecido.
+# Apelidos são comparados sem diferenciar maiúsculas nem acentos e só como palavras
+# inteiras; evite apelidos que sejam palavras comuns ("LA" casaria o artigo "la").
+DEFAULT_GAZETTEER: Dict[str, Tuple[str, ...]] = {
+    # México
+    "Mexico City": ("Ciudad de México", "CDMX", "Distrito Federal", "México DF", "Mexico DF", "Cidade do México"),
+    "Guadalajara": ("GDL",),
+    "Monterrey": ("MTY",),
+    "Puebla": (),
+    "Querétaro": ("Santiago de Querétaro",),
+    "Tijuana": (),
+    "Mérida": (),
+    "Cancún": (),
+    "Toluca": (),
+    "Aguascalientes": (),
+    "San Luis Potosí": ("SLP",),
+    "Chihuahua": (),
+    "Ciudad Juárez": (),
+    "Hermosillo": (),
+    "Saltillo": (),
+    "Morelia": (),
+    "Culiacán": (),
+    "Veracruz": (),
+    "Oaxaca": (),
+    "Acapulco": (),
+    "Torreón": (),
+    "Mazatlán": (),
+    "Zapopan": (),
+    "Playa del Carmen": (),
+    "Puerto Vallarta": (),
+    # Estados Unidos e Canadá
+    "New York": ("New York City", "NYC", "Nueva York", "Nova York"),
+    "Los Angeles": ("Los Ángeles",),
+    "Chicago": (),
+    "Houston": (),
+    "Miami": (),
+    "San Francisco": (),
+    "Dallas": (),
+    "San Antonio": (),
+    "Seattle": (),
+    "Boston": (),
+    "Portland": (),
+    "Toronto": (),
+    "Vancouver": (),
+    "Montreal": ("Montréal",),
+    # América do Sul e Europa
+    "São Paulo": (),
+    "Rio de Janeiro": (),
+    "Belo Horizonte": (),
+    "Curitiba": (),
+    "Brasília": (),
+    "Buenos Aires": (),
+    "Bogotá": (),
+    "Medellín": (),
+    "Madrid": (),
+    "Barcelona": (),
+    "London": ("Londres",),
+}
+
+# Minúsculas sem acento, caractere por caractere (o texto mantém o tamanho, então as
+# posições das correspondências valem no texto original). str.lower() transforma "İ" em
+# dois caracteres, por isso ele e os demais de security.py são trocados antes, como lá
+_BEFORE_LOWER = str.maketrans("İıſK", "iisk")
+_FOLD = str.maketrans("áàâãäéèêëíìîïóòôõöúùûüçñ", "aaaaaeeeeiiiiooooouuuucn")
+
+# Preposições de lugar exigidas antes da cidade no modo locativo, e a conjunção que
+# indica uma lista de opções ("in Monterrey or Puebla?"), sobre o texto já normalizado
+_LOCATIVE_BEFORE = re.compile(r"(?<!\w)(?:in|at|near|en|em|cerca de|proximo a|perto de)\s+(?:(?:the|la|el|a|o)\s+)?$")
+_ALTERNATIVE_AFTER = re.compile(r"\s+(?:or|o|ou)\s")
+_LOCATIVE_WINDOW = 16
+
+def fold(text: str) -> str:
+    """Lowercase `text` and strip the accents of Latin letters, for gazetteer matching."""
+    return text.translate(_BEFORE_LOWER).lower().translate(_FOLD)
+
+def load_gazetteer(path: str) -> Dict[str, Tuple[str, ...]]:
+    """
+    Load a gazetteer from a JSON file mapping canonical city names to lists of aliases,
+    e.g. `{"Mexico City": ["CDMX", "Ciudad de México"]}`.
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or not all(isinstance(aliases, list) for aliases in data.values()):
+        raise ValueError(f"Gazetteer inválido em {path}: esperado um objeto nome -> lista de apelidos")
+    return {name: tuple(aliases) for name, aliases in data.items()}
+
+class CityRecognizer:
+    """
+    Finds known city names and aliases in a text and returns their canonical names.
+
+    Every folded name and alias of the gazetteer is compiled, once, into an
+    Aho-Corasick automaton (a trie with failure links), so a message is scanned in
+    one left-to-right pass whose cost depends on the message length, not on how many
+    names the gazetteer holds. Only whole-word matches count, and the leftmost
+    (then longest) one wins, so "New York City" is not reported as "York".
+    """
+
+    def __init__(self, gazetteer: Optional[Dict[str, Iterable[str]]] = None):
+        gazetteer = DEFAULT_GAZETTEER if gazetteer is None else gazetteer
+        # apelido normalizado -> nome canônico
+        self._names: Dict[str, str] = {}
+        for name, aliases in gazetteer.items():
+            for alias in (name, *aliases):
+                key = fold(alias.strip())
+                if key:
+                    self._names.setdefault(key, name)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # (tamanho, nome canônico) terminados em cada estado, do mais longo ao mais curto
+        self._output: List[List[Tuple[int, str]]] = [[]]
+        for key, name in self._names.items():
+            self._add(key, name)
+        self._link()
+        self._max_length = max((len(key) for key in self._names), default=0)
+        logger.debug(f"Gazetteer compilado: {len(self._names)} nomes, {len(self._goto)} estados")
+
+    @classmethod
+    def from_file(cls, path: str, extend_default: bool = True) -> "CityRecognizer":
+        """Build a recognizer from a gazetteer file, on top of DEFAULT_GAZETTEER unless `extend_default` is False."""
+        gazetteer = load_gazetteer(path)
+        if extend_default:
+            gazetteer = {**DEFAULT_GAZETTEER, **gazetteer}
+        return cls(gazetteer)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def canonical_name(self, value: str) -> Optional[str]:
+        """The canonical name of `value` when it is exactly a known name or alias."""
+        return self._names.get(fold(value.strip()))
+
+    def find_all(self, text: str) -> List[Tuple[int, int, str]]:
+        """Every whole-word match in `text`, as (start, end, canonical name), in order of end."""
+        return list(self._matches(fold(text)))
+
+    def recognize(self, text: str, locative: bool = False) -> Optional[str]:
+        """
+        The canonical name of the leftmost (then longest) city mentioned in `text`, if any.
+
+        With `locative`, only a city right after a preposition of place ("in", "en",
+        "cerca de", ...) and not offered as one of several options ("in Monterrey or
+        Puebla") counts; for text that mentions cities without stating one, like
+        the assistant's questions.
+        """
+        folded = fold(text)
+        best: Optional[Tuple[int, int, str]] = None
+        for start, end, name in self._matches(folded):
+            if locative and not self._is_locative(folded, start, end):
+                continue
+            if best is None or start < best[0] or (start == best[0] and end > best[1]):
+                best = (start, end, name)
+            elif end - self._max_length > best[0]:
+                # Nenhuma correspondência posterior pode começar antes da melhor
+                break
+        return best[2] if best else None
+
+    def _is_locative(self, text: str, start: int, end: int) -> bool:
+        return (_LOCATIVE_BEFORE.search(text, max(0, start - _LOCATIVE_WINDOW), start) is not None
+                and _ALTERNATIVE_AFTER.match(text, end) is None)
+
+    def _matches(self, text: str):
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for i, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if not output[state]:
+                continue
+            end = i + 1
+            if end < len(text) and text[end].isalnum():
+                continue
+            for length, name in output[state]:
+                start = end - length
+                if start == 0 or not text[start - 1].isalnum():
+                    yield start, end, name
+
+    def _add(self, key: str, name: str):
+        state = 0
+        for char in key:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append((len(key), name))
+
+    def _link(self):
+        """Set the failure links breadth-first and merge each state's output with its fallback's."""
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, next_state in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+                queue.append(next_state)
+
+# Reconhecedor compartilhado com o gazetteer padrão (compilado uma vez por processo)
+city_recognizer = CityRecognizer()
@@ -0,0 +1,210 @@
+import logging
+import re
+import threading
+from typing import Any, Collection, Dict, Optional, Pattern
+from ..core.security import FIELD_VALIDATION, validate_field
+from .city_recognizer import CityRecognizer, city_recognizer as default_city_recognizer
+
+# Configurar o logger
+logger = logging.getLogger("field_extractor")
+
+# Padrões de extração dos campos obrigatórios (grupo 1 é o valor)
+FIELD_PATTERNS = {
+    "budget": r"(?:budget|price|cost|\$|USD|EUR|€|£|R\$)\s*(?:is|:)?\s*(\d+(?:\.|,)\d+|\d+)",
+    "total_size": r"(?:size|area|space|square meters|square feet|sq ft|m²|metros?)\s*(?:of|is|:)?\s*(?:at least|minimum|approximately|about|al menos|mínimo|aproximadamente)?\s*(\d+(?:\.|,)\d+|\d+)",
+    "property_type": r"(?:looking for|need|want|searching for|busco|necesito|quiero)\s+(?:a|an|el|la|un|una)?\s*([a-zA-ZÀ-ú\s-]+?)(?:\s+(?:to|with|that|for|para|con|que|in|\.|\n|$))",
+    "city": r"(?:in|at|near|en|cerca de|próximo a)\s+([A-Za-zÀ-ú\s-]+?)(?:\s*(?:,|\.|$|\s+(?:preferably|specifically|zone|area|región|zona|área|area)))"
+}
+
+# Classe de letras dos padrões e a equivalente para texto já em minúsculas: com
+# re.IGNORECASE, [A-Za-zÀ-ú] casa exatamente os caracteres cujo minúsculo está nela
+_LETTER_CLASSES = ("a-zA-ZÀ-ú", "A-Za-zÀ-ú")
+_LOWERCASE_LETTER_CLASS = "a-z×ß-þ"
+
+# re.IGNORECASE também casa estes caracteres com letras ASCII (e "İ".lower() muda o
+# tamanho do texto); textos com algum deles usam os padrões com IGNORECASE
+_CASEFOLD_EXCEPTIONS = frozenset("İıſK")
+
+# Sinônimos de cada tipo de imóvel, em ordem de prioridade: o primeiro tipo com
+# um sinônimo contido no valor extraído vence
+PROPERTY_TYPE_SYNONYMS = {
+    "warehouse": ("warehouse", "galpão", "galpao", "almacén", "almacen", "storage"),
+    "office": ("office", "escritório", "escritorio", "oficina"),
+    "store": ("store", "loja", "tienda", "retail"),
+    "industrial": ("industrial", "factory", "manufacturing"),
+    "apartment": ("apartment", "apartamento", "flat"),
+}
+
+def _lowercase_pattern(pattern: str) -> str:
+    """
+    Case-sensitive equivalent of `pattern` under re.IGNORECASE, for text already
+    lowercased with str.lower() (and without _CASEFOLD_EXCEPTIONS).
+    """
+    if re.search(r'\\[A-Z]', pattern):
+        raise ValueError(f"Padrão com escape em maiúscula não pode ser convertido: {pattern}")
+    for letters in _LETTER_CLASSES:
+        pattern = pattern.replace(letters, _LOWERCASE_LETTER_CLASS)
+    return pattern.lower()
+
+class FieldExtractor:
+    """
+    Extracts the required fields (budget, total_size, property_type, city) from one text.
+
+    Patterns and cleanups are compiled once, when the extractor is created. The
+    text is lowercased once and searched with case-sensitive equivalents of the
+    patterns, several times faster in `re` than re.IGNORECASE; the values found
+    are the same, since each cleanup normalizes case anyway. The property type is
+    normalized through a synonym lookup table (exact synonym first, then the
+    synonyms it contains, in priority order). The city is looked up first in the
+    gazetteer of the CityRecognizer, which returns canonical names ("CDMX" ->
+    "Mexico City") wherever the city is mentioned (with `locative_only`, as in the
+    assistant's replies, only after a preposition of place); only cities outside the
+    gazetteer go through the "in <words>" pattern, whose candidates containing a
+    word of the city's disallowed_words are skipped with a set lookup.
+    """
+
+    def __init__(self, patterns: Optional[Dict[str, str]] = None, city_recognizer: Optional[CityRecognizer] = None):
+        patterns = patterns or FIELD_PATTERNS
+        self.city_recognizer = city_recognizer or default_city_recognizer
+        self.patterns: Dict[str, Pattern] = {
+            field: re.compile(pattern, re.IGNORECASE) for field, pattern in patterns.items()
+        }
+        self._lowercase_patterns: Dict[str, Pattern] = {
+            field: re.compile(_lowercase_pattern(pattern)) for field, pattern in patterns.items()
+        }
+        self._non_numeric = re.compile(r'[^\d.]')
+        self._property_type_tail = re.compile(r'\s+(?:in|at|near|with|that|for|to).*$')
+        self._city_suffix = re.compile(r'\s+(?:zone|area|región|zona|área|area).*$', re.IGNORECASE)
+        # sinônimo -> tipo (consulta direta) e (sinônimo, tipo) em ordem de prioridade
+        self._property_types = {
+            synonym: property_type
+            for property_type, synonyms in reversed(list(PROPERTY_TYPE_SYNONYMS.items()))
+            for synonym in synonyms
+        }
+        self._property_type_order = tuple(
+            (synonym, property_type)
+            for property_type, synonyms in PROPERTY_TYPE_SYNONYMS.items()
+            for synonym in synonyms
+        )
+        self._city_stopwords = frozenset(FIELD_VALIDATION["city"]["disallowed_words"])
+
+    def extract(self, text: str, fields: Optional[Collection[str]] = None, locative_only: bool = False) -> Dict[str, str]:
+        """
+        Extract the fields found in `text`, already validated with `validate_field`.
+
+        Args:
+            text (str): Text to extract fields from
+            fields (Collection[str], optional): Only search for these fields (all when omitted)
+            locative_only (bool): Only take a gazetteer city stated after a preposition
+                of place ("in Monterrey"), not any city mentioned; for the assistant's
+                replies, which list cities when asking for one
+
+        Returns:
+            Dict[str, str]: Dictionary of extracted fields
+        """
+        extracted_fields = {}
+        if fields is not None and not fields:
+            return extracted_fields
+        if _CASEFOLD_EXCEPTIONS.isdisjoint(text):
+            patterns, text = self._lowercase_patterns, text.lower()
+        else:
+            patterns = self.patterns
+        for field, pattern in patterns.items():
+            if fields is not None and field not in fields:
+                continue
+            if field == "city":
+                city = self.city_recognizer.recognize(text, locative=locative_only)
+                validated_value = validate_field(field, city) if city is not None else None
+                if validated_value is not None:
+                    extracted_fields[field] = validated_value
+                    logger.debug(f"Field extracted: {field} = {validated_value} (gazetteer)")
+                    continue
+            match = pattern.search(text)
+            if not match:
+                continue
+            value = self._clean(field, match.group(1).strip())
+            if value is None:
+                continue
+            validated_value = validate_field(field, value)
+            if validated_value is not None:
+                extracted_fields[field] = validated_value
+                logger.debug(f"Field extracted: {field} = {validated_value}")
+        return extracted_fields
+
+    def normalize_property_type(self, value: str) -> str:
+        """Map a property type in any supported language to its English name (unknown types unchanged)."""
+        property_type = self._property_types.get(value)
+        if property_type is not None:
+            return property_type
+        for synonym, property_type in self._property_type_order:
+            if synonym in value:
+                return property_type
+        return value
+
+    def _clean(self, field: str, value: str) -> Optional[str]:
+        """Normalize a raw match; None discards it."""
+        if field == "budget" or field == "total_size":
+            # Remover símbolos de moeda e unidades
+            return self._non_numeric.sub('', value)
+        if field == "property_type":
+            value = self._property_type_tail.sub('', value.lower())
+            return self.normalize_property_type(value)
+        if field == "city":
+            value = self._city_suffix.sub('', value.title())
+            # Um fragmento com uma cidade conhecida dentro ("Monterrey O Puebla") não é uma cidade
+            city = self.city_recognizer.canonical_name(value)
+            if city is not None:
+                return city
+            if self.city_recognizer.recognize(value) is not None:
+                return None
+            # Descartar o que parece um fragmento de frase
+            words = value.lower().split()
+            if len(words) > 3 or not self._city_stopwords.isdisjoint(words):
+                return None
+        return value
+
+class ExtractionStats:
+    """
+    Thread-safe counts, reported in /metrics, of the field searches run and skipped
+    on the LLM responses (only fields still missing are searched there). Turns whose
+    fields came from the model's structured output are counted apart.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.turns = 0
+        self.searched = 0
+        self.skipped = 0
+        self.responses_skipped = 0
+        self.structured_turns = 0
+
+    def record(self, searched: int, skipped: int) -> None:
+        """Add one turn's LLM response: `searched` field searches run and `skipped` avoided."""
+        with self._lock:
+            self.turns += 1
+            self.searched += searched
+            self.skipped += skipped
+            if skipped and skipped == len(FIELD_PATTERNS):
+                self.responses_skipped += 1
+
+    def record_structured(self) -> None:
+        """Add one turn whose fields the model returned, so its response was not searched."""
+        with self._lock:
+            self.structured_turns += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            turns = self.turns or 1
+            return {
+                "turns": self.turns,
+                "fields_searched_per_turn": self.searched / turns,
+                "fields_skipped_per_turn": self.skipped / turns,
+                "responses_skipped": self.responses_skipped,  # nenhum campo faltando
+                "structured_turns": self.structured_turns,
+            }
+
+# Extrator compartilhado (padrões compilados uma vez por processo)
+field_extractor = FieldExtractor()
+
+# Buscas de campos feitas e evitadas nas respostas do LLM
+extraction_stats = ExtractionStats()
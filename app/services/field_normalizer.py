@@ -0,0 +1,176 @@
+import logging
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+# Configurar o logger
+logger = logging.getLogger("field_normalizer")
+
+# Campos numéricos gravados ao lado do texto original de cada campo
+NUMERIC_FIELDS = {
+    "budget": ("budget_amount", "budget_currency", "budget_period"),
+    "total_size": ("total_size_m2", "total_size_unit"),
+}
+
+# Moedas reconhecidas no texto ("$" sozinho é ambíguo entre USD e MXN e não define moeda)
+CURRENCIES = {
+    "USD": ("usd", "us$", "dollars", "dollar", "dólares", "dolares", "dólar", "dolar"),
+    "MXN": ("mxn", "mx$", "pesos", "peso"),
+    "EUR": ("eur", "€", "euros", "euro"),
+    "GBP": ("gbp", "£", "pounds"),
+    "BRL": ("brl", "r$", "reais"),
+    "CAD": ("cad", "c$"),
+}
+
+# Período do orçamento: aluguel mensal, anual ou valor único quando ausente
+BUDGET_PERIODS = {
+    "month": r"(?:per|a|al|por|ao|/)\s*(?:month|mo|mes|mês)|monthly|mensual(?:es|mente)?|mensal(?:mente)?",
+    "year": r"(?:per|a|al|por|ao|/)\s*(?:year|yr|año|ano)|yearly|annual(?:ly)?|anual(?:es|mente)?",
+}
+
+# Unidades de área: (fator para m², expressão regular); sem unidade o valor é tratado como m²
+AREA_UNITS = {
+    "m2": (1.0, r"m²|m2|sqm|mts?2?|square met(?:er|re)s?|met(?:er|re)s?|metros?(?: cuadrados| quadrados)?"),
+    "sqft": (0.09290304, r"sq\.?\s?ft|ft²|ft2|square f(?:ee|oo)t|pies cuadrados|pés quadrados"),
+    "ha": (10000.0, r"hect[aá]reas?|hectares?|ha"),
+    "acre": (4046.8564224, r"acres?"),
+    "km2": (1000000.0, r"km²|km2|square kilomet(?:er|re)s?"),
+}
+
+# Multiplicadores escritos depois do número
+BUDGET_MULTIPLIERS = {
+    "k": 1e3, "mil": 1e3,
+    "m": 1e6, "mm": 1e6, "million": 1e6, "millions": 1e6, "millón": 1e6, "millon": 1e6,
+    "millones": 1e6, "milhão": 1e6, "milhao": 1e6, "milhões": 1e6, "milhoes": 1e6,
+}
+AREA_MULTIPLIERS = {"k": 1e3, "mil": 1e3}
+
+# Número com separadores de milhar opcionais (1,500,000 / 1.500.000 / 1 500 000) e decimais
+_NUMBER = r"(?<![\d.,])(\d{1,3}(?:[.,\s]\d{3})+(?:[.,]\d+)?|\d+(?:[.,]\d+)?)(?!\d)"
+
+def _alternatives(words: Iterable[str]) -> str:
+    """Regex alternation of `words`, longest first so prefixes never win."""
+    return "|".join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+
+def _parse_number(digits: str) -> float:
+    """
+    Parse a number written with either decimal convention.
+
+    With both separators the last one is the decimal point; a single kind of
+    separator is a thousands separator when it repeats or is followed by exactly
+    three digits ("15.000", "15,000"), otherwise a decimal point ("15.5", "1,5").
+    """
+    digits = re.sub(r"\s", "", digits)
+    dot, comma = digits.rfind("."), digits.rfind(",")
+    if dot >= 0 and comma >= 0:
+        thousands, decimal = (",", ".") if dot > comma else (".", ",")
+        return float(digits.replace(thousands, "").replace(decimal, "."))
+    if dot >= 0 or comma >= 0:
+        parts = digits.split("." if dot >= 0 else ",")
+        if len(parts) > 2 or (len(parts[-1]) == 3 and parts[0] != "0"):
+            return float("".join(parts))
+        return float(".".join(parts))
+    return float(digits)
+
+class FieldNormalizer:
+    """
+    Turns the raw text of budget and total_size into canonical numeric fields.
+
+    The raw values stay untouched; next to them are stored `budget_amount`,
+    `budget_currency` and `budget_period`, and `total_size_m2` with the
+    `total_size_unit` the text was written in, so MongoDB can filter and sort them
+    with range queries on an index. Text is lowercased once and matched against
+    patterns compiled when the normalizer is created; plain digit strings, which is
+    what the field extractor stores, skip the patterns entirely. Fields that can't
+    be parsed normalize to None.
+    """
+
+    def __init__(self):
+        self._plain_number = re.compile(r"\d+")
+        self._budget_number = re.compile(_NUMBER + r"\s*(?:(" + _alternatives(BUDGET_MULTIPLIERS) + r")(?![a-zà-ÿ]))?")
+        self._area_number = re.compile(_NUMBER + r"\s*(?:(" + _alternatives(AREA_MULTIPLIERS) + r")(?![a-zà-ÿ]))?")
+        self._currencies = {word: currency for currency, words in CURRENCIES.items() for word in words}
+        self._currency = re.compile(r"(?<![a-zà-ÿ])(" + _alternatives(self._currencies) + r")(?![a-zà-ÿ])")
+        self._period = re.compile("|".join(
+            rf"(?P<{period}>(?<![a-zà-ÿ])(?:{pattern})(?![a-zà-ÿ]))" for period, pattern in BUDGET_PERIODS.items()
+        ))
+        self._area_unit = re.compile("|".join(
+            rf"(?P<{unit}>(?<![a-zà-ÿ])(?:{pattern})(?![a-zà-ÿ]))" for unit, (_, pattern) in AREA_UNITS.items()
+        ))
+
+    def normalize(self, field: str, value: Optional[str]) -> Dict[str, Any]:
+        """
+        Normalize one raw value of `field` ("budget" or "total_size").
+
+        Returns:
+            Dict[str, Any]: The field's NUMERIC_FIELDS, None where the text gave no value
+        """
+        if field == "budget":
+            return self._normalize_budget(value)
+        if field == "total_size":
+            return self._normalize_total_size(value)
+        raise ValueError(f"Campo sem normalização numérica: {field}")
+
+    def normalize_many(self, field: str, values: List[Optional[str]]) -> List[Dict[str, Any]]:
+        """
+        Normalize a batch of raw values of `field`, in order.
+
+        Each distinct value is parsed once; the same few budgets and sizes repeat
+        across many conversations, so backfills mostly hit the batch's lookup table.
+        """
+        results: Dict[Optional[str], Dict[str, Any]] = {}
+        for value in values:
+            if value not in results:
+                results[value] = self.normalize(field, value)
+        return [dict(results[value]) for value in values]
+
+    def numeric_fields(self, fields: Dict[str, Any]) -> Dict[str, Any]:
+        """The numeric fields of the budget and total_size present in `fields` (for `$set`)."""
+        numeric: Dict[str, Any] = {}
+        for field in NUMERIC_FIELDS:
+            if field in fields:
+                numeric.update(self.normalize(field, fields[field]))
+        return numeric
+
+    def _normalize_budget(self, value: Optional[str]) -> Dict[str, Any]:
+        amount = currency = period = None
+        if isinstance(value, str):
+            if self._plain_number.fullmatch(value):
+                amount = float(value)
+            else:
+                text = value.lower()
+                amount = self._number(self._budget_number, BUDGET_MULTIPLIERS, text)
+                match = self._currency.search(text)
+                currency = self._currencies[match.group(1)] if match else None
+                match = self._period.search(text)
+                period = match.lastgroup if match else None
+        return {"budget_amount": amount, "budget_currency": currency, "budget_period": period}
+
+    def _normalize_total_size(self, value: Optional[str]) -> Dict[str, Any]:
+        size = unit = None
+        if isinstance(value, str):
+            if self._plain_number.fullmatch(value):
+                size = float(value)
+            else:
+                text = value.lower()
+                size = self._number(self._area_number, AREA_MULTIPLIERS, text)
+                match = self._area_unit.search(text)
+                if match:
+                    unit = match.lastgroup
+                    if size is not None:
+                        size = round(size * AREA_UNITS[unit][0], 2)
+        return {"total_size_m2": size, "total_size_unit": unit}
+
+    def _number(self, pattern, multipliers: Dict[str, float], text: str) -> Optional[float]:
+        """The first number in `text`, scaled by the multiplier written after it."""
+        match = pattern.search(text)
+        if not match:
+            return None
+        try:
+            number = _parse_number(match.group(1))
+        except ValueError:
+            logger.debug(f"Número não reconhecido: {match.group(1)}")
+            return None
+        return number * multipliers[match.group(2)] if match.group(2) else number
+
+# Normalizador compartilhado (padrões compilados uma vez por processo)
+field_normalizer = FieldNormalizer()
@@ -0,0 +1,217 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional, Tuple
+from pymongo import ASCENDING, UpdateOne
+from ..services.mongodb_service import MongoDBService
+
+logger = logging.getLogger("rate_limit_store")
+
+class MongoRateLimiter:
+    """
+    Sliding-window-counter rate limiter shared by every worker through MongoDB.
+
+    Requests are counted in fixed time buckets of `window` seconds, one document
+    per key and bucket (`_id` "<key>:<bucket>"), incremented with an atomic
+    `$inc` upsert and expired by a TTL index on `expires_at`. As in
+    SlidingWindowRateLimiter, the previous bucket is weighted by its overlap
+    with the sliding window.
+
+    `allow` never waits for MongoDB: it decides from the fleet-wide counts read
+    at the last sync plus the increments of this worker not yet confirmed. A
+    background thread sends the pending increments in one `bulk_write` every
+    `sync_interval` seconds and re-reads the counts of the keys used since the
+    previous sync. Between syncs the fleet can overshoot the limit by what the
+    other workers allowed in that interval. If the write fails the increments
+    are kept for the next sync, and if only the read fails they count as known;
+    either way decisions continue from local counts.
+    """
+
+    def __init__(self, mongodb_service: MongoDBService, collection_name: str = "rate_limits",
+                 max_requests: int = 100, window: float = 3600.0, max_keys: int = 100000,
+                 sync_interval: float = 1.0, clock: Callable[[], float] = time.time):
+        self.collection = mongodb_service.db[collection_name]
+        self.max_requests = max_requests
+        self.window = window
+        self.max_keys = max_keys
+        self.sync_interval = sync_interval
+        # Relógio de parede: os buckets precisam ser os mesmos em todos os workers
+        self._clock = clock
+        self._lock = threading.Lock()
+        # (key, bucket) -> contagem da frota lida no último sync
+        self._known: Dict[Tuple[str, int], int] = {}
+        # (key, bucket) -> incrementos deste worker ainda não enviados / em envio
+        self._pending: Dict[Tuple[str, int], int] = {}
+        self._inflight: Dict[Tuple[str, int], int] = {}
+        # key -> último uso; ordem é a recência de uso
+        self._last_seen: "OrderedDict[str, float]" = OrderedDict()
+        # Chaves usadas desde o último sync (contagens a reler)
+        self._touched: set = set()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.allowed = 0
+        self.rejected = 0
+        self.evictions = 0
+        self.syncs = 0
+        self.sync_errors = 0
+        self.last_sync_latency = 0.0
+
+    def ensure_indexes(self) -> None:
+        """Create the TTL index used to expire old buckets."""
+        try:
+            self.collection.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
+        except Exception as e:
+            logger.error(f"Erro ao criar índice TTL do rate limiting: {str(e)}")
+
+    def start(self) -> "MongoRateLimiter":
+        """Start the background sync thread (idempotent)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="rate-limit-sync", daemon=True)
+            self._thread.start()
+            logger.info(f"Rate limiting compartilhado iniciado na coleção {self.collection.name}")
+        return self
+
+    def stop(self, timeout: Optional[float] = 10.0) -> None:
+        """Send the pending increments and stop the sync thread (graceful shutdown)."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout)
+            self._thread = None
+        self.sync()
+
+    def allow(self, key: str) -> bool:
+        """Count a request from `key` and return False if it exceeds the limit."""
+        now = self._clock()
+        bucket = int(now // self.window)
+        with self._lock:
+            self._touch(key, now)
+            if self._estimate(key, bucket, now) >= self.max_requests:
+                self.rejected += 1
+                return False
+            self._pending[(key, bucket)] = self._pending.get((key, bucket), 0) + 1
+            self.allowed += 1
+            return True
+
+    def remaining(self, key: str) -> int:
+        """Return how many more requests `key` may make right now (as far as this worker knows)."""
+        now = self._clock()
+        with self._lock:
+            return max(self.max_requests - int(self._estimate(key, int(now // self.window), now)), 0)
+
+    def sync(self) -> bool:
+        """
+        Send the pending increments and refresh the counts of the keys used since the last sync.
+
+        Returns:
+            bool: False if MongoDB could not be reached (unwritten increments are kept)
+        """
+        current_bucket = int(self._clock() // self.window)
+        with self._lock:
+            self._inflight, self._pending = self._pending, {}
+            inflight = self._inflight
+            touched, self._touched = self._touched, set()
+
+        started = time.perf_counter()
+        try:
+            if inflight:
+                self.collection.bulk_write(
+                    [self._increment_op(key, bucket, count) for (key, bucket), count in inflight.items()],
+                    ordered=False
+                )
+        except Exception as e:
+            with self._lock:
+                for item, count in self._inflight.items():
+                    self._pending[item] = self._pending.get(item, 0) + count
+                self._inflight = {}
+                self._touched |= touched
+                self.sync_errors += 1
+            logger.error(f"Erro ao sincronizar rate limiting com o MongoDB: {str(e)}")
+            return False
+
+        with self._lock:
+            # Já gravados: contam como parte da frota até a leitura trazer a contagem nova,
+            # e não podem voltar para os pendentes (seriam somados duas vezes)
+            for item, count in inflight.items():
+                self._known[item] = self._known.get(item, 0) + count
+            self._inflight = {}
+
+        try:
+            ids = [f"{key}:{bucket}" for key in touched for bucket in (current_bucket - 1, current_bucket)]
+            documents = list(self.collection.find({"_id": {"$in": ids}}, {"key": 1, "bucket": 1, "count": 1})) if ids else []
+        except Exception as e:
+            with self._lock:
+                self._touched |= touched
+                self.sync_errors += 1
+            logger.error(f"Erro ao ler as contagens do rate limiting no MongoDB: {str(e)}")
+            return False
+
+        with self._lock:
+            for document in documents:
+                self._known[(document["key"], document["bucket"])] = document["count"]
+            self._purge_idle(self._clock())
+            # Buckets anteriores à janela deslizante e chaves removidas não contam mais
+            self._known = {item: count for item, count in self._known.items()
+                           if item[1] >= current_bucket - 1 and item[0] in self._last_seen}
+            self.syncs += 1
+            self.last_sync_latency = time.perf_counter() - started
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Return this worker's counters and sync metrics."""
+        with self._lock:
+            return {
+                "backend": "mongodb",
+                "collection": self.collection.name,
+                "keys": len(self._last_seen),
+                "max_keys": self.max_keys,
+                "max_requests": self.max_requests,
+                "window": self.window,
+                "pending": sum(self._pending.values()),
+                "allowed": self.allowed,
+                "rejected": self.rejected,
+                "evictions": self.evictions,
+                "syncs": self.syncs,
+                "sync_errors": self.sync_errors,
+                "last_sync_latency_ms": round(self.last_sync_latency * 1000, 3),
+            }
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.sync_interval):
+            self.sync()
+
+    def _count(self, key: str, bucket: int) -> int:
+        item = (key, bucket)
+        return self._known.get(item, 0) + self._inflight.get(item, 0) + self._pending.get(item, 0)
+
+    def _estimate(self, key: str, bucket: int, now: float) -> float:
+        overlap = 1.0 - (now - bucket * self.window) / self.window
+        return self._count(key, bucket - 1) * overlap + self._count(key, bucket)
+
+    def _touch(self, key: str, now: float) -> None:
+        self._last_seen[key] = now
+        self._last_seen.move_to_end(key)
+        self._touched.add(key)
+        while len(self._last_seen) > self.max_keys:
+            evicted, _ = self._last_seen.popitem(last=False)
+            self._touched.discard(evicted)
+            self.evictions += 1
+
+    def _purge_idle(self, now: float) -> None:
+        # Sem requisições há duas janelas, a estimativa da chave é zero: ela pode sair
+        while self._last_seen:
+            key, last_seen = next(iter(self._last_seen.items()))
+            if now - last_seen < 2 * self.window:
+                break
+            del self._last_seen[key]
+
+    def _increment_op(self, key: str, bucket: int, count: int) -> UpdateOne:
+        # O bucket é lido até o fim da janela seguinte (como janela anterior)
+        expires_at = datetime.fromtimestamp((bucket + 2) * self.window, tz=timezone.utc).replace(tzinfo=None)
+        return UpdateOne(
+            {"_id": f"{key}:{bucket}"},
+            {"$inc": {"count": count}, "$setOnInsert": {"key": key, "bucket": bucket, "expires_at": expires_at}},
+            upsert=True
+        )
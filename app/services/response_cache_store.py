@@ -0,0 +1,75 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from pymongo import ASCENDING
+from ..services.mongodb_service import MongoDBService
+
+logger = logging.getLogger("response_cache_store")
+
+class MongoResponseCacheStore:
+    """
+    Second-tier LLM response cache stored in a MongoDB collection.
+    
+    Shared by every worker that points at the same database, and survives
+    restarts. Documents are keyed by the cache digest and expire through a
+    TTL index on `expires_at`. Any MongoDB error is logged and treated as a
+    miss, so the cache can never break a chat request.
+    """
+    
+    def __init__(self, mongodb_service: MongoDBService, collection_name: str = "llm_response_cache", ttl: int = 3600):
+        self.collection = mongodb_service.db[collection_name]
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+    
+    def ensure_indexes(self):
+        """Create the TTL index used to expire cached responses."""
+        try:
+            self.collection.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
+        except Exception as e:
+            logger.error(f"Erro ao criar índice TTL do cache de respostas: {str(e)}")
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for `key`, or None on miss, expiry or error."""
+        try:
+            # The TTL monitor only runs periodically, so filter expired documents here too
+            document = self.collection.find_one(
+                {"_id": key, "expires_at": {"$gt": datetime.utcnow()}},
+                {"value": 1}
+            )
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Erro ao ler cache de respostas compartilhado: {str(e)}")
+            return None
+        
+        if document is None:
+            self.misses += 1
+            return None
+        
+        self.hits += 1
+        return document["value"]
+    
+    def set(self, key: str, value: Any) -> None:
+        """Store `value` under `key` with the configured TTL."""
+        now = datetime.utcnow()
+        try:
+            self.collection.update_one(
+                {"_id": key},
+                {"$set": {"value": value, "created_at": now, "expires_at": now + timedelta(seconds=self.ttl)}},
+                upsert=True
+            )
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Erro ao gravar cache de respostas compartilhado: {str(e)}")
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss/error counters for this worker."""
+        lookups = self.hits + self.misses
+        return {
+            "collection": self.collection.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "errors": self.errors,
+        }
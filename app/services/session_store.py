@@ -0,0 +1,240 @@
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from pymongo import ASCENDING
+from ..core.security import MAX_HISTORY_LENGTH
+
+# Configurar o logger
+logger = logging.getLogger("session_store")
+
+REQUIRED_FIELDS = ("budget", "total_size", "property_type", "city")
+
+class ConversationState:
+    """
+    Compact per-conversation state: the collected fields of one client and the
+    server-side transcript of already validated turns (last MAX_HISTORY_LENGTH messages).
+
+    `persisted_fields` is a snapshot of the fields last written to the collected_info
+    document (None until the first write), used to write only what changed.
+    """
+    __slots__ = ("conversation_id", "required_fields", "additional_fields", "history", "last_access", "persisted_fields")
+
+    def __init__(self, conversation_id: str, required_fields: Optional[Dict[str, Any]] = None,
+                 additional_fields: Optional[Dict[str, Any]] = None, history: Optional[List[Dict[str, str]]] = None):
+        self.conversation_id = conversation_id
+        self.required_fields = {field: None for field in REQUIRED_FIELDS}
+        if required_fields:
+            self.required_fields.update({k: v for k, v in required_fields.items() if k in self.required_fields})
+        self.additional_fields = dict(additional_fields or {})
+        self.history = deque(history or [], maxlen=MAX_HISTORY_LENGTH)
+        self.last_access = time.monotonic()
+        self.persisted_fields: Optional[Dict[str, Any]] = None
+
+    @property
+    def collected_fields(self) -> Dict[str, Any]:
+        """Required and additional fields merged, as returned by the API."""
+        return {**self.required_fields, **self.additional_fields}
+
+    @property
+    def is_complete(self) -> bool:
+        """Whether all required fields have been collected."""
+        return all(value is not None for value in self.required_fields.values())
+
+    def add_turn(self, user_message: str, assistant_message: str) -> None:
+        """Append a completed, already validated turn to the transcript."""
+        self.history.append({"role": "user", "content": user_message})
+        self.history.append({"role": "assistant", "content": assistant_message})
+
+    def changed_fields(self) -> Dict[str, Any]:
+        """Collected fields that differ from the last persisted snapshot (all of them before the first write)."""
+        fields = self.collected_fields
+        if self.persisted_fields is None:
+            return fields
+        return {k: v for k, v in fields.items() if k not in self.persisted_fields or self.persisted_fields[k] != v}
+
+    def mark_persisted(self, fields: Dict[str, Any]) -> None:
+        """Record `fields` as the last snapshot written to the collected_info document."""
+        # Novo dicionário em vez de update: a fila write-behind chama isto da sua thread
+        # enquanto uma requisição pode estar percorrendo o snapshot em changed_fields
+        self.persisted_fields = {**(self.persisted_fields or {}), **fields}
+
+    def to_document(self) -> Dict[str, Any]:
+        """Serialize the state for persistence."""
+        return {
+            "_id": self.conversation_id,
+            "required_fields": self.required_fields,
+            "additional_fields": self.additional_fields,
+            "history": list(self.history),
+        }
+
+    @classmethod
+    def from_document(cls, document: Dict[str, Any]) -> "ConversationState":
+        """Rebuild a state from a persisted document."""
+        state = cls(
+            document["_id"],
+            required_fields=document.get("required_fields"),
+            additional_fields=document.get("additional_fields"),
+            history=document.get("history"),
+        )
+        # Sessions are saved together with their collected_info document
+        state.persisted_fields = state.collected_fields
+        return state
+
+class MongoSessionPersistence:
+    """
+    Persist conversation states in MongoDB so any worker can restore a session.
+
+    Documents expire through a TTL index on `updated_at`.
+    """
+
+    def __init__(self, mongodb_service, collection_name: str = "chat_sessions", ttl: int = 7 * 24 * 3600):
+        self.collection = mongodb_service.db[collection_name]
+        self.ttl = ttl
+
+    def ensure_indexes(self) -> None:
+        """Create the TTL index used to expire persisted sessions."""
+        try:
+            self.collection.create_index([("updated_at", ASCENDING)], expireAfterSeconds=self.ttl)
+        except Exception as e:
+            logger.error(f"Erro ao criar índice TTL das sessões: {str(e)}")
+
+    def load(self, conversation_id: str) -> Optional[ConversationState]:
+        document = self.collection.find_one({"_id": conversation_id})
+        return ConversationState.from_document(document) if document else None
+
+    def save(self, state: ConversationState) -> None:
+        document = state.to_document()
+        document["updated_at"] = datetime.utcnow()
+        self.collection.replace_one({"_id": state.conversation_id}, document, upsert=True)
+
+    def delete(self, conversation_id: str) -> None:
+        self.collection.delete_one({"_id": conversation_id})
+
+class SessionStore:
+    """
+    In-process store of conversation states keyed by conversation_id.
+
+    Bounded by `max_sessions` (least recently used sessions are evicted first) and
+    by `idle_ttl` (sessions not used for that many seconds are dropped). With a
+    `persistence` backend, states missing locally are loaded from it and saved
+    states are written through, so a session survives eviction and can be
+    resumed on any worker.
+    """
+
+    def __init__(self, max_sessions: int = 10000, idle_ttl: float = 3600, persistence: Optional[MongoSessionPersistence] = None):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.persistence = persistence
+        self._sessions: "OrderedDict[str, ConversationState]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.restored = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, conversation_id: str) -> Optional[ConversationState]:
+        """Return the state for `conversation_id`, restoring it from persistence if needed."""
+        now = time.monotonic()
+        with self._lock:
+            self._purge_idle(now)
+            state = self._sessions.get(conversation_id)
+            if state is not None:
+                state.last_access = now
+                self._sessions.move_to_end(conversation_id)
+                return state
+
+        if self.persistence is None:
+            return None
+
+        try:
+            state = self.persistence.load(conversation_id)
+        except Exception as e:
+            logger.error(f"Erro ao restaurar sessão {conversation_id}: {str(e)}")
+            return None
+        if state is not None:
+            self.restored += 1
+            self._add(state)
+        return state
+
+    def get_or_create(self, conversation_id: Optional[str] = None) -> ConversationState:
+        """
+        Return the state for `conversation_id`, creating a new session if it does not exist.
+
+        Unknown ids that are not valid UUIDs are replaced by a freshly generated one.
+        """
+        if conversation_id:
+            state = self.get(conversation_id)
+            if state is not None:
+                return state
+            if not _is_valid_uuid(conversation_id):
+                logger.warning(f"conversation_id inválido ignorado: {conversation_id[:64]}")
+                conversation_id = None
+
+        state = ConversationState(conversation_id or str(uuid.uuid4()))
+        self.created += 1
+        self._add(state)
+        return state
+
+    def save(self, state: ConversationState) -> None:
+        """Write the state through to the persistence backend, if any."""
+        if self.persistence is None:
+            return
+        try:
+            self.persistence.save(state)
+        except Exception as e:
+            logger.error(f"Erro ao persistir sessão {state.conversation_id}: {str(e)}")
+
+    def delete(self, conversation_id: str) -> None:
+        """Remove a session locally and from the persistence backend."""
+        with self._lock:
+            self._sessions.pop(conversation_id, None)
+        if self.persistence is not None:
+            try:
+                self.persistence.delete(conversation_id)
+            except Exception as e:
+                logger.error(f"Erro ao remover sessão {conversation_id}: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return occupancy and lifecycle counters."""
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "created": self.created,
+                "restored": self.restored,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "persistent": self.persistence is not None,
+            }
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _add(self, state: ConversationState) -> None:
+        with self._lock:
+            state.last_access = time.monotonic()
+            self._sessions[state.conversation_id] = state
+            self._sessions.move_to_end(state.conversation_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+
+    def _purge_idle(self, now: float) -> None:
+        # Sessions are ordered by last access, so idle ones are at the front
+        while self._sessions:
+            state = next(iter(self._sessions.values()))
+            if now - state.last_access < self.idle_ttl:
+                break
+            self._sessions.popitem(last=False)
+            self.expirations += 1
+
+def _is_valid_uuid(value: str) -> bool:
+    try:
+        uuid.UUID(value)
+        return True
+    except (ValueError, AttributeError, TypeError):
+        return False
@@ -0,0 +1,244 @@
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from pymongo.errors import BulkWriteError
+
+# Configurar o logger
+logger = logging.getLogger("write_behind")
+
+# Códigos de erro de escrita que se repetem em qualquer nova tentativa
+# (11000: chave duplicada, 121: falha na validação do documento)
+PERMANENT_WRITE_ERRORS = {11000, 121}
+
+class _FlushRequest:
+    """Marker put on the queue to ask the worker to write everything before it."""
+    __slots__ = ("done",)
+
+    def __init__(self):
+        self.done = threading.Event()
+
+class WriteBehindQueue:
+    """
+    Background write-behind queue for MongoDB write operations.
+
+    The request path only enqueues pymongo write operations (InsertOne, UpdateOne, ...);
+    a worker thread groups them into `bulk_write` calls, flushing when `batch_size`
+    operations are pending or `flush_interval` seconds after the first pending one.
+
+    The queue is bounded by `max_queue`. When it is full, `enqueue` blocks for up to
+    `enqueue_timeout` seconds (backpressure) and then writes the operation
+    synchronously in the caller's thread, so memory stays bounded and nothing is dropped.
+
+    Batches are written unordered, so one failing operation doesn't hold back the
+    rest: only the operations that failed are retried, up to `max_retries` attempts,
+    and those that fail permanently (duplicate key, validation) are dropped at once.
+    An operation may carry an `on_written` callback, called (from the thread that
+    wrote it) once the operation itself has been written; a dropped operation is
+    logged, counted as failed and its callback is never called.
+    """
+
+    def __init__(self, collection, batch_size: int = 100, flush_interval: float = 0.5,
+                 max_queue: int = 10000, enqueue_timeout: float = 1.0, max_retries: int = 3):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.max_retries = max_retries
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats_lock = threading.Lock()
+        self.enqueued = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.sync_writes = 0
+        self.last_flush_latency = 0.0
+        self.max_flush_latency = 0.0
+        self._total_flush_latency = 0.0
+
+    def start(self) -> "WriteBehindQueue":
+        """Start the background worker (idempotent)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+            logger.info(f"Fila write-behind iniciada para a coleção {self.collection.name}")
+        return self
+
+    def enqueue(self, operation: Any, on_written: Optional[Callable[[], None]] = None) -> None:
+        """
+        Queue a write operation for the next bulk write.
+
+        Args:
+            operation: A pymongo write operation (e.g. InsertOne)
+            on_written (Callable, optional): Called once the operation has been written
+        """
+        item = (operation, on_written)
+        try:
+            self._queue.put(item, timeout=self.enqueue_timeout)
+            with self._stats_lock:
+                self.enqueued += 1
+        except queue.Full:
+            logger.warning("Fila write-behind cheia, gravando de forma síncrona")
+            with self._stats_lock:
+                self.sync_writes += 1
+            self._write([item])
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until every operation enqueued before this call has been written.
+
+        Returns:
+            bool: False if the timeout expired first
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self._drain()
+            return True
+        request = _FlushRequest()
+        self._queue.put(request)
+        return request.done.wait(timeout)
+
+    def stop(self, timeout: Optional[float] = 10.0) -> None:
+        """Flush pending operations and stop the worker (used on graceful shutdown)."""
+        if self._thread is None:
+            return
+        self.flush(timeout)
+        self._stop.set()
+        # Wake the worker up if it is waiting for the next operation
+        self._queue.put(_FlushRequest())
+        self._thread.join(timeout)
+        self._thread = None
+        logger.info("Fila write-behind encerrada")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth and flush metrics."""
+        with self._stats_lock:
+            return {
+                "depth": self._queue.qsize(),
+                "max_queue": self._queue.maxsize,
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "failed": self.failed,
+                "batches": self.batches,
+                "sync_writes": self.sync_writes,
+                "last_flush_latency_ms": round(self.last_flush_latency * 1000, 3),
+                "max_flush_latency_ms": round(self.max_flush_latency * 1000, 3),
+                "avg_flush_latency_ms": round(self._total_flush_latency / self.batches * 1000, 3) if self.batches else 0.0,
+            }
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch: List[Tuple[Any, Optional[Callable[[], None]]]] = []
+            flush_requests: List[_FlushRequest] = []
+            self._collect(first, batch, flush_requests)
+
+            # Gather more operations until the batch is full or the interval elapses
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and not flush_requests:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    self._collect(self._queue.get(timeout=remaining), batch, flush_requests)
+                except queue.Empty:
+                    break
+
+            if batch:
+                self._write(batch)
+            for request in flush_requests:
+                request.done.set()
+
+    def _collect(self, item: Any, batch: List[Any], flush_requests: List[_FlushRequest]) -> None:
+        if isinstance(item, _FlushRequest):
+            flush_requests.append(item)
+        else:
+            batch.append(item)
+
+    def _drain(self) -> None:
+        """Write whatever is queued from the caller's thread (worker not running)."""
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, _FlushRequest):
+                item.done.set()
+            else:
+                batch.append(item)
+        for start in range(0, len(batch), self.batch_size):
+            self._write(batch[start:start + self.batch_size])
+
+    def _write(self, batch: List[Tuple[Any, Optional[Callable[[], None]]]]) -> None:
+        pending = batch
+        for attempt in range(1, self.max_retries + 1):
+            operations = [operation for operation, _ in pending]
+            started = time.perf_counter()
+            try:
+                # Sem ordem, uma operação que falha não impede as seguintes do lote
+                self.collection.bulk_write(operations, ordered=False)
+                write_errors: Dict[int, Dict[str, Any]] = {}
+            except BulkWriteError as e:
+                write_errors = {error["index"]: error for error in e.details.get("writeErrors", [])}
+                if not write_errors:
+                    # Só erros de write concern: não se sabe o que foi gravado, tentar o lote de novo
+                    if self._give_up(pending, attempt, e):
+                        return
+                    continue
+            except Exception as e:
+                if self._give_up(pending, attempt, e):
+                    return
+                continue
+
+            latency = time.perf_counter() - started
+            written = [item for index, item in enumerate(pending) if index not in write_errors]
+            with self._stats_lock:
+                self.written += len(written)
+                self.batches += 1
+                self.last_flush_latency = latency
+                self.max_flush_latency = max(self.max_flush_latency, latency)
+                self._total_flush_latency += latency
+            logger.debug(f"Lote de {len(written)} operações gravado em {latency * 1000:.1f} ms")
+            self._notify(written)
+            if not write_errors:
+                return
+
+            # Erros permanentes (chave duplicada, validação) não mudam com novas tentativas
+            retry = []
+            for index, error in sorted(write_errors.items()):
+                if error.get("code") in PERMANENT_WRITE_ERRORS:
+                    logger.error(f"Operação descartada na gravação em lote: {error.get('errmsg')}")
+                    with self._stats_lock:
+                        self.failed += 1
+                else:
+                    retry.append(pending[index])
+            if not retry or self._give_up(retry, attempt, f"{len(retry)} operações com erro"):
+                return
+            pending = retry
+
+    def _give_up(self, pending: List[Any], attempt: int, error: Any) -> bool:
+        """Log a failed attempt; wait before the next one, or count `pending` as failed after the last."""
+        logger.error(f"Erro na gravação em lote ({len(pending)} operações, tentativa {attempt}): {str(error)}")
+        if attempt < self.max_retries:
+            time.sleep(min(0.1 * 2 ** attempt, 2.0))
+            return False
+        with self._stats_lock:
+            self.failed += len(pending)
+        return True
+
+    def _notify(self, written: List[Tuple[Any, Optional[Callable[[], None]]]]) -> None:
+        for _, on_written in written:
+            if on_written is None:
+                continue
+            try:
+                on_written()
+            except Exception as e:
+                logger.error(f"Erro no callback de gravação: {str(e)}")
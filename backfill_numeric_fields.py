@@ -0,0 +1,36 @@
+import argparse
+import logging
+from app.services.mongodb_service import MongoDBService
+
+# Configuração de logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("backfill_numeric_fields")
+
+def main():
+    """
+    One-off tool: add the numeric budget and total_size fields (budget_amount,
+    budget_currency, budget_period, total_size_m2, total_size_unit) to the
+    collected_info documents written before they were stored.
+    """
+    parser = argparse.ArgumentParser(description="Preenche os campos numéricos de orçamento e tamanho em collected_info")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Documentos por lote")
+    parser.add_argument("--recompute", action="store_true", help="Normalizar de novo todos os documentos, não só os que não têm os campos")
+    parser.add_argument("--dry-run", action="store_true", help="Apenas contar os documentos que seriam atualizados")
+    args = parser.parse_args()
+
+    service = MongoDBService()
+    try:
+        stats = service.backfill_numeric_fields(batch_size=args.batch_size, recompute=args.recompute, dry_run=args.dry_run)
+        prefix = "[dry-run] " if args.dry_run else ""
+        logger.info(
+            f"{prefix}{stats['updated']} de {stats['scanned']} documentos atualizados, "
+            f"{stats['unparsed']} valores não reconhecidos"
+        )
+    finally:
+        service.close()
+
+if __name__ == "__main__":
+    main()
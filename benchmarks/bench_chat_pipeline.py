@@ -0,0 +1,64 @@
+"""
+Benchmark: per-stage breakdown of a /chat request.
+
+Runs the route's request preparation and ChatService.process_message_async under
+a tracked request, with Gemini and MongoDB replaced by the fakes of
+bench_concurrent_chat.py, and prints how many times each stage ran per request
+and how long it took. sanitize_input must run once per request and
+validate_history only when a client-sent history seeds a new conversation.
+
+Usage:
+    python benchmarks/bench_chat_pipeline.py [--requests 200] [--llm-ms 0]
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-key")
+
+import google.generativeai as genai  # noqa: E402
+
+import bench_concurrent_chat as fakes  # noqa: E402
+from app.api.routes import _prepare_chat_request  # noqa: E402
+from app.api.schemas import ChatRequest  # noqa: E402
+from app.core import llm  # noqa: E402
+from app.core.request_pipeline import StageStats, track_request  # noqa: E402
+from app.services.chat_service import ChatService  # noqa: E402
+
+MESSAGE = "I need a <b>warehouse</b> in Monterrey (about 500 m2) with a budget of 20000 for my company"
+
+
+async def _run(service, total):
+    stats = StageStats()
+    conversation_id = None
+    for i in range(total):
+        request = ChatRequest(message=f"{MESSAGE} #{i}", conversation_id=conversation_id)
+        with track_request() as timings:
+            sanitized_message, conversation_id = _prepare_chat_request(request, service)
+            await service.process_message_async(message=sanitized_message, conversation_id=conversation_id)
+        stats.record(timings)
+    return stats.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="Chat turns measured")
+    parser.add_argument("--llm-ms", type=float, default=0.0, help="Simulated Gemini latency")
+    args = parser.parse_args()
+
+    fakes.LLM_LATENCY = args.llm_ms / 1000
+    fakes.MONGO_LATENCY = 0.0
+    genai.GenerativeModel = fakes._FakeModel
+    llm.response_cache.max_entries = 0
+
+    service = ChatService(mongodb_service=fakes._FakeMongoDBService())
+    report = asyncio.run(_run(service, args.requests))
+    print(f"{'stage':>18} {'calls/request':>14} {'ms/request':>11}")
+    for stage, values in sorted(report["stages"].items()):
+        print(f"{stage:>18} {values['calls_per_request']:>14.2f} {values['ms_per_request']:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark: city lookup cost as the gazetteer grows.
+
+Compares the Aho-Corasick CityRecognizer with the obvious alternative, one
+compiled re.IGNORECASE alternation of every name between word boundaries, on
+gazetteers padded with synthetic city names up to each size. The messages are
+the same at every size, so a flat column means the lookup cost does not depend
+on how many names the gazetteer holds. Both must find the same canonical city.
+
+Usage:
+    python benchmarks/bench_city_recognizer.py [--rounds 200] [--sizes 64,1000,10000]
+"""
+import argparse
+import os
+import random
+import re
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.city_recognizer import DEFAULT_GAZETTEER, CityRecognizer, fold  # noqa: E402
+
+MESSAGES = [
+    "I'm looking for a warehouse in Monterrey with loading docks.",
+    "Busco una oficina en CDMX, cerca de Reforma, de unos 200 metros cuadrados.",
+    "We want a store in New York City, budget is 15000 per month.",
+    "Necesito un almacén en Querétaro o en Guadalajara.",
+    "Hello, can you help me find something for my team? We are flexible on the location.",
+    "Tenho um budget de 12000 para um galpão perto de São Paulo.",
+]
+
+
+class RegexRecognizer:
+    """One alternation of every folded name, longest first, matched on folded text."""
+
+    def __init__(self, gazetteer):
+        self._names = {}
+        for name, aliases in gazetteer.items():
+            for alias in (name, *aliases):
+                self._names.setdefault(fold(alias), name)
+        alternatives = "|".join(re.escape(key) for key in sorted(self._names, key=len, reverse=True))
+        self._pattern = re.compile(r"(?<!\w)(?:" + alternatives + r")(?!\w)")
+
+    def recognize(self, text):
+        match = self._pattern.search(fold(text))
+        return self._names[match.group(0)] if match else None
+
+
+def _gazetteer(size):
+    gazetteer = dict(DEFAULT_GAZETTEER)
+    rng = random.Random(size)
+    while len(gazetteer) < size:
+        name = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 12))).title()
+        gazetteer.setdefault(name, ())
+    return gazetteer
+
+
+def _lookups_per_second(recognizer, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for message in MESSAGES:
+            recognizer.recognize(message)
+    return rounds * len(MESSAGES) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=200, help="Passes over the messages per recognizer")
+    parser.add_argument("--sizes", default="64,1000,10000", help="Gazetteer sizes, comma separated")
+    args = parser.parse_args()
+
+    print(f"{'names':>7} {'build ms':>9} {'automaton/s':>12} {'regex/s':>9}")
+    for size in (int(size) for size in args.sizes.split(",")):
+        gazetteer = _gazetteer(size)
+        start = time.perf_counter()
+        automaton = CityRecognizer(gazetteer)
+        build_ms = (time.perf_counter() - start) * 1000
+        regex = RegexRecognizer(gazetteer)
+        mismatches = [m for m in MESSAGES if automaton.recognize(m) != regex.recognize(m)]
+        print(f"{size:>7} {build_ms:>9.1f} {_lookups_per_second(automaton, args.rounds):>12.0f} "
+              f"{_lookups_per_second(regex, args.rounds):>9.0f}")
+        for message in mismatches:
+            print(f"differs: {message!r} automaton={automaton.recognize(message)} regex={regex.recognize(message)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark: /chat throughput on a single event loop as in-flight requests grow.
+
+Compares the old behaviour (the async route calling the blocking
+ChatService.process_message) with ChatService.process_message_async. Gemini and
+MongoDB are replaced by fakes with fixed latencies, so only the concurrency
+model is measured.
+
+Usage:
+    python benchmarks/bench_concurrent_chat.py [--llm-ms 100] [--mongo-ms 5] [--inflight 1,8,32,128]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-key")
+
+import google.generativeai as genai  # noqa: E402
+
+from app.core import llm  # noqa: E402
+from app.services.chat_service import ChatService  # noqa: E402
+
+LLM_LATENCY = 0.1
+MONGO_LATENCY = 0.005
+REPLY = "Great, what size do you need and in which city?"
+
+
+class _FakeResponse:
+    text = REPLY
+
+
+class _FakeModel:
+    def __init__(self, model_name, system_instruction=None):
+        pass
+
+    def generate_content(self, contents):
+        time.sleep(LLM_LATENCY)
+        return _FakeResponse()
+
+    async def generate_content_async(self, contents):
+        await asyncio.sleep(LLM_LATENCY)
+        return _FakeResponse()
+
+
+class _FakeCollection:
+    name = "collected_info"
+
+    def bulk_write(self, operations, ordered=True):
+        time.sleep(MONGO_LATENCY)
+
+
+class _FakeMongoDBService:
+    db = {"collected_info": _FakeCollection()}
+
+    def upsert_collected_info(self, conversation_id, changed_fields):
+        time.sleep(MONGO_LATENCY)
+        return True
+
+    def collected_info_write_op(self, conversation_id, changed_fields):
+        return changed_fields
+
+
+async def _blocking_request(service, i):
+    # What the route did before: a sync call inside an async handler
+    return service.process_message(f"request {i}: I need a warehouse")
+
+
+async def _async_request(service, i):
+    return await service.process_message_async(f"request {i}: I need a warehouse")
+
+
+async def _measure(handler, service, inflight, total):
+    semaphore = asyncio.Semaphore(inflight)
+
+    async def one(i):
+        async with semaphore:
+            await handler(service, i)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return total / (time.perf_counter() - start)
+
+
+def main():
+    global LLM_LATENCY, MONGO_LATENCY
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm-ms", type=float, default=100.0, help="Simulated Gemini latency")
+    parser.add_argument("--mongo-ms", type=float, default=5.0, help="Simulated MongoDB insert latency")
+    parser.add_argument("--inflight", default="1,8,32,128", help="Comma-separated in-flight request counts")
+    parser.add_argument("--requests", type=int, default=128, help="Requests per measurement")
+    args = parser.parse_args()
+
+    LLM_LATENCY = args.llm_ms / 1000
+    MONGO_LATENCY = args.mongo_ms / 1000
+    genai.GenerativeModel = _FakeModel
+    # Unique prompts already miss the cache; disable it to be explicit
+    llm.response_cache.max_entries = 0
+
+    service = ChatService(mongodb_service=_FakeMongoDBService())
+    print(f"{'in-flight':>9} {'blocking req/s':>15} {'async req/s':>12}")
+    for inflight in [int(n) for n in args.inflight.split(",")]:
+        blocking = asyncio.run(_measure(_blocking_request, service, inflight, args.requests))
+        non_blocking = asyncio.run(_measure(_async_request, service, inflight, args.requests))
+        print(f"{inflight:>9} {blocking:>15.1f} {non_blocking:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark: ChatService field extraction, throughput and accuracy together.
+
+"before" is the previous implementation of ChatService.extract_fields, kept here
+as a reference: uncompiled re.search/re.sub calls and substring scans for the
+property-type synonyms and city stopwords. "after" is the precompiled
+FieldExtractor. Each is run over a labeled corpus of user messages and
+assistant responses (English, Spanish, Portuguese) and reports extractions per
+second next to its accuracy (share of text/field pairs whose extracted value
+matches the label, absence included), so a speedup can't silently change results.
+
+Usage:
+    python benchmarks/bench_field_extraction.py [--rounds 200]
+"""
+import argparse
+import logging
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.core.security import validate_field  # noqa: E402
+from app.services.field_extractor import FIELD_PATTERNS, FieldExtractor  # noqa: E402
+
+FIELDS = ("budget", "total_size", "property_type", "city")
+
+# (texto, campos esperados); campos ausentes devem não ser extraídos
+CORPUS = [
+    ("I'm looking for a warehouse in Monterrey.", {"property_type": "warehouse", "city": "Monterrey"}),
+    ("My budget is 20000 and I need about 500 square meters.", {"budget": "20000"}),
+    ("I need an office in Guadalajara, budget: 15000", {"property_type": "office", "city": "Guadalajara", "budget": "15000"}),
+    ("We want a store in New York.", {"property_type": "store", "city": "New York"}),
+    ("Looking for an office in Toronto, preferably downtown.", {"property_type": "office", "city": "Toronto"}),
+    ("I need a space of 300 sq ft for my team.", {"total_size": "300"}),
+    ("Busco una oficina en Puebla.", {"property_type": "office", "city": "Puebla"}),
+    ("Busco una oficina en CDMX.", {"property_type": "office", "city": "Mexico City"}),
+    ("Necesito un almacén con 800 metros en Querétaro.", {"property_type": "warehouse", "total_size": "800", "city": "Querétaro"}),
+    ("Quiero una tienda para vender ropa, presupuesto de 5000.", {"property_type": "store"}),
+    ("Tenho um budget de 12000 para um galpão.", {"budget": "12000"}),
+    ("Great! So you need a warehouse in Monterrey with a budget of 20000. What size are you looking for?",
+     {"property_type": "warehouse", "city": "Monterrey"}),
+    ("Perfect, an area of 250 square meters. Which city are you interested in?", {"total_size": "250"}),
+    ("Thanks! I have noted a budget is 45000 for an apartment in Mexico City.", {"budget": "45000", "city": "Mexico City"}),
+    ("I want a flat to rent.", {"property_type": "apartment"}),
+    ("I'm searching for an industrial space with loading docks.", {"property_type": "industrial"}),
+    ("Hello, can you help me?", {}),
+    ("The price is $3,500 per month.", {"budget": "3500"}),
+    ("I need the property near the airport.", {}),
+    ("We are looking for a factory that can hold 40 workers in Portland.", {"property_type": "industrial", "city": "Portland"}),
+    ("What is the minimum size you need?", {}),
+]
+
+
+class LegacyExtractor:
+    """Previous ChatService.extract_fields, unchanged apart from dropping logging."""
+
+    def __init__(self):
+        self.patterns = dict(FIELD_PATTERNS)
+
+    def extract(self, text):
+        extracted_fields = {}
+        for field, pattern in self.patterns.items():
+            match = re.search(pattern, text, re.IGNORECASE)
+            if match:
+                value = match.group(1).strip()
+                if field == "budget":
+                    value = re.sub(r'[^\d.]', '', value)
+                elif field == "total_size":
+                    value = re.sub(r'[^\d.]', '', value)
+                elif field == "property_type":
+                    value = value.strip().lower()
+                    value = re.sub(r'\s+(?:in|at|near|with|that|for|to).*$', '', value)
+                    if any(term in value for term in ["warehouse", "galpão", "galpao", "almacén", "almacen", "storage"]):
+                        value = "warehouse"
+                    elif any(term in value for term in ["office", "escritório", "escritorio", "oficina"]):
+                        value = "office"
+                    elif any(term in value for term in ["store", "loja", "tienda", "retail"]):
+                        value = "store"
+                    elif any(term in value for term in ["industrial", "factory", "manufacturing"]):
+                        value = "industrial"
+                    elif any(term in value for term in ["apartment", "apartamento", "flat"]):
+                        value = "apartment"
+                elif field == "city":
+                    value = value.strip().title()
+                    value = re.sub(r'\s+(?:zone|area|región|zona|área|area).*$', '', value, flags=re.IGNORECASE)
+                    if len(value.split()) > 3 or any(word.lower() in value.lower() for word in ["the", "and", "or", "but", "with", "for", "that", "this", "these", "those", "meet", "need", "want", "look", "search", "find"]):
+                        continue
+                validated_value = validate_field(field, value)
+                if validated_value is not None:
+                    if (field not in extracted_fields or
+                            len(validated_value) > len(extracted_fields[field]) or
+                            (field == "city" and "Mexico City" in validated_value)):
+                        extracted_fields[field] = validated_value
+        return extracted_fields
+
+
+def _accuracy(extractor):
+    correct = 0
+    for text, expected in CORPUS:
+        extracted = extractor.extract(text)
+        correct += sum(extracted.get(field) == expected.get(field) for field in FIELDS)
+    return correct / (len(CORPUS) * len(FIELDS))
+
+
+def _throughput(extractor, rounds):
+    texts = [text for text, _ in CORPUS]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in texts:
+            extractor.extract(text)
+    return rounds * len(texts) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=200, help="Passes over the corpus per implementation")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    legacy, extractor = LegacyExtractor(), FieldExtractor()
+    print(f"{'':>8} {'extractions/s':>14} {'accuracy':>9}")
+    before = _throughput(legacy, args.rounds)
+    after = _throughput(extractor, args.rounds)
+    print(f"{'before':>8} {before:>14.0f} {_accuracy(legacy):>8.1%}")
+    print(f"{'after':>8} {after:>14.0f} {_accuracy(extractor):>8.1%}")
+    print(f"speedup: {after / before:.1f}x")
+
+    # Onde os resultados diferem, mostrar os dois (devem ser só correções)
+    for text, expected in CORPUS:
+        old, new = legacy.extract(text), extractor.extract(text)
+        if old != new:
+            print(f"differs: {text!r}\n  before={old}\n  after={new}\n  expected={expected}")
+
+
+if __name__ == "__main__":
+    main()
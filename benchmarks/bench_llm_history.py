@@ -0,0 +1,99 @@
+"""
+Benchmark: per-turn latency of get_llm_response as the conversation history grows.
+
+The Gemini SDK is replaced by a fake model that sleeps for a fixed round-trip time
+on every network call, so the numbers only reflect how many calls each mode makes.
+
+Usage:
+    python benchmarks/bench_llm_history.py [--rtt-ms 50] [--depths 0,4,10,20]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-key")
+
+import google.generativeai as genai  # noqa: E402
+
+from app.core import llm  # noqa: E402
+
+
+class _FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class _FakeChat:
+    def __init__(self, rtt):
+        self.rtt = rtt
+
+    def send_message(self, message):
+        time.sleep(self.rtt)
+        return _FakeResponse("Sure, tell me more about the property you need.")
+
+
+class _FakeModel:
+    calls = 0
+    rtt = 0.05
+
+    def __init__(self, model_name, system_instruction=None):
+        self.model_name = model_name
+
+    def start_chat(self):
+        chat = _FakeChat(self.rtt)
+        original = chat.send_message
+
+        def counted(message):
+            _FakeModel.calls += 1
+            return original(message)
+
+        chat.send_message = counted
+        return chat
+
+    def generate_content(self, contents):
+        _FakeModel.calls += 1
+        time.sleep(self.rtt)
+        return _FakeResponse("Sure, tell me more about the property you need.")
+
+
+def _history(depth):
+    history = []
+    for i in range(depth):
+        role = "user" if i % 2 == 0 else "assistant"
+        history.append({"role": role, "content": f"message number {i} about a warehouse"})
+    return history
+
+
+def run(mode, depths, turns):
+    llm.settings.LLM_HISTORY_MODE = mode
+    print(f"\nmode={mode}")
+    print(f"{'history':>8} {'calls/turn':>11} {'ms/turn':>9}")
+    for depth in depths:
+        _FakeModel.calls = 0
+        start = time.perf_counter()
+        for turn in range(turns):
+            llm.response_cache.clear()
+            llm.get_llm_response(f"turn {turn} at depth {depth}", _history(depth))
+        elapsed = time.perf_counter() - start
+        print(f"{depth:>8} {_FakeModel.calls / turns:>11.1f} {elapsed / turns * 1000:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rtt-ms", type=float, default=50.0, help="Simulated Gemini round-trip time")
+    parser.add_argument("--depths", default="0,4,10,20", help="Comma-separated history depths")
+    parser.add_argument("--turns", type=int, default=5, help="Turns measured per depth")
+    args = parser.parse_args()
+
+    _FakeModel.rtt = args.rtt_ms / 1000
+    genai.GenerativeModel = _FakeModel
+    depths = [int(d) for d in args.depths.split(",")]
+
+    run("replay", depths, args.turns)
+    run("single_call", depths, args.turns)
+
+
+if __name__ == "__main__":
+    main()
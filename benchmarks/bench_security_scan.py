@@ -0,0 +1,80 @@
+"""
+Benchmark: cost per KB of check_for_dangerous_content, before and after.
+
+"before" is the previous implementation, kept here as a reference: one
+re.search per raw pattern string, then the four advanced-injection regexes.
+"after" is the current scanner (literal prefilter + precompiled rules) on a
+text it has not seen; "cached" is the same text again, answered from the
+verdict cache by its digest.
+Texts are real-estate chat messages (clean ASCII, clean Spanish with accents,
+clean with parentheses) and a dangerous message whose rule fires near the end.
+
+Usage:
+    python benchmarks/bench_security_scan.py [--kb 1] [--iterations 2000]
+"""
+import argparse
+import logging
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.core import security  # noqa: E402
+
+_ADVANCED_PATTERNS = [
+    r'(?i)(\\u|\\x|\\0|\\n|\\r|\\t)',
+    r'(?i)(U\+[0-9a-f]{4,6}|&#x?[0-9a-f]+;)',
+    r'(?i)(/\*.*?\*/|<!--.*?-->|#.*?$)',
+    r'(?i)(\+|concat|join|append)',
+]
+
+
+def legacy_check_for_dangerous_content(text):
+    if not text:
+        return False
+    for pattern in security.DANGEROUS_PATTERNS + _ADVANCED_PATTERNS:
+        if re.search(pattern, text):
+            return True
+    return False
+
+
+def _texts(kb):
+    size = kb * 1024
+    clean = "I need a warehouse in Monterrey of about 500 square meters with a budget of 20000. "
+    spanish = "Busco una oficina en Ciudad de México, tamaño de 120 metros, presupuesto 15000. "
+    parens = "Looking for an office (about 120 m2) near downtown (Monterrey), budget around 15000. "
+    return {
+        "clean_ascii": (clean * (size // len(clean) + 1))[:size],
+        "clean_accented": (spanish * (size // len(spanish) + 1))[:size],
+        "clean_with_parens": (parens * (size // len(parens) + 1))[:size],
+        "dangerous_at_end": (clean * (size // len(clean) + 1))[:size - 20] + " exec('rm -rf')",
+    }
+
+
+def _time(check, text, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        check(text)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--kb", type=int, default=1, help="Size of each scanned text in KB")
+    parser.add_argument("--iterations", type=int, default=2000, help="Scans measured per text")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    print(f"{'text':>18} {'before us/KB':>13} {'after us/KB':>12} {'cached us/KB':>13} {'speedup':>8}")
+    for name, text in _texts(args.kb).items():
+        assert legacy_check_for_dangerous_content(text) == security.check_for_dangerous_content(text)
+        before = _time(legacy_check_for_dangerous_content, text, args.iterations) / args.kb
+        after = _time(security._scan_for_dangerous_content, text, args.iterations) / args.kb
+        cached = _time(security.check_for_dangerous_content, text, args.iterations) / args.kb
+        print(f"{name:>18} {before:>13.1f} {after:>12.1f} {cached:>13.1f} {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
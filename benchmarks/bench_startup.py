@@ -0,0 +1,71 @@
+"""
+Benchmark: backend cold start, from `import main` to the first HTTP response.
+
+Each run starts a fresh interpreter (so no module is already imported), imports
+main.py, runs the FastAPI lifespan startup and serves GET /health in-process.
+By default MongoDB points at a non-routable address, which is the case that
+used to hang startup on server_info(): startup must not wait for it.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5] [--mongodb-uri mongodb://10.255.255.1:27017]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Runs in the child interpreter; prints one JSON line with the phase timings
+_CHILD = r"""
+import json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+client = TestClient(main.app)
+client.__enter__()
+ready = time.perf_counter()
+response = client.get("/health")
+first_response = time.perf_counter()
+assert response.status_code == 200
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "startup_ms": (ready - imported) * 1000,
+    "first_response_ms": (first_response - started) * 1000,
+}))
+"""
+
+
+def _run_once(env):
+    output = subprocess.run(
+        [sys.executable, "-c", _CHILD], cwd=ROOT, env=env,
+        capture_output=True, text=True, timeout=120, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Cold starts to measure")
+    parser.add_argument("--mongodb-uri", default="mongodb://10.255.255.1:27017/?connectTimeoutMS=30000",
+                        help="MongoDB URI the backend starts with (unreachable by default)")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault("GOOGLE_API_KEY", "benchmark-key")
+    env["MONGODB_URI"] = args.mongodb_uri
+    env["LOG_LEVEL"] = "WARNING"
+    env["LOG_TO_FILE"] = "false"
+
+    runs = [_run_once(env) for _ in range(args.runs)]
+    print(f"{'phase':>18} {'median ms':>10} {'max ms':>10}")
+    for phase in ("import_ms", "startup_ms", "first_response_ms"):
+        values = [run[phase] for run in runs]
+        print(f"{phase:>18} {statistics.median(values):>10.1f} {max(values):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
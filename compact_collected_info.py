@@ -0,0 +1,30 @@
+import argparse
+import logging
+from app.services.mongodb_service import MongoDBService
+
+# Configuração de logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("compact_collected_info")
+
+def main():
+    """
+    One-off tool: merge the per-turn collected_info documents written before the
+    per-conversation upsert into a single document per conversation_id.
+    """
+    parser = argparse.ArgumentParser(description="Compacta a coleção collected_info em um documento por conversa")
+    parser.add_argument("--dry-run", action="store_true", help="Apenas contar os documentos que seriam compactados")
+    args = parser.parse_args()
+
+    service = MongoDBService()
+    try:
+        stats = service.compact_collected_info(dry_run=args.dry_run)
+        prefix = "[dry-run] " if args.dry_run else ""
+        logger.info(f"{prefix}{stats['conversations']} conversas compactadas, {stats['removed']} documentos removidos")
+    finally:
+        service.close()
+
+if __name__ == "__main__":
+    main()
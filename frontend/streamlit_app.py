@@ -16,47 +16,77 @@ def init_session_state():
         st.session_state.messages = []
     if "collected_fields" not in st.session_state:
         st.session_state.collected_fields = {}
+    if "conversation_id" not in st.session_state:
+        st.session_state.conversation_id = None
     if "mongodb_documents" not in st.session_state:
         st.session_state.mongodb_documents = []
     if "mongodb_documents_df" not in st.session_state:
         st.session_state.mongodb_documents_df = None
+    if "mongodb_next_cursor" not in st.session_state:
+        st.session_state.mongodb_next_cursor = None
+    if "mongodb_filters" not in st.session_state:
+        st.session_state.mongodb_filters = {"city": "", "property_type": "", "conversation_id": ""}
     if "mongodb_collections" not in st.session_state:
         st.session_state.mongodb_collections = []
     if "selected_collection" not in st.session_state:
         st.session_state.selected_collection = "collected_info"
 
-def send_message(message: str) -> Dict:
-    """Send message to API and get response."""
+def error_message(response) -> str:
+    """Build the message shown to the user for an error response of the API."""
+    if response.status_code == 401:
+        return "Authentication failed. Please check your API key."
+    error_message = "An error occurred while processing your request."
+    try:
+        error_data = response.json()
+    except ValueError:
+        return error_message
+    if "error" in error_data:
+        error = error_data["error"]
+        if isinstance(error, dict):
+            if error.get("type") == "insufficient_quota":
+                error_message = "Sorry, the service is currently unavailable due to API quota limitations. Please try again later."
+            elif "message" in error:
+                error_message = error["message"]
+    return error_message
+
+def stream_message(message: str, placeholder) -> Dict:
+    """Send message to the streaming API, rendering tokens as they arrive.
+
+    Returns the final payload (same shape as /chat) or None on error.
+    """
     try:
         response = requests.post(
-            f"{API_URL}/chat",
+            f"{API_URL}/chat/stream",
             headers={"X-API-Key": API_KEY},
             json={
                 "message": message,
-                "conversation_history": st.session_state.messages
-            }
+                "conversation_id": st.session_state.conversation_id
+            },
+            stream=True
         )
         
-        # Check if the response status code indicates an error
         if response.status_code != 200:
-            error_data = response.json()
-            error_message = "An error occurred while processing your request."
-            
-            # Handle specific error cases
-            if response.status_code == 401:
-                error_message = "Authentication failed. Please check your API key."
-            elif "error" in error_data:
-                error = error_data["error"]
-                if isinstance(error, dict):
-                    if error.get("type") == "insufficient_quota":
-                        error_message = "Sorry, the service is currently unavailable due to API quota limitations. Please try again later."
-                    elif "message" in error:
-                        error_message = error["message"]
-            
-            st.error(error_message)
+            st.error(error_message(response))
             return None
-            
-        return response.json()
+        
+        text = ""
+        event = None
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:"):
+                data = json.loads(line[len("data:"):].strip())
+                if event == "token":
+                    text += data["text"]
+                    placeholder.markdown(text + "▌")
+                elif event == "done":
+                    # The final response is authoritative and replaces the streamed text
+                    placeholder.markdown(data["response"])
+                    return data
+                elif event == "error":
+                    st.error("An error occurred while processing your request.")
+                    return None
+        return None
     except requests.exceptions.ConnectionError:
         st.error(f"Could not connect to the server at {API_URL}. Please make sure the backend server is running.")
         return None
@@ -66,9 +96,15 @@ def send_message(message: str) -> Dict:
 
 def reset_conversation():
     """Reset the conversation."""
-    requests.post(f"{API_URL}/reset")
+    if st.session_state.conversation_id:
+        requests.post(
+            f"{API_URL}/reset",
+            headers={"X-API-Key": API_KEY},
+            params={"conversation_id": st.session_state.conversation_id}
+        )
     st.session_state.messages = []
     st.session_state.collected_fields = {}
+    st.session_state.conversation_id = None
 
 def fetch_mongodb_collections():
     """Fetch available MongoDB collections."""
@@ -84,15 +120,28 @@ def fetch_mongodb_collections():
     except Exception as e:
         st.error(f"Error connecting to MongoDB: {str(e)}")
 
-def fetch_mongodb_documents(collection_name: str = "collected_info"):
-    """Fetch documents from MongoDB."""
+def fetch_mongodb_documents(collection_name: str = "collected_info", load_more: bool = False):
+    """
+    Fetch a page of documents from MongoDB.
+    
+    With load_more, the next page (after the last cursor) is appended to the
+    documents already loaded; otherwise the listing starts over from the first page.
+    """
+    params = {"sort": "created_at", "descending": "true"}
+    params.update({k: v for k, v in st.session_state.mongodb_filters.items() if v})
+    if load_more and st.session_state.mongodb_next_cursor:
+        params["cursor"] = st.session_state.mongodb_next_cursor
     try:
         response = requests.get(
             f"{API_URL}/mongodb/documents/{collection_name}",
-            headers={"X-API-Key": API_KEY}
+            headers={"X-API-Key": API_KEY},
+            params=params
         )
         if response.status_code == 200:
-            st.session_state.mongodb_documents = response.json()
+            page = response.json()
+            previous = st.session_state.mongodb_documents if load_more else []
+            st.session_state.mongodb_documents = previous + page["documents"]
+            st.session_state.mongodb_next_cursor = page["next_cursor"]
             
             # Format documents and create DataFrame
             formatted_docs = [format_document(doc) for doc in st.session_state.mongodb_documents]
@@ -203,17 +252,17 @@ def main():
             
             # Get bot response
             with st.chat_message("assistant"):
-                with st.spinner("Thinking..."):
-                    response = send_message(prompt)
-                    if response:
-                        st.write(response["response"])
-                        st.session_state.messages.append(
-                            {"role": "assistant", "content": response["response"]}
-                        )
-                        st.session_state.collected_fields = response["collected_fields"]
-                        
-                        if response["is_complete"]:
-                            st.success("All required information has been collected!")
+                placeholder = st.empty()
+                response = stream_message(prompt, placeholder)
+                if response:
+                    st.session_state.messages.append(
+                        {"role": "assistant", "content": response["response"]}
+                    )
+                    st.session_state.collected_fields = response["collected_fields"]
+                    st.session_state.conversation_id = response["conversation_id"]
+                    
+                    if response["is_complete"]:
+                        st.success("All required information has been collected!")
     
     with tab2:
         st.header("MongoDB Documents")
@@ -247,13 +296,29 @@ def main():
         elif not st.session_state.mongodb_documents:
             fetch_mongodb_documents(selected_collection)
         
+        # Server-side filters
+        filter_col1, filter_col2, filter_col3 = st.columns(3)
+        with filter_col1:
+            city_filter = st.text_input("City", st.session_state.mongodb_filters.get("city", ""))
+        with filter_col2:
+            property_type_filter = st.text_input("Property type", st.session_state.mongodb_filters.get("property_type", ""))
+        with filter_col3:
+            conversation_filter = st.text_input("Conversation ID", st.session_state.mongodb_filters.get("conversation_id", ""))
+        filters = {"city": city_filter, "property_type": property_type_filter, "conversation_id": conversation_filter}
+        if filters != st.session_state.mongodb_filters:
+            st.session_state.mongodb_filters = filters
+            fetch_mongodb_documents(selected_collection)
+        
         # Display documents
         if st.session_state.mongodb_documents:
             # Show document count
-            st.info(f"Total documents: {len(st.session_state.mongodb_documents)}")
+            st.info(f"Loaded documents: {len(st.session_state.mongodb_documents)}")
+            if st.session_state.mongodb_next_cursor and st.button("Load more"):
+                fetch_mongodb_documents(selected_collection, load_more=True)
+                st.experimental_rerun()
             
-            # Search functionality
-            search_term = st.text_input("Search documents", "")
+            # Search functionality (within the loaded documents)
+            search_term = st.text_input("Search loaded documents", "")
             
             # Filter DataFrame based on search term
             filtered_df = st.session_state.mongodb_documents_df
@@ -1,8 +1,35 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.routes import health, mongodb
+from app.core.logging_config import configure_logging
+from app.routes import health, metrics, mongodb
 from app.api.routes import app as chat_app
+from app.api.middleware import RequestValidationMiddleware
+from app.api.dependencies import install_rate_limiter, warm_up_services, shutdown_services
 
-app = FastAPI()
+# Configurar o logging uma única vez para todo o processo
+configure_logging()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start accepting requests immediately and initialize services in the background;
+    on shutdown, flush queued MongoDB writes and close the shared MongoDB client.
+    
+    The rate limiter is installed before the first request (it does no I/O), so
+    every request is counted by the configured backend.
+    """
+    install_rate_limiter()
+    warm_up = asyncio.create_task(warm_up_services())
+    yield
+    if not warm_up.done():
+        warm_up.cancel()
+    shutdown_services()
+
+app = FastAPI(lifespan=lifespan)
+
+# Validar API key, rate limit e tamanho do corpo das rotas de chat antes de ler o corpo
+app.add_middleware(RequestValidationMiddleware)
 
 # Include health check router
 app.include_router(health.router)
@@ -10,9 +37,12 @@ app.include_router(health.router)
 # Include MongoDB router
 app.include_router(mongodb.router)
 
+# Include metrics router
+app.include_router(metrics.router)
+
 # Include chat router
 app.include_router(chat_app.router)
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)
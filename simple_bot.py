@@ -30,6 +30,7 @@ class SimpleBot:
             "X-API-Key": self.api_key
         }
         self.conversation_history = []
+        self.conversation_id = None
         logger.info(f"Bot inicializado com API URL: {api_url}")
     
     def send_message(self, message: str) -> dict:
@@ -42,7 +43,7 @@ class SimpleBot:
                 headers=self.headers,
                 json={
                     "message": message,
-                    "conversation_history": self.conversation_history
+                    "conversation_id": self.conversation_id
                 }
             )
             
@@ -54,6 +55,9 @@ class SimpleBot:
             data = response.json()
             logger.info(f"Resposta recebida: {data['response'][:100]}...")
             
+            # Manter a mesma conversa nas próximas mensagens
+            self.conversation_id = data["conversation_id"]
+            
             # Atualizar histórico de conversa
             self.conversation_history.append({"role": "user", "content": message})
             self.conversation_history.append({"role": "assistant", "content": data["response"]})
@@ -67,8 +71,14 @@ class SimpleBot:
         """Reseta a conversa."""
         try:
             logger.info("Resetando conversa")
-            requests.post(f"{self.api_url}/reset", headers=self.headers)
+            if self.conversation_id:
+                requests.post(
+                    f"{self.api_url}/reset",
+                    headers=self.headers,
+                    params={"conversation_id": self.conversation_id}
+                )
             self.conversation_history = []
+            self.conversation_id = None
             logger.info("Conversa resetada com sucesso")
         except Exception as e:
             logger.error(f"Erro ao resetar conversa: {str(e)}")
@@ -32,6 +32,7 @@ class TestBot:
             "X-API-Key": self.api_key
         }
         self.conversation_history = []
+        self.conversation_id = None
         self.collected_fields = {}
         logger.info(f"Bot inicializado com API URL: {api_url}")
     
@@ -45,7 +46,7 @@ class TestBot:
                 headers=self.headers,
                 json={
                     "message": message,
-                    "conversation_history": self.conversation_history
+                    "conversation_id": self.conversation_id
                 }
             )
             
@@ -57,6 +58,9 @@ class TestBot:
             data = response.json()
             logger.info(f"Resposta recebida: {data['response'][:100]}...")
             
+            # Manter a mesma conversa nas próximas mensagens
+            self.conversation_id = data["conversation_id"]
+            
             # Atualizar histórico de conversa
             self.conversation_history.append({"role": "user", "content": message})
             self.conversation_history.append({"role": "assistant", "content": data["response"]})
@@ -73,8 +77,14 @@ class TestBot:
         """Reseta a conversa."""
         try:
             logger.info("Resetando conversa")
-            requests.post(f"{self.api_url}/reset", headers=self.headers)
+            if self.conversation_id:
+                requests.post(
+                    f"{self.api_url}/reset",
+                    headers=self.headers,
+                    params={"conversation_id": self.conversation_id}
+                )
             self.conversation_history = []
+            self.conversation_id = None
             self.collected_fields = {}
             logger.info("Conversa resetada com sucesso")
         except Exception as e:
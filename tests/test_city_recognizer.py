@@ -0,0 +1,48 @@
+import json
+from app.services.city_recognizer import CityRecognizer
+
+def test_aliases_map_to_canonical_names():
+    """Test that aliases are matched without case or accents and return the canonical name"""
+    recognizer = CityRecognizer()
+    assert recognizer.recognize("I need an office in CDMX") == "Mexico City"
+    assert recognizer.recognize("Busco oficina en la ciudad de mexico") == "Mexico City"
+    assert recognizer.recognize("Algo en Queretaro, por favor") == "Querétaro"
+    assert recognizer.canonical_name(" cdmx ") == "Mexico City"
+
+def test_only_whole_words_match():
+    """Test that names inside other words are not matched"""
+    recognizer = CityRecognizer({"York": [], "Mobile": []})
+    assert recognizer.recognize("a mobile-friendly yorkshire office") == "Mobile"
+    assert recognizer.recognize("automobile in newyork") is None
+
+def test_leftmost_then_longest_match_wins():
+    """Test that overlapping names resolve to the one starting first, then the longest"""
+    recognizer = CityRecognizer({"New York": ["New York City"], "York": [], "Puebla": []})
+    assert recognizer.recognize("Puebla or New York City") == "Puebla"
+    assert recognizer.recognize("an office in New York City") == "New York"
+    assert [match[2] for match in recognizer.find_all("New York or York")] == ["New York", "York", "York"]
+
+def test_gazetteer_file_extends_the_default(tmp_path):
+    """Test that a gazetteer file adds cities on top of the built-in ones"""
+    path = tmp_path / "cities.json"
+    path.write_text(json.dumps({"Springfield": ["Springfield City"]}), encoding="utf-8")
+    recognizer = CityRecognizer.from_file(str(path))
+    assert recognizer.recognize("a store in springfield city") == "Springfield"
+    assert recognizer.recognize("a store in CDMX") == "Mexico City"
+    assert CityRecognizer.from_file(str(path), extend_default=False).recognize("CDMX") is None
+
+def test_locative_mode_needs_a_stated_place():
+    """Test that locative mode skips cities that are only mentioned or offered as options"""
+    recognizer = CityRecognizer()
+    assert recognizer.recognize("¿Monterrey, Guadalajara o CDMX?", locative=True) is None
+    assert recognizer.recognize("An office in Monterrey or Guadalajara?", locative=True) is None
+    assert recognizer.recognize("Una oficina en la CDMX, perfecto.", locative=True) == "Mexico City"
+    assert recognizer.recognize("So a warehouse in Monterrey with loading docks", locative=True) == "Monterrey"
+
+def test_match_offsets_point_into_the_original_text():
+    """Test that folding keeps the text length, even for "İ" (two characters once lowercased)"""
+    recognizer = CityRecognizer()
+    text = "İzmir no, İ want Monterrey"
+    matches = recognizer.find_all(text)
+    assert [(text[start:end], name) for start, end, name in matches] == [("Monterrey", "Monterrey")]
+    assert recognizer.recognize("İ need a warehouse in CDMX", locative=True) == "Mexico City"
@@ -0,0 +1,77 @@
+from app.services.field_extractor import FieldExtractor
+from app.core.request_pipeline import track_request
+
+def test_extracts_and_normalizes_fields():
+    """Test that every field is extracted and normalized from one message"""
+    extractor = FieldExtractor()
+    fields = extractor.extract("Necesito un almacén con size of 800 en Querétaro. Budget: 20000")
+    assert fields == {"budget": "20000", "total_size": "800", "property_type": "warehouse", "city": "Querétaro"}
+
+def test_matching_is_case_insensitive():
+    """Test that upper-case text gives the same values as lower-case text"""
+    extractor = FieldExtractor()
+    text = "I'm looking for an office in Monterrey, budget is 15000"
+    assert extractor.extract(text.upper()) == extractor.extract(text)
+    # Texto com caracteres que o re.IGNORECASE dobra para ASCII usa os padrões originais
+    assert extractor.extract(text + " K") == extractor.extract(text)
+
+def test_property_type_synonyms():
+    """Test that property types in any language map to their English name"""
+    extractor = FieldExtractor()
+    assert extractor.normalize_property_type("oficina") == "office"
+    assert extractor.normalize_property_type("big storage unit") == "warehouse"
+    assert extractor.normalize_property_type("office or store") == "office"
+    assert extractor.normalize_property_type("castle") == "castle"
+
+def test_city_stopwords_are_whole_words():
+    """Test that sentence fragments are skipped but cities containing a stopword are kept"""
+    extractor = FieldExtractor()
+    assert extractor.extract("We want a store in New York.")["city"] == "New York"
+    assert "city" not in extractor.extract("I need it in the morning.")
+
+def test_llm_response_only_fills_missing_fields(memory_chat_service):
+    """Test that the LLM response never overwrites fields the user already gave"""
+    from app.services.field_extractor import extraction_stats
+    service = memory_chat_service
+    state = service.get_state("conversation")
+    state.required_fields.update(budget="20000", property_type="office", city="Puebla")
+    skipped_before = extraction_stats.skipped
+
+    service._finish_turn("hi", "So you need a warehouse in Monterrey with a size of 500.", {}, state)
+
+    assert state.required_fields == {"budget": "20000", "total_size": "500", "property_type": "office", "city": "Puebla"}
+    assert extraction_stats.skipped - skipped_before == 3
+
+def test_llm_response_is_skipped_once_complete(memory_chat_service):
+    """Test that no field is searched in the LLM response when all are collected"""
+    from app.services.field_extractor import extraction_stats
+    service = memory_chat_service
+    state = service.get_state("conversation")
+    state.required_fields.update(budget="20000", total_size="500", property_type="office", city="Puebla")
+    responses_skipped_before = extraction_stats.responses_skipped
+
+    with track_request() as timings:
+        service._finish_turn("hi", "A warehouse in Monterrey, budget is 90000.", {}, state)
+
+    assert state.required_fields["city"] == "Puebla"
+    assert timings.calls("extract_fields") == 0
+    assert extraction_stats.responses_skipped == responses_skipped_before + 1
+
+def test_city_gazetteer_before_pattern():
+    """Test that known cities are found anywhere by alias and others still by the pattern"""
+    extractor = FieldExtractor()
+    assert extractor.extract("CDMX, oficina de 200 metros")["city"] == "Mexico City"
+    assert extractor.extract("I need a store in Springfield.")["city"] == "Springfield"
+
+def test_cities_listed_in_the_llm_response_are_ignored(memory_chat_service):
+    """Test that cities the assistant offers as options are not recorded as the user's city"""
+    service = memory_chat_service
+    state = service.get_state("conversation")
+
+    service._finish_turn("hi", "¿Te interesa Monterrey, Guadalajara o CDMX?", {}, state)
+    service._finish_turn("hi", "Do you prefer an office in Monterrey or Guadalajara?", {}, state)
+    service._finish_turn("hi", "¿Buscas algo en Monterrey o Puebla?", {}, state)
+    assert state.required_fields["city"] is None
+
+    service._finish_turn("hi", "Great, a warehouse in CDMX with a budget of 20000.", {}, state)
+    assert state.required_fields["city"] == "Mexico City"
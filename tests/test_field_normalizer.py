@@ -0,0 +1,40 @@
+from app.services.field_normalizer import FieldNormalizer
+
+def test_budget_amount_currency_and_period():
+    """Test that budgets in any format give the same canonical amount"""
+    normalizer = FieldNormalizer()
+    assert normalizer.normalize("budget", "15000")["budget_amount"] == 15000
+    assert normalizer.normalize("budget", "15,000")["budget_amount"] == 15000
+    assert normalizer.normalize("budget", "15.000")["budget_amount"] == 15000
+    assert normalizer.normalize("budget", "15.5")["budget_amount"] == 15.5
+    assert normalizer.normalize("budget", "20k USD al mes") == {
+        "budget_amount": 20000, "budget_currency": "USD", "budget_period": "month"
+    }
+    assert normalizer.normalize("budget", "R$ 12.500,50 por mês") == {
+        "budget_amount": 12500.5, "budget_currency": "BRL", "budget_period": "month"
+    }
+    assert normalizer.normalize("budget", "1.5 millones de pesos")["budget_amount"] == 1500000
+
+def test_total_size_is_converted_to_square_meters():
+    """Test that area units are converted to m² and the written unit is kept"""
+    normalizer = FieldNormalizer()
+    assert normalizer.normalize("total_size", "500") == {"total_size_m2": 500, "total_size_unit": None}
+    assert normalizer.normalize("total_size", "1,200 sq ft") == {"total_size_m2": 111.48, "total_size_unit": "sqft"}
+    assert normalizer.normalize("total_size", "2 hectáreas") == {"total_size_m2": 20000, "total_size_unit": "ha"}
+    assert normalizer.normalize("total_size", "800 metros cuadrados")["total_size_m2"] == 800
+
+def test_unparseable_values_normalize_to_none():
+    """Test that missing or non-numeric text clears the numeric fields"""
+    normalizer = FieldNormalizer()
+    assert normalizer.normalize("budget", None) == {"budget_amount": None, "budget_currency": None, "budget_period": None}
+    assert normalizer.normalize("total_size", "big")["total_size_m2"] is None
+
+def test_numeric_fields_follow_the_changed_fields():
+    """Test that only the numeric fields of the fields being written are produced"""
+    normalizer = FieldNormalizer()
+    assert normalizer.numeric_fields({"city": "Puebla"}) == {}
+    assert set(normalizer.numeric_fields({"budget": "100"})) == {"budget_amount", "budget_currency", "budget_period"}
+    results = normalizer.normalize_many("budget", ["100", "100", "200 eur"])
+    assert [result["budget_amount"] for result in results] == [100, 100, 200]
+    results[0]["budget_amount"] = 0
+    assert results[1]["budget_amount"] == 100
@@ -0,0 +1,82 @@
+import asyncio
+import json
+from app.api import middleware
+from app.api.middleware import JSON_BODY_STATE_KEY, RequestValidationMiddleware
+
+API_KEY = "k" * 32
+
+class RecordingApp:
+    """Downstream ASGI app that records what reached it"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, scope, receive, send):
+        message = await receive()
+        self.calls.append((scope.get("state", {}).get(JSON_BODY_STATE_KEY), message["body"]))
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+def _call(app, path="/chat", api_key=API_KEY, body=b"", chunks=None, headers=None):
+    headers = dict(headers or {})
+    if api_key:
+        headers["x-api-key"] = api_key
+    scope = {
+        "type": "http", "method": "POST", "path": path, "client": ("1.2.3.4", 1234),
+        "headers": [(k.encode(), v.encode()) for k, v in headers.items()],
+    }
+    chunks = list(chunks or [body])
+    received = []
+    sent = []
+
+    async def receive():
+        if chunks:
+            chunk = chunks.pop(0)
+            received.append(chunk)
+            return {"type": "http.request", "body": chunk, "more_body": bool(chunks)}
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return sent[0]["status"], received
+
+def test_body_is_decoded_once_and_shared(monkeypatch):
+    """Test that the route gets the decoded body and the original bytes"""
+    monkeypatch.setattr(middleware, "check_rate_limit", lambda client_ip: True)
+    downstream = RecordingApp()
+    body = json.dumps({"message": "hola"}).encode()
+
+    status, _ = _call(RequestValidationMiddleware(downstream, max_body_size=1024), body=body)
+
+    assert status == 200
+    assert downstream.calls == [({"message": "hola"}, body)]
+
+def test_cheap_rejections_do_not_read_the_body(monkeypatch):
+    """Test that a missing key or exhausted rate limit is rejected without reading the body"""
+    monkeypatch.setattr(middleware, "check_rate_limit", lambda client_ip: False)
+    downstream = RecordingApp()
+    app = RequestValidationMiddleware(downstream, max_body_size=1024)
+
+    assert _call(app, api_key=None, body=b"{}") == (401, [])
+    assert _call(app, body=b"{}") == (429, [])
+    assert downstream.calls == []
+
+def test_oversized_bodies_are_rejected_early(monkeypatch):
+    """Test that bodies over the limit get 413, by Content-Length or while streaming"""
+    monkeypatch.setattr(middleware, "check_rate_limit", lambda client_ip: True)
+    downstream = RecordingApp()
+    app = RequestValidationMiddleware(downstream, max_body_size=10)
+
+    assert _call(app, body=b"x" * 11, headers={"content-length": "11"}) == (413, [])
+    status, received = _call(app, chunks=[b"x" * 8, b"x" * 8, b"x" * 8])
+    assert status == 413
+    assert len(received) == 2
+    assert downstream.calls == []
+
+def test_unprotected_paths_pass_through():
+    """Test that health checks and other routes skip validation"""
+    downstream = RecordingApp()
+    status, _ = _call(RequestValidationMiddleware(downstream, max_body_size=10), path="/health", api_key=None, body=b"x" * 100)
+    assert status == 200
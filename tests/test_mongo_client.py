@@ -0,0 +1,37 @@
+import os
+from types import SimpleNamespace
+
+os.environ.setdefault("GOOGLE_API_KEY", "test_api_key")
+
+from app.core.mongo_client import PoolMetricsListener, close_mongo_clients, get_mongo_client, mongo_pool_stats
+
+def test_client_is_shared():
+    """Test that every caller gets the same client and pool"""
+    uri = "mongodb://localhost:27017/?connect=false"
+    try:
+        client = get_mongo_client(uri)
+        assert get_mongo_client(uri) is client
+        assert "localhost:27017" in mongo_pool_stats()
+    finally:
+        close_mongo_clients()
+    assert mongo_pool_stats() == {}
+
+def test_pool_listener_counts_checkouts_and_wait():
+    """Test checkout counters and pool-wait measurement"""
+    listener = PoolMetricsListener()
+    event = SimpleNamespace(address=("localhost", 27017), reason="timeout")
+
+    listener.connection_created(event)
+    for _ in range(3):
+        listener.connection_check_out_started(event)
+        listener.connection_checked_out(event)
+    listener.connection_checked_in(event)
+    listener.connection_check_out_started(event)
+    listener.connection_check_out_failed(event)
+
+    stats = listener.stats()
+    assert stats["checkouts"] == 3
+    assert stats["checkout_failures"] == 1
+    assert stats["in_use"] == 2
+    assert stats["open_connections"] == 1
+    assert stats["max_wait_ms"] >= 0.0
@@ -0,0 +1,61 @@
+from app.core.rate_limit import SlidingWindowRateLimiter
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+def test_requests_over_the_limit_are_rejected():
+    """Test that a key is limited to max_requests per window"""
+    limiter = SlidingWindowRateLimiter(max_requests=3, window=60, clock=_Clock())
+    
+    assert [limiter.allow("1.2.3.4") for _ in range(4)] == [True, True, True, False]
+    assert limiter.allow("5.6.7.8") is True
+    assert limiter.remaining("1.2.3.4") == 0
+    assert limiter.stats()["rejected"] == 1
+
+def test_previous_window_is_weighted_by_overlap():
+    """Test that requests from the previous window count proportionally to their overlap"""
+    clock = _Clock()
+    limiter = SlidingWindowRateLimiter(max_requests=4, window=60, clock=clock)
+    for _ in range(4):
+        assert limiter.allow("ip")
+    
+    # Metade da janela anterior ainda se sobrepõe: 4 * 0.5 = 2 requisições contam
+    clock.now += 90
+    assert limiter.remaining("ip") == 2
+    assert limiter.allow("ip") and limiter.allow("ip")
+    assert limiter.allow("ip") is False
+    
+    # Duas janelas depois, nada mais conta
+    clock.now += 120
+    assert limiter.remaining("ip") == 4
+
+def test_idle_keys_are_evicted():
+    """Test that keys without requests for two windows are purged periodically"""
+    clock = _Clock()
+    limiter = SlidingWindowRateLimiter(max_requests=10, window=60, purge_interval=30, clock=clock)
+    limiter.allow("idle")
+    clock.now += 30
+    limiter.allow("active")
+    
+    clock.now += 100
+    limiter.allow("active")
+    
+    assert len(limiter) == 1
+    assert limiter.stats()["expirations"] == 1
+
+def test_tracked_keys_are_capped():
+    """Test that the least recently seen key is evicted beyond max_keys"""
+    limiter = SlidingWindowRateLimiter(max_requests=10, window=60, max_keys=2, clock=_Clock())
+    limiter.allow("a")
+    limiter.allow("b")
+    limiter.allow("a")
+    limiter.allow("c")
+    
+    assert len(limiter) == 2
+    assert limiter.remaining("b") == 10
+    assert limiter.remaining("a") == 8
+    assert limiter.stats()["evictions"] == 1
@@ -0,0 +1,106 @@
+from app.services.rate_limit_store import MongoRateLimiter
+
+class FakeCollection:
+    """Applies $inc upserts in memory instead of talking to MongoDB"""
+    name = "rate_limits"
+
+    def __init__(self):
+        self.documents = {}
+        self.failing = False
+        self.failing_reads = False
+        self.bulk_writes = 0
+
+    def bulk_write(self, operations, ordered=True):
+        if self.failing:
+            raise RuntimeError("temporary failure")
+        self.bulk_writes += 1
+        for operation in operations:
+            document = self.documents.setdefault(operation._filter["_id"], dict(operation._doc["$setOnInsert"], count=0))
+            document["count"] += operation._doc["$inc"]["count"]
+
+    def find(self, query, projection=None):
+        if self.failing or self.failing_reads:
+            raise RuntimeError("temporary failure")
+        return [self.documents[_id] for _id in query["_id"]["$in"] if _id in self.documents]
+
+class FakeMongoDBService:
+    def __init__(self, collection):
+        self.db = {collection.name: collection}
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+def _worker(collection, clock, max_requests=10):
+    return MongoRateLimiter(FakeMongoDBService(collection), max_requests=max_requests, window=60, clock=clock)
+
+def test_limit_holds_across_workers():
+    """Test that requests allowed by one worker count against the limit of the others"""
+    collection, clock = FakeCollection(), Clock()
+    first, second = _worker(collection, clock), _worker(collection, clock)
+
+    assert all(first.allow("1.2.3.4") for _ in range(6))
+    assert first.sync()
+    # O segundo worker só conhece a contagem da frota depois de sincronizar
+    second.allow("1.2.3.4")
+    assert second.sync()
+
+    assert all(second.allow("1.2.3.4") for _ in range(3))
+    assert not second.allow("1.2.3.4")
+    assert second.stats()["rejected"] == 1
+
+def test_increments_are_batched_until_sync():
+    """Test that allow never touches MongoDB and a sync sends one bulk write"""
+    collection, clock = FakeCollection(), Clock()
+    limiter = _worker(collection, clock)
+    for key in ("a", "b", "a"):
+        limiter.allow(key)
+
+    assert collection.bulk_writes == 0
+    assert limiter.sync()
+    assert collection.bulk_writes == 1
+    assert {doc["key"]: doc["count"] for doc in collection.documents.values()} == {"a": 2, "b": 1}
+    assert limiter.stats()["pending"] == 0
+
+def test_failed_sync_keeps_increments_and_local_counts():
+    """Test that increments survive a MongoDB outage and still count locally"""
+    collection, clock = FakeCollection(), Clock()
+    limiter = _worker(collection, clock, max_requests=3)
+    collection.failing = True
+
+    assert all(limiter.allow("a") for _ in range(3))
+    assert not limiter.sync()
+    assert not limiter.allow("a")
+
+    collection.failing = False
+    assert limiter.sync()
+    assert sum(doc["count"] for doc in collection.documents.values()) == 3
+    assert limiter.stats()["sync_errors"] == 1
+
+def test_failed_read_does_not_resend_written_increments():
+    """Test that increments written before a failed read are not counted twice"""
+    collection, clock = FakeCollection(), Clock()
+    limiter = _worker(collection, clock, max_requests=5)
+    assert all(limiter.allow("a") for _ in range(3))
+
+    collection.failing_reads = True
+    assert not limiter.sync()
+    assert limiter.remaining("a") == 2
+
+    collection.failing_reads = False
+    assert limiter.sync()
+    assert sum(doc["count"] for doc in collection.documents.values()) == 3
+    assert limiter.remaining("a") == 2
+
+def test_previous_bucket_is_weighted_by_overlap():
+    """Test that the previous bucket's count fades out as the window slides"""
+    collection, clock = FakeCollection(), Clock(now=960.0)  # início de um bucket
+    limiter = _worker(collection, clock)
+    assert all(limiter.allow("a") for _ in range(10))
+    assert limiter.sync()
+
+    clock.now += 90  # metade do bucket seguinte
+    assert limiter.remaining("a") == 5
@@ -0,0 +1,66 @@
+import asyncio
+from app.core.executor import run_blocking
+from app.core.llm import sanitize_input, sanitize_user_message
+from app.core.request_pipeline import SanitizedText, StageStats, timed_stage, track_request
+
+def test_stages_are_recorded_only_inside_a_request():
+    """Test that stage timings are collected per request and ignored outside one"""
+    with timed_stage("outside"):
+        pass
+    
+    with track_request() as timings:
+        with timed_stage("work"):
+            with timed_stage("inner"):
+                pass
+        with timed_stage("work"):
+            pass
+    
+    assert timings.calls("work") == 2
+    assert timings.calls("inner") == 1
+    assert timings.calls("outside") == 0
+
+def test_message_is_sanitized_once_per_request():
+    """Test that the sanitized marker makes later sanitize calls no-ops"""
+    with track_request() as timings:
+        message = sanitize_user_message("I need an <b>office</b> in Monterrey")
+        assert isinstance(message, SanitizedText)
+        assert message == "I need an office in Monterrey"
+        
+        # Camadas seguintes (ChatService, get_llm_response) recebem o mesmo objeto
+        assert sanitize_user_message(message) is message
+        assert sanitize_input(message) is message
+    
+    assert timings.calls("sanitize_input") == 1
+    assert timings.calls("sanitize_html") == 2  # um em sanitize_input e um em sanitize_user_message
+
+def test_derived_text_loses_the_marker():
+    """Test that string operations on sanitized text return plain str"""
+    message = sanitize_user_message("I need a warehouse")
+    assert type(message + " <script>") is str
+    assert type(message.upper()) is str
+
+def test_timings_follow_blocking_work_into_the_executor():
+    """Test that run_blocking propagates the current request's timings"""
+    def blocking_work():
+        with timed_stage("blocking"):
+            pass
+    
+    async def handler():
+        with track_request() as timings:
+            await run_blocking(blocking_work)
+        return timings
+    
+    assert asyncio.run(handler()).calls("blocking") == 1
+
+def test_stage_stats_average_per_request():
+    """Test that the /metrics totals are reported per request"""
+    stats = StageStats()
+    for _ in range(2):
+        with track_request() as timings:
+            with timed_stage("sanitize_input"):
+                pass
+        stats.record(timings)
+    
+    report = stats.stats()
+    assert report["requests"] == 2
+    assert report["stages"]["sanitize_input"]["calls_per_request"] == 1
@@ -0,0 +1,85 @@
+import time
+import pytest
+from app.core.cache import BoundedTTLCache, make_cache_key
+
+def test_lru_eviction_by_entry_count():
+    """Test that the least recently used entry is evicted first"""
+    cache = BoundedTTLCache(max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    
+    # Touch "a" so that "b" becomes the least recently used entry
+    assert cache.get("a") == "1"
+    cache.set("c", "3")
+    
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+    assert cache.stats()["evictions"] == 1
+
+def test_eviction_by_byte_size():
+    """Test that the cache stays under its byte bound"""
+    cache = BoundedTTLCache(max_entries=100, max_bytes=10)
+    cache.set("a", "12345")
+    cache.set("b", "12345")
+    cache.set("c", "12345")
+    
+    stats = cache.stats()
+    assert stats["bytes"] <= 10
+    assert stats["entries"] == 2
+    assert cache.get("a") is None
+
+def test_oversized_value_is_not_cached():
+    """Test that a value larger than the byte bound is ignored"""
+    cache = BoundedTTLCache(max_entries=100, max_bytes=4)
+    cache.set("a", "12345")
+    assert len(cache) == 0
+
+def test_expired_entries_are_purged_on_write():
+    """Test that expired entries are removed actively, not only on read"""
+    cache = BoundedTTLCache(max_entries=100, ttl=0.01)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    time.sleep(0.02)
+    cache.set("c", "3")
+    
+    assert len(cache) == 1
+    assert cache.stats()["expirations"] == 2
+
+def test_long_ttl_entry_does_not_block_the_purge():
+    """Test that entries with a short per-call TTL are purged behind a long-lived one"""
+    cache = BoundedTTLCache(max_entries=100, ttl=0.01)
+    cache.set("long", "1", ttl=60)
+    cache.set("a", "2")
+    cache.set("b", "3")
+    time.sleep(0.02)
+    cache.set("c", "4", ttl=60)
+    
+    assert len(cache) == 2
+    assert "long" in cache
+    assert cache.stats()["expirations"] == 2
+
+def test_hit_and_miss_counters():
+    """Test the hit and miss counters"""
+    cache = BoundedTTLCache(max_entries=10)
+    cache.set("a", "1")
+    cache.get("a")
+    cache.get("missing")
+    
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == pytest.approx(0.5)
+
+def test_cache_key_is_stable_and_covers_inputs():
+    """Test that the cache key is deterministic and depends on history and fields"""
+    history = [{"role": "user", "content": "Hello"}, {"role": "assistant", "content": "Hi!"}]
+    key = make_cache_key("I need an office", history, {"city": "Monterrey"})
+    
+    # Hex SHA-256 digest, identical across calls (and processes)
+    assert len(key) == 64
+    assert key == make_cache_key("I need an office", list(history), {"city": "Monterrey"})
+    
+    assert key != make_cache_key("I need an office", history[:1], {"city": "Monterrey"})
+    assert key != make_cache_key("I need an office", history, {"city": "Guadalajara"})
+    assert key != make_cache_key("I need an office", history, {"city": "Monterrey"}, namespace="other-model")
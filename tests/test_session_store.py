@@ -0,0 +1,107 @@
+import time
+import uuid
+from app.services.session_store import ConversationState, SessionStore
+
+class FakePersistence:
+    """In-memory stand-in for MongoSessionPersistence"""
+    def __init__(self):
+        self.documents = {}
+    
+    def load(self, conversation_id):
+        document = self.documents.get(conversation_id)
+        return ConversationState.from_document(document) if document else None
+    
+    def save(self, state):
+        self.documents[state.conversation_id] = state.to_document()
+    
+    def delete(self, conversation_id):
+        self.documents.pop(conversation_id, None)
+
+def test_sessions_are_isolated():
+    """Test that two conversations do not share collected fields"""
+    store = SessionStore()
+    first = store.get_or_create()
+    second = store.get_or_create()
+    first.required_fields["city"] = "Monterrey"
+    
+    assert first.conversation_id != second.conversation_id
+    assert second.required_fields["city"] is None
+    assert store.get_or_create(first.conversation_id) is first
+
+def test_least_recently_used_session_is_evicted():
+    """Test that the session cap evicts the least recently used session"""
+    store = SessionStore(max_sessions=2)
+    first = store.get_or_create()
+    second = store.get_or_create()
+    store.get(first.conversation_id)
+    store.get_or_create()
+    
+    assert store.get(second.conversation_id) is None
+    assert store.get(first.conversation_id) is first
+    assert store.stats()["evictions"] == 1
+
+def test_idle_sessions_expire():
+    """Test that sessions idle for longer than idle_ttl are dropped"""
+    store = SessionStore(idle_ttl=0.01)
+    state = store.get_or_create()
+    time.sleep(0.02)
+    
+    assert store.get(state.conversation_id) is None
+    assert store.stats()["expirations"] == 1
+
+def test_session_is_restored_from_persistence():
+    """Test that a persisted session can be restored by another store (worker)"""
+    persistence = FakePersistence()
+    store = SessionStore(persistence=persistence)
+    state = store.get_or_create()
+    state.required_fields["budget"] = "15000"
+    state.additional_fields["additional_parking"] = "yes"
+    store.save(state)
+    
+    other_worker = SessionStore(persistence=persistence)
+    restored = other_worker.get(state.conversation_id)
+    
+    assert restored is not None
+    assert restored.required_fields["budget"] == "15000"
+    assert restored.additional_fields == {"additional_parking": "yes"}
+
+def test_invalid_conversation_id_is_replaced():
+    """Test that unknown ids that are not UUIDs get a fresh id"""
+    store = SessionStore()
+    state = store.get_or_create("not-a-uuid")
+    assert state.conversation_id != "not-a-uuid"
+    uuid.UUID(state.conversation_id)
+    
+    known = str(uuid.uuid4())
+    assert store.get_or_create(known).conversation_id == known
+
+def test_transcript_is_bounded_and_persisted():
+    """Test that the server-side transcript keeps the last turns and survives a restore"""
+    persistence = FakePersistence()
+    store = SessionStore(persistence=persistence)
+    state = store.get_or_create()
+    for i in range(30):
+        state.add_turn(f"user {i}", f"assistant {i}")
+    store.save(state)
+    
+    assert len(state.history) == state.history.maxlen
+    assert state.history[-1] == {"role": "assistant", "content": "assistant 29"}
+    
+    restored = SessionStore(persistence=persistence).get(state.conversation_id)
+    assert list(restored.history) == list(state.history)
+
+def test_only_changed_fields_are_reported():
+    """Test that only fields changed since the last write are reported"""
+    state = ConversationState(str(uuid.uuid4()), required_fields={"city": "Monterrey"})
+    
+    # Everything is written the first time
+    assert state.changed_fields() == state.collected_fields
+    state.mark_persisted(state.changed_fields())
+    assert state.changed_fields() == {}
+    
+    state.required_fields["budget"] = "$1000"
+    state.additional_fields["parking"] = "2"
+    assert state.changed_fields() == {"budget": "$1000", "parking": "2"}
+    
+    restored = ConversationState.from_document(state.to_document())
+    assert restored.changed_fields() == {}
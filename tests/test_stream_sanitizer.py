@@ -0,0 +1,36 @@
+from app.core.security import StreamSanitizer, sanitize_html
+
+def _stream(chunks, **kwargs):
+    sanitizer = StreamSanitizer(**kwargs)
+    emitted = "".join(sanitizer.feed(chunk) for chunk in chunks)
+    return sanitizer, emitted
+
+def test_streamed_text_is_prefix_of_full_sanitized_text():
+    """Test that the streamed text never diverges from the non-streaming result"""
+    text = "Great, a <b>warehouse</b> in Monterrey. What size do you need? We have many options available for you."
+    chunks = [text[i:i + 7] for i in range(0, len(text), 7)]
+    sanitizer, emitted = _stream(chunks, holdback=8)
+    
+    assert emitted
+    assert sanitize_html(sanitizer.raw).startswith(emitted)
+    assert "<" not in emitted
+
+def test_unclosed_tag_is_held_back():
+    """Test that a partially received HTML tag is never released"""
+    sanitizer, emitted = _stream(["Hello there, friend ", "<scr"], holdback=0)
+    assert emitted == "Hello there, friend "
+    
+    assert sanitizer.feed("ipt>alert</script> bye") == "alert bye"
+
+def test_dangerous_content_stops_the_stream():
+    """Test that nothing more is released once the accumulated text is dangerous"""
+    sanitizer, emitted = _stream(["Sure, I can help you ", "with that. exec(", "'rm -rf')", " more text"], holdback=0)
+    
+    assert sanitizer.unsafe is True
+    assert "exec" not in emitted
+    assert sanitizer.feed("even more text") == ""
+
+def test_output_is_capped_at_max_length():
+    """Test that no more than max_length characters are released"""
+    sanitizer, emitted = _stream(["a" * 50, "b" * 50], max_length=60, holdback=0)
+    assert len(emitted) == 60
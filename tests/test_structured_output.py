@@ -0,0 +1,79 @@
+import pytest
+import json
+from app.core import llm
+from app.core.request_pipeline import track_request
+
+def test_structured_output_is_validated():
+    """Test that the model's JSON fields are formatted and validated with validate_field"""
+    output = json.dumps({
+        "response": "Great, a warehouse in Monterrey!",
+        "budget": 20000.0,
+        "total_size": None,
+        "property_type": "warehouse",
+        "city": "Monterrey and the whole state of Nuevo León",
+        "additional_fields": [{"name": "Loading Docks", "value": "2"}, {"name": "", "value": "x"}],
+    })
+    (response, fields), cacheable = llm._finalize_model_output(output, structured=True)
+    assert response == "Great, a warehouse in Monterrey!"
+    assert fields == {"budget": "20000", "property_type": "warehouse", "additional_loading_docks": "2"}
+    assert cacheable
+
+def test_unparseable_output_falls_back_to_regex():
+    """Test that output that is not the expected JSON is returned as text with no fields"""
+    (response, fields), cacheable = llm._finalize_model_output("Sure! What is your budget?", structured=True)
+    assert response == "Sure! What is your budget?"
+    assert fields is None
+    assert not cacheable
+
+def test_structured_results_round_trip_through_the_cache():
+    """Test that structured results are cached as JSON under their own key space"""
+    result = ("Hi!", {"city": "Puebla"})
+    assert llm._from_cache(llm._to_cache(result, structured=True), structured=True) == result
+    assert llm._generate_cache_key("hi", structured=True) != llm._generate_cache_key("hi")
+
+@pytest.fixture
+def structured_chat_service(memory_chat_service, monkeypatch):
+    service = memory_chat_service
+    service.structured_output = True
+    monkeypatch.setattr(service, "_save_turn", lambda state: None)
+    return service
+
+def test_structured_fields_replace_regex_extraction(structured_chat_service, monkeypatch):
+    """Test that a turn in structured mode runs one model call and no regex extraction"""
+    from app.services import chat_service
+    service = structured_chat_service
+    from app.services.field_extractor import extraction_stats
+    monkeypatch.setattr(chat_service, "get_llm_response", lambda *args, **kwargs: ("Noted!", {"city": "Puebla"}))
+    before = extraction_stats.stats()
+
+    with track_request() as timings:
+        result = service.process_message("I need an office in Monterrey", conversation_id="conversation")
+
+    assert result["collected_fields"]["city"] == "Puebla"
+    assert result["collected_fields"]["property_type"] is None
+    assert timings.calls("extract_fields") == 0
+    # Campos ainda faltavam: o turno não conta como resposta sem campos a buscar
+    after = extraction_stats.stats()
+    assert after["structured_turns"] == before["structured_turns"] + 1
+    assert (after["turns"], after["responses_skipped"]) == (before["turns"], before["responses_skipped"])
+
+def test_regex_extraction_is_the_fallback(structured_chat_service, monkeypatch):
+    """Test that fields come from the regex extractor when the model output was not parsed"""
+    from app.services import chat_service
+    service = structured_chat_service
+    monkeypatch.setattr(chat_service, "get_llm_response", lambda *args, **kwargs: ("Noted!", None))
+
+    result = service.process_message("I need an office in Monterrey", conversation_id="conversation")
+
+    assert result["collected_fields"]["property_type"] == "office"
+    assert result["collected_fields"]["city"] == "Monterrey"
+
+def test_structured_city_alias_is_canonicalized(structured_chat_service, monkeypatch):
+    """Test that a city alias returned by the model is stored under its canonical name"""
+    from app.services import chat_service
+    service = structured_chat_service
+    monkeypatch.setattr(chat_service, "get_llm_response", lambda *args, **kwargs: ("Noted!", {"city": "CDMX"}))
+
+    result = service.process_message("Una oficina en CDMX", conversation_id="conversation")
+
+    assert result["collected_fields"]["city"] == "Mexico City"
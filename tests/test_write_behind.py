@@ -0,0 +1,150 @@
+import threading
+import time
+from pymongo.errors import BulkWriteError
+from app.services.write_behind import WriteBehindQueue
+
+class FakeCollection:
+    """Records bulk_write calls instead of talking to MongoDB"""
+    name = "collected_info"
+    
+    def __init__(self, delay=0.0, failures=0, rejected=()):
+        self.batches = []
+        self.delay = delay
+        self.failures = failures
+        # Operações recusadas com este código de erro em toda tentativa
+        self.rejected = dict(rejected)
+        self.release = threading.Event()
+        self.release.set()
+    
+    def bulk_write(self, operations, ordered=True):
+        self.release.wait()
+        time.sleep(self.delay)
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("temporary failure")
+        errors = [
+            {"index": index, "code": self.rejected[operation.get("n")], "errmsg": "rejected"}
+            for index, operation in enumerate(operations) if operation.get("n") in self.rejected
+        ]
+        self.batches.append([operation for operation in operations if operation.get("n") not in self.rejected])
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(operations) - len(errors)})
+
+def test_operations_are_batched_on_size():
+    """Test that pending operations are grouped into bulk writes of batch_size"""
+    collection = FakeCollection()
+    write_queue = WriteBehindQueue(collection, batch_size=10, flush_interval=5).start()
+    for i in range(25):
+        write_queue.enqueue({"n": i})
+    
+    assert write_queue.flush(timeout=5)
+    write_queue.stop()
+    
+    assert [len(batch) for batch in collection.batches[:2]] == [10, 10]
+    assert sum(len(batch) for batch in collection.batches) == 25
+    assert write_queue.stats()["written"] == 25
+
+def test_operations_are_flushed_on_interval():
+    """Test that a partial batch is written once the flush interval elapses"""
+    collection = FakeCollection()
+    write_queue = WriteBehindQueue(collection, batch_size=100, flush_interval=0.05).start()
+    write_queue.enqueue({"n": 1})
+    
+    deadline = time.monotonic() + 2
+    while not collection.batches and time.monotonic() < deadline:
+        time.sleep(0.01)
+    write_queue.stop()
+    
+    assert collection.batches == [[{"n": 1}]]
+
+def test_full_queue_applies_backpressure():
+    """Test that a full queue falls back to a synchronous write instead of growing"""
+    collection = FakeCollection()
+    collection.release.clear()
+    write_queue = WriteBehindQueue(collection, batch_size=1, flush_interval=0.01, max_queue=1, enqueue_timeout=0.01).start()
+    
+    # The worker is blocked on the first write, the second fills the queue
+    write_queue.enqueue({"n": 1})
+    time.sleep(0.05)
+    write_queue.enqueue({"n": 2})
+    
+    done = threading.Event()
+    def third():
+        write_queue.enqueue({"n": 3})
+        done.set()
+    threading.Thread(target=third).start()
+    time.sleep(0.1)
+    collection.release.set()
+    
+    assert done.wait(2)
+    write_queue.stop()
+    stats = write_queue.stats()
+    assert stats["sync_writes"] == 1
+    assert stats["written"] == 3
+
+def test_failed_batches_are_retried():
+    """Test that a transient bulk_write failure is retried"""
+    collection = FakeCollection(failures=1)
+    write_queue = WriteBehindQueue(collection, batch_size=5, flush_interval=0.01)
+    write_queue.enqueue({"n": 1})
+    
+    # Without a running worker, flush writes from the caller's thread
+    assert write_queue.flush()
+    assert collection.batches == [[{"n": 1}]]
+    assert write_queue.stats()["failed"] == 0
+
+def test_on_written_runs_only_after_a_successful_write():
+    """Test that callbacks run once their batch is written and never for a failed batch"""
+    written = []
+    write_queue = WriteBehindQueue(FakeCollection(), batch_size=5, flush_interval=0.01)
+    write_queue.enqueue({"n": 1}, on_written=lambda: written.append(1))
+    write_queue.enqueue({"n": 2})
+    assert written == []
+    assert write_queue.flush()
+    assert written == [1]
+    
+    failing_queue = WriteBehindQueue(FakeCollection(failures=3), batch_size=5, flush_interval=0.01, max_retries=3)
+    failing_queue.enqueue({"n": 3}, on_written=lambda: written.append(3))
+    assert failing_queue.flush()
+    assert written == [1]
+    assert failing_queue.stats()["failed"] == 1
+
+def test_failing_operation_does_not_hold_back_its_batch():
+    """Test that only the failing operations of a batch are retried or dropped"""
+    written = []
+    # n=2 falha sempre (chave duplicada), n=4 falha em toda tentativa com um erro transitório
+    collection = FakeCollection(rejected={2: 11000, 4: 91})
+    write_queue = WriteBehindQueue(collection, batch_size=5, flush_interval=0.01, max_retries=2)
+    for n in range(1, 6):
+        write_queue.enqueue({"n": n}, on_written=lambda n=n: written.append(n))
+    
+    assert write_queue.flush()
+    assert collection.batches == [[{"n": 1}, {"n": 3}, {"n": 5}], []]
+    assert written == [1, 3, 5]
+    stats = write_queue.stats()
+    assert (stats["written"], stats["failed"]) == (3, 2)
+
+def test_failed_write_keeps_fields_dirty(monkeypatch):
+    """Test that collected fields whose queued write failed are sent again on the next save"""
+    monkeypatch.setenv("GOOGLE_API_KEY", "test-key")
+    from app.services.chat_service import ChatService
+    from app.services.session_store import SessionStore
+    
+    class FakeMongoDBService:
+        def collected_info_write_op(self, conversation_id, changed_fields):
+            return dict(changed_fields)
+    
+    collection = FakeCollection(failures=1)
+    write_queue = WriteBehindQueue(collection, batch_size=5, flush_interval=0.01, max_retries=1)
+    service = ChatService(mongodb_service=FakeMongoDBService(), session_store=SessionStore(), write_queue=write_queue)
+    state = service.get_state("conversation")
+    state.required_fields["city"] = "Puebla"
+    
+    service._save_collected_info(state)
+    assert write_queue.flush()
+    assert state.persisted_fields is None
+    
+    service._save_collected_info(state)
+    assert write_queue.flush()
+    assert collection.batches[0][0]["city"] == "Puebla"
+    assert state.changed_fields() == {}